@@ -7,6 +7,7 @@ from indicators_advanced import AdvancedIndicators
 from pattern_scanner import PatternScanner
 from volume_profile_engine import VolumeProfileEngine
 from support_resistance_detector import SupportResistanceDetector
+from candle_frame import as_candle_frame
 
 class ApexAI:
     """
@@ -14,10 +15,13 @@ class ApexAI:
     Analyse multi-layer : Macro → Méso → Micro
     """
     
-    def __init__(self):
-        self.pattern_scanner = PatternScanner()
-        self.volume_engine = VolumeProfileEngine()
-        self.sr_detector = SupportResistanceDetector()
+    def __init__(self, settings=None):
+        # Paramètres : module config ou ConfigOverlay (backtest, optimiseur)
+        self.settings = settings if settings is not None else config
+
+        self.pattern_scanner = PatternScanner(settings=self.settings)
+        self.volume_engine = VolumeProfileEngine(settings=self.settings)
+        self.sr_detector = SupportResistanceDetector(settings=self.settings)
         
         # État du marché
         self.market_regime = 'neutral'
@@ -28,33 +32,137 @@ class ApexAI:
         self.predictions_history = []
         self.accuracy_rate = 0.5  # Commence à 50%
         
-        print("✅ IA APEX initialisée (Multi-Layer)")
+        # Cache de l'analyse du tick et de sa photo : une seule entrée, partagée
+        # par analyze_complete et evaluate_exit_conditions (voir analysis_key)
+        self._analysis_key = None
+        self._analysis = None
+        self._snapshot = None
+        # Cache de l'étage structure (S/R, Volume Profile, patterns) :
+        # recalculé seulement à la clôture d'une bougie
+        self._structure_key = None
+        self._structure = None
+        self.cache_stats = {'hits': 0, 'misses': 0, 'structure_hits': 0, 'structure_misses': 0}
+        
+        if self.settings.VERBOSE:
+            print("✅ IA APEX initialisée (Multi-Layer)")
     
-    def analyze_complete(self, df):
+    def analyze_complete(self, df, forming=False):
         """
         Analyse COMPLÈTE multi-layer
 
+        Mémorisée par tick : un 2e appel sur la même dernière bougie
+        (même paire, timeframe, timestamp, close et volume) renvoie
+        l'analyse déjà calculée sans rien recalculer.
+
+        Deux étages :
+        - STRUCTURE (S/R, Volume Profile, patterns) : coûteuse, calculée une
+          fois par bougie clôturée puis gardée en cache
+        - INTRABAR (VWAP, momentum, régime, scoring) : recalculée à chaque tick
+
+        Args:
+            df: CandleFrame avec indicateurs (ou DataFrame, converti)
+            forming: True si la dernière bougie est encore ouverte (live) :
+                     la structure est calculée sans elle. False (backtest) :
+                     toutes les bougies sont clôturées
+
         Returns:
             dict: Analyse ultra-détaillée + APEX Score
         """
         if df is None or len(df) < 100:
             return None
 
-        current_price = df.iloc[-1]['close']
-        prev_price = df.iloc[-2]['close']
+        df = as_candle_frame(df)
+
+        key = (forming,) + self.analysis_key(df)
+        if key == self._analysis_key:
+            self.cache_stats['hits'] += 1
+            return self._analysis
+
+        self.cache_stats['misses'] += 1
+        self._snapshot = df.snapshot()
+        self._analysis = self._analyze(df, self._snapshot, forming)
+        self._analysis_key = key
+
+        return self._analysis
+
+    def analysis_key(self, df):
+        """
+        Clé du cache d'analyse d'un tick
+
+        Returns:
+            tuple: (paire, timeframe, nb de bougies, timestamp, close, volume de la dernière bougie)
+        """
+        timestamp = df.last('timestamp') if 'timestamp' in df else None
+        return (self.settings.SYMBOL, self.settings.TIMEFRAME, len(df),
+                timestamp, df.last('close'), df.last('volume'))
+
+    def invalidate_analysis(self):
+        """
+        Oublie l'analyse mémorisée
+
+        À appeler quand les bougies ou les paramètres changent sans que la
+        dernière bougie change (profil rechargé, historique corrigé...).
+        """
+        self._analysis_key = None
+        self._analysis = None
+        self._snapshot = None
+        self._structure_key = None
+        self._structure = None
+
+    def _update_structure(self, df, forming):
+        """
+        Étage STRUCTURE : S/R, Volume Profile et patterns
+
+        Ne dépend que des bougies clôturées : recalculé seulement quand une
+        nouvelle bougie se clôture, réutilisé par tous les ticks intrabar.
+
+        Returns:
+            dict: Patterns de la dernière bougie clôturée et leurs scores
+        """
+        closed = df.window(0, len(df) - 1) if forming else df
+
+        key = self.analysis_key(closed)
+        if key == self._structure_key:
+            self.cache_stats['structure_hits'] += 1
+            return self._structure
+
+        self.cache_stats['structure_misses'] += 1
+        self.volume_engine.update_profile(closed)
+        self.sr_detector.detect_levels(closed)
+        patterns = self.pattern_scanner.scan_all_patterns(closed)
+
+        self._structure = {
+            'patterns': patterns,
+            'pattern_scores': self.pattern_scanner.get_combined_score()
+        }
+        self._structure_key = key
+
+        return self._structure
+
+    def _analyze(self, df, snapshot, forming=False):
+        """
+        Calcule les 3 layers, les power signals et le APEX Score d'un tick
+
+        Args:
+            snapshot: Photo du tick (df.snapshot()), partagée par toutes les couches
+        """
+        current_price = snapshot.last.close
+        prev_price = snapshot.prev.close
+
+        # Structure (bougies clôturées, en cache entre deux clôtures)
+        structure = self._update_structure(df, forming)
 
         # LAYER 1 : MACRO (Long terme - Contexte)
-        macro_analysis = self._analyze_macro(df)
+        macro_analysis = self._analyze_macro(snapshot)
 
         # LAYER 2 : MÉSO (Moyen terme - Zones)
         meso_analysis = self._analyze_meso(df, current_price, prev_price)
 
         # LAYER 3 : MICRO (Court terme - Exécution)
-        micro_analysis = self._analyze_micro(df, current_price, prev_price)
+        micro_analysis = self._analyze_micro(snapshot, structure)
 
         # 🆕 V2.1: DÉTECTION POWER SIGNALS (signaux ultra-forts)
-        power_signals = self._detect_power_signals(df, current_price, prev_price,
-                                                     macro_analysis, meso_analysis, micro_analysis)
+        power_signals = self._detect_power_signals(snapshot, macro_analysis, meso_analysis, micro_analysis)
 
         # Calcule le APEX SCORE final (avec power signals)
         apex_score = self._calculate_apex_score(
@@ -78,19 +186,19 @@ class ApexAI:
             'confidence': apex_score['total_score']
         }
     
-    def _analyze_macro(self, df):
+    def _analyze_macro(self, snapshot):
         """
         LAYER 1 : Analyse MACRO (contexte long terme)
         Timeframes : 1h, 4h, tendance générale
         """
         # Détecte le régime de marché
-        self._detect_market_regime(df)
+        self._detect_market_regime(snapshot)
         
         # Analyse la tendance long terme
-        trend_analysis = self._analyze_trend(df)
+        trend_analysis = self._analyze_trend(snapshot)
         
         # Analyse la volatilité
-        volatility_analysis = self._analyze_volatility(df)
+        volatility_analysis = self._analyze_volatility(snapshot)
         
         macro_score = 0
         reasons = []
@@ -125,11 +233,10 @@ class ApexAI:
         LAYER 2 : Analyse MÉSO (zones clés)
         Support/Résistance, Volume Profile, VWAP
         """
-        # Volume Profile + VWAP
-        vp_analysis = self.volume_engine.analyze_complete(df, current_price, prev_price)
+        # VWAP (Volume Profile déjà à jour : étage structure)
+        vp_analysis = self.volume_engine.analyze_complete(df, current_price, prev_price, update_profile=False)
         
-        # Support/Résistance
-        self.sr_detector.detect_levels(df)
+        # Support/Résistance (niveaux déjà détectés : étage structure)
         sr_signal = self.sr_detector.get_trading_signal(current_price, prev_price)
         
         meso_score = 0
@@ -166,21 +273,22 @@ class ApexAI:
             'reasons': reasons
         }
     
-    def _analyze_micro(self, df, current_price, prev_price):
+    def _analyze_micro(self, snapshot, structure):
         """
         LAYER 3 : Analyse MICRO (exécution)
         Price action, patterns, momentum instantané
         """
-        # Scanne les patterns
-        patterns = self.pattern_scanner.scan_all_patterns(df)
-        pattern_scores = self.pattern_scanner.get_combined_score()
+        # Patterns (scannés par l'étage structure)
+        patterns = structure['patterns']
+        pattern_scores = structure['pattern_scores']
         
         # Analyse momentum
-        momentum = AdvancedIndicators.get_momentum_score(df)
+        momentum = AdvancedIndicators.get_momentum_score(snapshot, settings=self.settings)
         
         # Analyse volume
-        last_candle = df.iloc[-1]
-        volume_spike = last_candle['volume'] / last_candle.get('volume_sma', last_candle['volume'])
+        last_candle = snapshot.last
+        volume_sma = last_candle.volume_sma if last_candle.volume_sma is not None else last_candle.volume
+        volume_spike = last_candle.volume / volume_sma
         
         micro_score = 0
         reasons = []
@@ -199,7 +307,7 @@ class ApexAI:
             reasons.extend(momentum['reasons'][:2])  # Top 2
         
         # Score volume
-        if volume_spike > config.VOLUME_SPIKE_THRESHOLD:
+        if volume_spike > self.settings.VOLUME_SPIKE_THRESHOLD:
             micro_score += 20
             reasons.append(f"Volume spike ({volume_spike:.1f}x)")
         
@@ -212,7 +320,7 @@ class ApexAI:
             'reasons': reasons
         }
     
-    def _detect_power_signals(self, df, current_price, prev_price, macro, meso, micro):
+    def _detect_power_signals(self, snapshot, macro, meso, micro):
         """
         🔥 POWER SIGNALS - Détecte les signaux ULTRA-FORTS qui justifient un trade immédiat
 
@@ -225,11 +333,13 @@ class ApexAI:
         signals_detected = []
         total_boost = 0
 
-        last_candle = df.iloc[-1]
+        last_candle = snapshot.last
+        current_price = last_candle.close
+        prev_price = snapshot.prev.close
 
         # 1. RSI EXTRÊME (survente/surachat sévère)
-        if 'rsi' in last_candle:
-            rsi = last_candle['rsi']
+        if last_candle.rsi is not None:
+            rsi = last_candle.rsi
             if rsi < 25:  # Survente EXTRÊME
                 signals_detected.append(f"RSI Extrême Survente ({rsi:.1f})")
                 total_boost += 25  # +25 points !
@@ -253,12 +363,12 @@ class ApexAI:
 
         # 4. MOMENTUM CONVERGENCE (RSI + MACD + Stoch alignés)
         momentum_signals = 0
-        if 'rsi' in last_candle and last_candle['rsi'] < 35:
+        if last_candle.rsi is not None and last_candle.rsi < 35:
             momentum_signals += 1
-        if 'macd' in last_candle and 'macd_signal' in last_candle:
-            if last_candle['macd'] > last_candle['macd_signal']:
+        if last_candle.macd is not None and last_candle.macd_signal is not None:
+            if last_candle.macd > last_candle.macd_signal:
                 momentum_signals += 1
-        if 'stoch_k' in last_candle and last_candle['stoch_k'] < 30:
+        if last_candle.stoch_k is not None and last_candle.stoch_k < 30:
             momentum_signals += 1
 
         if momentum_signals >= 2:
@@ -266,14 +376,14 @@ class ApexAI:
             total_boost += 18
 
         # 5. SUPERTREND + PRICE ACTION
-        if 'supertrend' in last_candle and last_candle['supertrend'] > 0:  # Signal achat
+        if last_candle.supertrend is not None and last_candle.supertrend > 0:  # Signal achat
             if current_price > prev_price:  # Prix en hausse
                 signals_detected.append("SuperTrend BUY + Prix Hausse")
                 total_boost += 12
 
         # 6. BOLLINGER BANDS EXTREMES
-        if 'bb_lower' in last_candle and 'bb_upper' in last_candle:
-            bb_position = (current_price - last_candle['bb_lower']) / (last_candle['bb_upper'] - last_candle['bb_lower'])
+        if last_candle.bb_lower is not None and last_candle.bb_upper is not None:
+            bb_position = (current_price - last_candle.bb_lower) / (last_candle.bb_upper - last_candle.bb_lower)
             if bb_position < 0.1:  # Prix très proche de la bande basse
                 signals_detected.append("Prix à la Bollinger Basse (rebond potentiel)")
                 total_boost += 15
@@ -288,7 +398,8 @@ class ApexAI:
             'active': len(signals_detected) >= 2  # Activé si 2+ signaux
         }
 
-    def evaluate_exit_conditions(self, df, current_price, position_info, entry_apex_score):
+    def evaluate_exit_conditions(self, df, current_price, position_info, entry_apex_score, current_time=None,
+                                 forming=False):
         """
         🚨 ÉVALUE LES CONDITIONS DE SORTIE DYNAMIQUE (V2.3 - Scalping intelligent!)
 
@@ -301,11 +412,17 @@ class ApexAI:
         - Respecte les setups valides (rebond, bougie verte)
         - Exige convergence de plusieurs signaux négatifs
 
+        L'analyse APEX du tick et sa photo (CandleSnapshot) viennent du cache
+        d'analyze_complete : déjà calculées par la boucle principale, elles
+        ne sont pas refaites ici.
+
         Args:
-            df: DataFrame avec indicateurs
+            df: CandleFrame (ou DataFrame) avec indicateurs
             current_price: Prix actuel
             position_info: Info sur la position ouverte
             entry_apex_score: Score APEX à l'entrée du trade
+            current_time: Heure actuelle (défaut: maintenant, backtest: heure de la bougie)
+            forming: Dernière bougie encore ouverte (voir analyze_complete)
 
         Returns:
             dict: {
@@ -316,14 +433,17 @@ class ApexAI:
                 'urgency': 'critical' | 'high' | 'medium' | 'low'
             }
         """
-        if not config.DYNAMIC_EXITS_ENABLED:
+        if not self.settings.DYNAMIC_EXITS_ENABLED:
             return {'should_exit': False, 'exit_type': None, 'exit_percent': 0, 'reasons': [], 'urgency': 'low'}
 
         reasons = []
         urgency_score = 0  # Plus le score est élevé, plus c'est urgent
         exit_percent = 0
 
-        last_candle = df.iloc[-1]
+        df = as_candle_frame(df)
+        current_analysis = self.analyze_complete(df, forming)
+        snapshot = self._snapshot if current_analysis is not None else df.snapshot()
+        last_candle = snapshot.last
         entry_price = position_info['entry_price']
         pnl_percent = ((current_price - entry_price) / entry_price)
 
@@ -331,37 +451,39 @@ class ApexAI:
         from datetime import datetime
         entry_time = position_info.get('entry_time')
         if entry_time:
-            time_in_position = (datetime.now() - entry_time).total_seconds()
+            if current_time is None:
+                current_time = datetime.now()
+            time_in_position = (current_time - entry_time).total_seconds()
             candles_in_position = time_in_position / 60  # 1 min par bougie
 
-            if candles_in_position < config.MIN_CANDLES_IN_POSITION:
+            if candles_in_position < self.settings.MIN_CANDLES_IN_POSITION:
                 # Trop tôt pour évaluer, sauf si APEX s'effondre (< 40)
-                current_analysis = self.analyze_complete(df)
                 if current_analysis:
                     current_apex = current_analysis['apex_score']['total_score']
                     if current_apex >= 40:  # Setup encore valide
                         return {'should_exit': False, 'exit_type': None, 'exit_percent': 0,
-                               'reasons': [f"🧠 Trade respire ({candles_in_position:.0f}/{config.MIN_CANDLES_IN_POSITION} bougies)"],
+                               'reasons': [f"🧠 Trade respire ({candles_in_position:.0f}/{self.settings.MIN_CANDLES_IN_POSITION} bougies)"],
                                'urgency': 'low'}
 
         # Ne pas sortir trop tôt si on n'a pas encore un minimum de profit
-        has_min_profit = pnl_percent >= config.MIN_PROFIT_FOR_EARLY_EXIT
+        has_min_profit = pnl_percent >= self.settings.MIN_PROFIT_FOR_EARLY_EXIT
 
         # 🧠 PROTECTION 2: Détecte si setup initial encore valide (rebond en cours)
         setup_still_valid = False
-        if config.SMART_EXIT_MODE:
+        if self.settings.SMART_EXIT_MODE:
             # Bougie verte récente = rebond en cours
-            if last_candle['close'] > last_candle['open']:
+            if last_candle.close > last_candle.open:
                 setup_still_valid = True
             # RSI encore en survente = setup retournement valide
-            if 'rsi' in last_candle and last_candle['rsi'] < 30:
+            if last_candle.rsi is not None and last_candle.rsi < 30:
                 setup_still_valid = True
 
         # Compte les bougies consécutives avec stoch > 90
         stoch_overbought_count = 0
-        if 'stoch_k' in df.columns:
-            for i in range(min(config.EXIT_STOCH_DURATION, len(df))):
-                if df.iloc[-(i+1)]['stoch_k'] > config.EXIT_STOCH_OVERBOUGHT:
+        if 'stoch_k' in snapshot.recent:
+            stoch_k = snapshot.recent['stoch_k']
+            for i in range(min(self.settings.EXIT_STOCH_DURATION, len(stoch_k))):
+                if stoch_k[-(i+1)] > self.settings.EXIT_STOCH_OVERBOUGHT:
                     stoch_overbought_count += 1
                 else:
                     break
@@ -369,11 +491,11 @@ class ApexAI:
         # ═══════════════════════════════════════════════════════════
         # 1. DÉTÉRIORATION DES CONDITIONS
         # ═══════════════════════════════════════════════════════════
-        if config.EXIT_ON_DETERIORATION:
+        if self.settings.EXIT_ON_DETERIORATION:
             deterioration_signals = 0
 
             # Stochastique en surachat prolongé
-            if stoch_overbought_count >= config.EXIT_STOCH_DURATION:
+            if stoch_overbought_count >= self.settings.EXIT_STOCH_DURATION:
                 reasons.append(f"⚠️ Stochastique en surachat prolongé ({stoch_overbought_count} bougies >90)")
                 deterioration_signals += 1
                 urgency_score += 20
@@ -382,17 +504,16 @@ class ApexAI:
             # On devra passer l'analysis actuelle pour avoir ces infos
 
             # APEX critique ou stagnant
-            current_analysis = self.analyze_complete(df)
             if current_analysis:
                 current_apex = current_analysis['apex_score']['total_score']
 
-                if current_apex < config.EXIT_APEX_CRITICAL:
-                    reasons.append(f"🚨 APEX CRITIQUE ({current_apex:.0f} < {config.EXIT_APEX_CRITICAL})")
+                if current_apex < self.settings.EXIT_APEX_CRITICAL:
+                    reasons.append(f"🚨 APEX CRITIQUE ({current_apex:.0f} < {self.settings.EXIT_APEX_CRITICAL})")
                     deterioration_signals += 1
                     urgency_score += 30
 
-                elif current_apex < config.EXIT_APEX_STAGNANT and has_min_profit:
-                    reasons.append(f"⚠️ APEX stagnant ({current_apex:.0f} < {config.EXIT_APEX_STAGNANT})")
+                elif current_apex < self.settings.EXIT_APEX_STAGNANT and has_min_profit:
+                    reasons.append(f"⚠️ APEX stagnant ({current_apex:.0f} < {self.settings.EXIT_APEX_STAGNANT})")
                     deterioration_signals += 1
                     urgency_score += 15
 
@@ -406,27 +527,27 @@ class ApexAI:
         # ═══════════════════════════════════════════════════════════
         # 2. PERTE DE MOMENTUM (🧠 Mode intelligent V2.3)
         # ═══════════════════════════════════════════════════════════
-        if config.EXIT_ON_MOMENTUM_LOSS:
+        if self.settings.EXIT_ON_MOMENTUM_LOSS:
             momentum_signals = []
 
             # Prix repasse sous EMA9
-            if config.EXIT_PRICE_UNDER_EMA and 'ema_fast' in last_candle:
-                if current_price < last_candle['ema_fast']:
+            if self.settings.EXIT_PRICE_UNDER_EMA and last_candle.ema_fast is not None:
+                if current_price < last_candle.ema_fast:
                     # 🧠 MAIS: Ne sort pas si setup encore valide (bougie verte/rebond)
                     if not setup_still_valid:
                         momentum_signals.append("Prix sous EMA9")
                         urgency_score += 15  # Réduit de 25 → 15
 
             # MACD devient négatif ou neutre
-            if config.EXIT_MACD_BEARISH and 'macd' in last_candle and 'macd_signal' in last_candle:
-                if last_candle['macd'] < last_candle['macd_signal']:
+            if self.settings.EXIT_MACD_BEARISH and last_candle.macd is not None and last_candle.macd_signal is not None:
+                if last_candle.macd < last_candle.macd_signal:
                     # 🧠 MAIS: Ne sort pas si setup encore valide
                     if not setup_still_valid:
                         momentum_signals.append("MACD baissier")
                         urgency_score += 12  # Réduit de 20 → 12
 
             # 🧠 EXIGE CONVERGENCE: Besoin de 2+ signaux momentum ou 1 signal + autre détérioration
-            if config.REQUIRE_CONVERGENCE:
+            if self.settings.REQUIRE_CONVERGENCE:
                 # Sortie seulement si 2+ signaux négatifs convergent
                 if len(momentum_signals) >= 2 or (len(momentum_signals) >= 1 and len(reasons) > 0):
                     for sig in momentum_signals:
@@ -448,17 +569,17 @@ class ApexAI:
         # ═══════════════════════════════════════════════════════════
         # 3. DÉGRADATION DU SCORE APEX
         # ═══════════════════════════════════════════════════════════
-        if config.EXIT_ON_APEX_DROP and current_analysis:
+        if self.settings.EXIT_ON_APEX_DROP and current_analysis:
             current_apex = current_analysis['apex_score']['total_score']
             apex_drop = current_apex - entry_apex_score
 
-            if apex_drop <= config.EXIT_APEX_DROP_THRESHOLD:
+            if apex_drop <= self.settings.EXIT_APEX_DROP_THRESHOLD:
                 reasons.append(f"📊 APEX en chute ({apex_drop:+.0f} points vs entrée)")
                 urgency_score += 35
                 exit_percent = max(exit_percent, 0.8 if has_min_profit else 1.0)
 
             # Changement de régime de marché
-            if config.EXIT_REGIME_CHANGE:
+            if self.settings.EXIT_REGIME_CHANGE:
                 if current_analysis['market_regime'] in ['ranging', 'neutral', 'trending_down']:
                     if self.market_regime == 'trending_up':  # On était en tendance haussière
                         reasons.append(f"🔄 Régime changé: {self.market_regime} → {current_analysis['market_regime']}")
@@ -468,16 +589,16 @@ class ApexAI:
         # ═══════════════════════════════════════════════════════════
         # 4. TAKE-PROFIT PROGRESSIF (conditions neutres)
         # ═══════════════════════════════════════════════════════════
-        if config.PROGRESSIVE_EXITS_ENABLED and pnl_percent > 0:
+        if self.settings.PROGRESSIVE_EXITS_ENABLED and pnl_percent > 0:
             # +1.0% → Sortie partielle si conditions neutres
-            if pnl_percent >= config.PARTIAL_EXIT_2_PROFIT:
+            if pnl_percent >= self.settings.PARTIAL_EXIT_2_PROFIT:
                 if current_analysis and current_analysis['apex_score']['total_score'] < 70:
                     reasons.append(f"💰 TP progressif: +{pnl_percent*100:.1f}% avec conditions neutres")
                     exit_percent = max(exit_percent, 0.3)
                     urgency_score += 10
 
             # +0.5% → Sortie partielle si conditions se dégradent
-            elif pnl_percent >= config.PARTIAL_EXIT_1_PROFIT:
+            elif pnl_percent >= self.settings.PARTIAL_EXIT_1_PROFIT:
                 if len(reasons) > 0:  # Si d'autres signaux de dégradation
                     reasons.append(f"💰 TP progressif: +{pnl_percent*100:.1f}% avec dégradation")
                     exit_percent = max(exit_percent, 0.3)
@@ -586,13 +707,13 @@ class ApexAI:
         """
         score = apex_score['total_score']
         
-        if score >= config.MIN_APEX_SCORE:
+        if score >= self.settings.MIN_APEX_SCORE:
             return {
                 'action': 'buy',
                 'strength': self._get_signal_strength(score),
-                'recommendation': 'ACHAT FORT' if score >= config.IDEAL_APEX_SCORE else 'ACHAT'
+                'recommendation': 'ACHAT FORT' if score >= self.settings.IDEAL_APEX_SCORE else 'ACHAT'
             }
-        elif score <= (100 - config.MIN_APEX_SCORE):
+        elif score <= (100 - self.settings.MIN_APEX_SCORE):
             return {
                 'action': 'sell',
                 'strength': self._get_signal_strength(100 - score),
@@ -618,54 +739,53 @@ class ApexAI:
         else:
             return 'faible'
     
-    def _detect_market_regime(self, df):
+    def _detect_market_regime(self, snapshot):
         """Détecte le régime de marché actuel"""
-        if len(df) < 50:
+        if snapshot.length < 50:
             self.market_regime = 'neutral'
             return
         
-        recent = df.tail(50)
+        closes = snapshot.recent['close'][-50:]
         
         # Calcule le changement de prix
-        price_change = (recent['close'].iloc[-1] - recent['close'].iloc[0]) / recent['close'].iloc[0]
+        price_change = (closes[-1] - closes[0]) / closes[0]
         
         # Calcule la volatilité (ATR relatif)
-        atr = recent['atr'].iloc[-1]
-        avg_price = recent['close'].mean()
+        atr = snapshot.last.atr
+        avg_price = np.nanmean(closes)
         volatility_ratio = atr / avg_price
         
         # Détecte le régime
         if volatility_ratio > 0.03:  # 3% ATR = très volatile
             self.market_regime = 'volatile'
             self.volatility_level = 'high'
-        elif abs(price_change) > config.TRENDING_THRESHOLD:
+        elif abs(price_change) > self.settings.TRENDING_THRESHOLD:
             if price_change > 0:
                 self.market_regime = 'trending_up'
             else:
                 self.market_regime = 'trending_down'
             self.volatility_level = 'normal'
-        elif abs(price_change) < config.RANGING_THRESHOLD:
+        elif abs(price_change) < self.settings.RANGING_THRESHOLD:
             self.market_regime = 'ranging'
             self.volatility_level = 'low'
         else:
             self.market_regime = 'neutral'
             self.volatility_level = 'normal'
     
-    def _analyze_trend(self, df):
+    def _analyze_trend(self, snapshot):
         """Analyse la force de la tendance"""
-        if 'ema_fast' not in df.columns:
+        last = snapshot.last
+        if last.ema_fast is None:
             return {'strength': 0, 'direction': 'neutral'}
         
-        last = df.iloc[-1]
-        
         # Compare les EMAs
         ema_order_score = 0
         
-        if last['ema_fast'] > last['ema_medium']:
+        if last.ema_fast > last.ema_medium:
             ema_order_score += 1
-        if last['ema_medium'] > last['ema_slow']:
+        if last.ema_medium > last.ema_slow:
             ema_order_score += 1
-        if last['ema_slow'] > last['ema_trend']:
+        if last.ema_slow > last.ema_trend:
             ema_order_score += 1
         
         # Score de tendance (-100 à +100)
@@ -684,7 +804,7 @@ class ApexAI:
             'direction': direction
         }
     
-    def _analyze_volatility(self, df):
+    def _analyze_volatility(self, snapshot):
         """
         Analyse la volatilité avec adaptativité
 
@@ -692,12 +812,12 @@ class ApexAI:
         - Haute volatilité: Être plus tolérant (signaux moins stricts)
         - Basse volatilité: Être plus exigeant (faux signaux fréquents)
         """
-        if 'atr' not in df.columns:
+        if 'atr' not in snapshot.recent:
             return {'level': 'unknown', 'score': 0, 'ratio': 1.0, 'adjustment': 0}
 
-        recent_atr = df['atr'].tail(20)
-        current_atr = recent_atr.iloc[-1]
-        avg_atr = recent_atr.mean()
+        recent_atr = snapshot.recent['atr'][-20:]
+        current_atr = recent_atr[-1]
+        avg_atr = np.nanmean(recent_atr)
 
         volatility_ratio = current_atr / avg_atr
 
@@ -0,0 +1,390 @@
+# backtest_apex.py - Backtest événementiel du bot APEX sur bougies historiques
+
+import argparse
+import contextlib
+import math
+import os
+import sys
+import time
+import ccxt
+import numpy as np
+import pandas as pd
+import config_apex as config
+from config_apex import ConfigOverlay
+from candle_store import load_ohlcv_csv, symbol_timeframe_from_path
+from candle_cache import CandleCache
+from candle_frame import CandleFrame
+from indicators_incremental import IncrementalIndicators, OUTPUT_COLUMNS
+from ai_apex import ApexAI
+from trader_apex import TraderApex
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class BacktestEngine:
+    """
+    Rejoue des bougies historiques bougie par bougie à travers la même
+    chaîne que le bot live : indicateurs incrémentaux → ApexAI →
+    sorties dynamiques → TraderApex (simulation, frais BINANCE_FEE)
+
+    Chaque bougie est traitée à sa clôture. Les indicateurs sont mis à jour
+    en O(1) (pas de recalcul de la fenêtre de 500 bougies) ; seule la
+    fenêtre passée à l'IA est reconstruite depuis les buffers.
+    """
+
+    def __init__(self, df, symbol=None, timeframe=None, window=None, settings=None):
+        """
+        Args:
+            df: DataFrame OHLCV (timestamp en ms ou datetime) ou dict de colonnes numpy
+            symbol: Paire backtestée (défaut: config)
+            timeframe: Timeframe des bougies (défaut: config)
+            window: Bougies passées à l'IA (défaut: DATA_FETCH_LIMIT, comme en live)
+            settings: Paramètres (défaut: module config, ou ConfigOverlay)
+        """
+        base = settings if settings is not None else config
+
+        # Backtest = toujours en simulation, sur la paire des données
+        # (surcharge locale : le module config n'est jamais modifié)
+        self.settings = ConfigOverlay(
+            base,
+            DRY_RUN=True,
+            SYMBOL=symbol or base.SYMBOL,
+            TIMEFRAME=timeframe or base.TIMEFRAME
+        )
+
+        self.symbol = self.settings.SYMBOL
+        self.timeframe = self.settings.TIMEFRAME
+        self.window = window or self.settings.DATA_FETCH_LIMIT
+
+        # Colonnes numpy (sans copie si déjà en int64 / float64)
+        timestamps = np.asarray(df['timestamp'])
+        if timestamps.dtype.kind == 'M':
+            timestamps = timestamps.astype('datetime64[ms]').astype(np.int64)
+        self._timestamps = timestamps.astype(np.int64, copy=False)
+        self._ohlcv = {col: np.asarray(df[col], dtype=float) for col in OHLCV_COLUMNS}
+
+        self.timeframe_ms = ccxt.Exchange.parse_timeframe(self.timeframe) * 1000
+
+        self.warmup = self.warmup_bars(self.settings)
+        self.observation_bars = math.ceil(self.settings.MIN_OBSERVATION_TIME * 1000 / self.timeframe_ms)
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            self.indicators = IncrementalIndicators(maxlen=self.window, settings=self.settings)
+            self.ai = ApexAI(settings=self.settings)
+            self.trader = TraderApex(settings=self.settings)
+
+        self.can_trade = False
+        self.equity_curve = []
+        self.stats = {
+            'bars': 0,
+            'analyses': 0,
+            'signals_detected': 0,
+            'trades_executed': 0
+        }
+
+    @staticmethod
+    def warmup_bars(settings=None):
+        """
+        Bougies de préchauffage avant la 1ère analyse
+        Même règle que le live : 200 bougies pour les indicateurs
+        """
+        if settings is None:
+            settings = config
+        return max(200, settings.MIN_CANDLES_BEFORE_TRADE)
+
+    def run(self, verbose=False, progress_every=10000):
+        """
+        Lance le backtest
+
+        Args:
+            verbose: Affiche les messages du bot (sinon seulement la progression)
+            progress_every: Fréquence d'affichage de la progression (bougies)
+
+        Returns:
+            dict: Résumé des performances
+        """
+        n = len(self._timestamps)
+        progress = sys.stdout
+        start_time = time.time()
+
+        print(f"🚀 Backtest {self.symbol} ({self.timeframe}) - {n} bougies")
+
+        with contextlib.ExitStack() as stack:
+            if not verbose:
+                devnull = stack.enter_context(open(os.devnull, 'w'))
+                stack.enter_context(contextlib.redirect_stdout(devnull))
+
+            for i in range(n):
+                self._process_bar(i)
+
+                if progress_every and (i + 1) % progress_every == 0:
+                    elapsed = time.time() - start_time
+                    print(f"⏳ {i + 1}/{n} bougies ({elapsed:.0f}s)", file=progress)
+
+        summary = self.get_summary()
+        summary['elapsed'] = time.time() - start_time
+
+        return summary
+
+    def _process_bar(self, i):
+        """Traite une bougie clôturée"""
+        o = self._ohlcv['open'][i]
+        h = self._ohlcv['high'][i]
+        l = self._ohlcv['low'][i]
+        c = self._ohlcv['close'][i]
+        v = self._ohlcv['volume'][i]
+        now = self._bar_close_time(i)
+
+        self.indicators.update(int(self._timestamps[i]), o, h, l, c, v)
+        self.stats['bars'] += 1
+
+        # Stop / target touchés pendant la bougie (mèches)
+        if self.trader.has_position():
+            self._check_protective_levels(o, h, l, now)
+
+        if i + 1 >= self.warmup:
+            df = self._window(i)
+            analysis = self.ai.analyze_complete(df)
+
+            if analysis:
+                self.stats['analyses'] += 1
+                if self._observation_allows(i, analysis):
+                    if self.trader.has_position():
+                        self._manage_open_position(c, df, analysis, now)
+                    else:
+                        self._look_for_entry(c, df, analysis, now)
+
+        self._record_equity(i, c)
+
+    def _bar_close_time(self, i):
+        """Heure de clôture de la bougie i (datetime)"""
+        return pd.Timestamp(int(self._timestamps[i]) + self.timeframe_ms, unit='ms').to_pydatetime()
+
+    def _window(self, i):
+        """CandleFrame des dernières bougies avec indicateurs (vues, sans copie)"""
+        m = min(self.window, i + 1)
+        lo = i + 1 - m
+
+        frame = CandleFrame({'timestamp': self._timestamps[lo:i + 1]})
+        for col in OHLCV_COLUMNS:
+            frame[col] = self._ohlcv[col][lo:i + 1]
+        for col in OUTPUT_COLUMNS:
+            frame[col] = self.indicators.history.tail(col, m)
+
+        return frame
+
+    def _observation_allows(self, i, analysis):
+        """Phase d'observation (en bougies) avec EMERGENCY BUY, comme le live"""
+        if self.can_trade:
+            return True
+
+        if i + 1 - self.warmup >= self.observation_bars:
+            self.can_trade = True
+            return True
+
+        apex_score = analysis['apex_score']['total_score']
+        if apex_score >= 92 and analysis['decision']['action'] == 'buy':
+            self.can_trade = True
+            return True
+
+        return False
+
+    def _check_protective_levels(self, open_, high, low, now):
+        """
+        Stop-loss et take-profit touchés en cours de bougie
+        Exécution au niveau (ou à l'ouverture en cas de gap). Si les deux
+        sont touchés dans la même bougie, le stop est retenu (prudent).
+        Puis trailing stop remonté par le plus haut de la bougie, comme le
+        PositionGuardian (stop contrôlé avant le trailing).
+        """
+        position = self.trader.position
+
+        if low <= position['stop_loss']:
+            self.trader.sell(min(open_, position['stop_loss']), "Stop-loss", timestamp=now)
+        elif high >= position['take_profit']:
+            self.trader.sell(max(open_, position['take_profit']), "Take-profit", timestamp=now)
+        else:
+            self.trader.update_trailing_stop(high)
+
+    def _check_targets(self, current_price, now):
+        """Multi-targets : vente de la part atteinte (TraderApex.take_target_profits)"""
+        self.trader.take_target_profits(current_price, timestamp=now)
+
+    def _manage_open_position(self, current_price, df, analysis, now):
+        """Gestion de position (même logique que le bot live en simulation)"""
+        self._check_targets(current_price, now)
+        position = self.trader.position
+
+        if current_price <= position['stop_loss']:
+            self.trader.sell(current_price, "Stop-loss", timestamp=now)
+            return
+
+        if current_price >= position['take_profit']:
+            self.trader.sell(current_price, "Take-profit", timestamp=now)
+            return
+
+        if self.settings.DYNAMIC_EXITS_ENABLED:
+            entry_apex_score = position.get('entry_apex_score', 70)
+            exit_eval = self.ai.evaluate_exit_conditions(df, current_price, position, entry_apex_score,
+                                                         current_time=now)
+
+            if exit_eval['should_exit'] and exit_eval['urgency'] in ['critical', 'high', 'medium']:
+                reasons = ', '.join(exit_eval['reasons'][:2])
+                if exit_eval['exit_type'] == 'full':
+                    self.trader.sell(current_price, f"Sortie dynamique: {reasons}", timestamp=now)
+                else:
+                    self.trader.sell_partial(current_price, exit_eval['exit_percent'],
+                                             f"Sortie partielle: {reasons}", timestamp=now)
+                return
+
+        if analysis['decision']['action'] == 'sell' and analysis['confidence'] >= 80:
+            self.trader.sell(current_price, "Signal IA", timestamp=now)
+
+    def _look_for_entry(self, current_price, df, analysis, now):
+        """Entrée (même logique que le bot live)"""
+        apex_score = analysis['apex_score']['total_score']
+
+        if apex_score < self.settings.MIN_APEX_SCORE or analysis['decision']['action'] != 'buy':
+            return
+
+        self.stats['signals_detected'] += 1
+
+        plan = self.trader.compute_entry_plan(current_price, df.last('atr'), apex_score)
+        if plan['rr_ratio'] < self.settings.MIN_RISK_REWARD_RATIO:
+            return
+
+        position = self.trader.buy(current_price, plan['quantity'], plan['stop_loss'],
+                                   plan['take_profit'], apex_score=apex_score, timestamp=now)
+        if position:
+            self.stats['trades_executed'] += 1
+
+    def _record_equity(self, i, close):
+        """Équité à la clôture : capital + P&L réalisé + P&L latent"""
+        equity = self.settings.INITIAL_CAPITAL + self.trader.total_profit
+        position = self.trader.position
+        if position is not None:
+            equity += (close - position['entry_price']) * position['quantity']
+
+        self.equity_curve.append((self._timestamps[i], close, equity, position is not None))
+
+    def get_equity_dataframe(self):
+        """Courbe d'équité (une ligne par bougie)"""
+        df = pd.DataFrame(self.equity_curve, columns=['timestamp', 'close', 'equity', 'in_position'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+
+        return df
+
+    def get_trades_dataframe(self):
+        """Journal des trades (sorties totales et partielles)"""
+        return pd.DataFrame(self.trader.positions_history)
+
+    def get_summary(self):
+        """
+        Résumé du backtest
+
+        Returns:
+            dict: Performances du trader + équité finale et drawdown max
+        """
+        summary = self.trader.get_performance_summary()
+        summary.update(self.stats)
+
+        equity = np.array([point[2] for point in self.equity_curve]) if self.equity_curve else np.array([self.settings.INITIAL_CAPITAL])
+        peaks = np.maximum.accumulate(equity)
+
+        summary['final_equity'] = float(equity[-1])
+        summary['return_percent'] = (equity[-1] / self.settings.INITIAL_CAPITAL - 1) * 100
+        summary['max_drawdown_percent'] = float(((equity - peaks) / peaks).min() * 100)
+
+        return summary
+
+    def save_results(self, output_dir):
+        """
+        Écrit la courbe d'équité et le journal des trades en CSV
+
+        Returns:
+            tuple: (chemin équité, chemin trades)
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        name = f"{self.symbol.replace('/', '-')}_{self.timeframe}"
+
+        equity_path = os.path.join(output_dir, f"{name}_equity.csv")
+        trades_path = os.path.join(output_dir, f"{name}_trades.csv")
+
+        self.get_equity_dataframe().to_csv(equity_path, index=False)
+        self.get_trades_dataframe().to_csv(trades_path, index=False)
+
+        return equity_path, trades_path
+
+    @staticmethod
+    def print_summary(summary):
+        """Affiche le résumé du backtest"""
+        print("\n" + "="*60)
+        print("📊 RÉSULTATS DU BACKTEST")
+        print("="*60)
+
+        print(f"\n🕯️  Bougies: {summary['bars']} ({summary['analyses']} analyses)")
+        print(f"🚨 Signaux: {summary['signals_detected']}")
+        print(f"💼 Trades: {summary['trades_executed']}")
+        print(f"📈 Win rate: {summary['win_rate']:.1f}%")
+        print(f"\n💰 Profit total: ${summary['total_profit']:+.2f}")
+        print(f"💵 Équité finale: ${summary['final_equity']:.2f} ({summary['return_percent']:+.2f}%)")
+        print(f"📉 Drawdown max: {summary['max_drawdown_percent']:.2f}%")
+        if 'elapsed' in summary:
+            print(f"⏱️  Durée: {summary['elapsed']:.0f}s")
+
+        print("="*60)
+
+
+def main():
+    """Point d'entrée du backtest"""
+    parser = argparse.ArgumentParser(description="Backtest APEX sur bougies historiques")
+    parser.add_argument('csv', help="CSV OHLCV (ex: data/history/ETH-USDT_1m.csv), ou paire avec --cache")
+    parser.add_argument('--cache', action='store_true',
+                        help="Lit les bougies dans le cache disque (csv = paire, ex: ETH/USDT)")
+    parser.add_argument('--symbol', help="Paire (défaut: déduite du nom de fichier)")
+    parser.add_argument('--timeframe', help="Timeframe (défaut: déduit du nom de fichier)")
+    parser.add_argument('--profile', default=config.ACTIVE_PROFILE)
+    parser.add_argument('--start', help="Date de début (ex: 2024-01-01)")
+    parser.add_argument('--end', help="Date de fin (exclue)")
+    parser.add_argument('--window', type=int, default=None)
+    parser.add_argument('--trailing', action='store_true', help="Active le trailing stop (TRAILING_STOP_ENABLED)")
+    parser.add_argument('--output', default='data/backtests')
+    parser.add_argument('--verbose', action='store_true', help="Affiche les messages du bot")
+    args = parser.parse_args()
+
+    start = pd.Timestamp(args.start).value // 10**6 if args.start else None
+    end = pd.Timestamp(args.end).value // 10**6 - 1 if args.end else None
+
+    if args.cache:
+        # Colonnes memory-mappées, sans passer par pandas
+        symbol = args.symbol or args.csv
+        timeframe = args.timeframe or config.TIMEFRAME
+        df = CandleCache().load(symbol, timeframe, start, end)
+        print(f"📂 Cache: {len(df['timestamp'])} bougies ({symbol} {timeframe})")
+    else:
+        symbol, timeframe = symbol_timeframe_from_path(args.csv)
+        symbol = args.symbol or symbol
+        timeframe = args.timeframe or timeframe
+
+        df = load_ohlcv_csv(args.csv)
+        if start is not None:
+            df = df[df['timestamp'] >= start]
+        if end is not None:
+            df = df[df['timestamp'] <= end]
+
+    overrides = config.profile_overrides(args.profile)
+    if args.trailing:
+        overrides['TRAILING_STOP_ENABLED'] = True
+    settings = ConfigOverlay(**overrides)
+
+    engine = BacktestEngine(df, symbol, timeframe, window=args.window, settings=settings)
+    summary = engine.run(verbose=args.verbose)
+    BacktestEngine.print_summary(summary)
+
+    equity_path, trades_path = engine.save_results(args.output)
+    print(f"\n💾 Équité: {equity_path}")
+    print(f"💾 Trades: {trades_path}")
+
+
+if __name__ == "__main__":
+    main()
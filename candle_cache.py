@@ -0,0 +1,275 @@
+# candle_cache.py - Cache disque des bougies en colonnes NumPy (APEX)
+
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import config_apex as config
+
+DAY_MS = 86_400_000
+
+
+class CandleCache:
+    """
+    Cache local des bougies, en colonnes NumPy partitionnées par jour
+
+    Organisation :
+        {root}/{BASE-QUOTE}/{timeframe}/{YYYY-MM-DD}/{colonne}.npy
+
+    - une colonne par fichier (timestamp int64 en ms, OHLCV en float64)
+    - lecture par memory-mapping (np.load mmap_mode='r') : pas de copie pour
+      un jour, une seule concaténation pour une plage de plusieurs jours
+    - ajout incrémental : seul le fichier du jour concerné est réécrit
+      (écriture dans un dossier temporaire puis remplacement atomique)
+    """
+
+    COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    LOAD_RETRIES = 20  # Relectures d'une partition en cours de remplacement
+
+    def __init__(self, root=None):
+        """
+        Args:
+            root: Dossier du cache (défaut: config.CANDLE_CACHE_DIR)
+        """
+        self.root = root or config.CANDLE_CACHE_DIR
+
+    # ═══════════════════════════════════════════════════════════
+    # 📁 CHEMINS
+    # ═══════════════════════════════════════════════════════════
+
+    def series_dir(self, symbol, timeframe):
+        """Dossier d'une paire/timeframe"""
+        return os.path.join(self.root, symbol.replace('/', '-'), timeframe)
+
+    @staticmethod
+    def day_key(timestamp_ms):
+        """Partition (YYYY-MM-DD UTC) d'un timestamp en ms"""
+        return pd.Timestamp(int(timestamp_ms) // DAY_MS * DAY_MS, unit='ms').strftime('%Y-%m-%d')
+
+    @staticmethod
+    def day_start(day):
+        """Timestamp (ms) du début d'une partition"""
+        return int(pd.Timestamp(day).value // 1_000_000)
+
+    def days(self, symbol, timeframe):
+        """Partitions disponibles, triées"""
+        path = self.series_dir(symbol, timeframe)
+        if not os.path.isdir(path):
+            return []
+        return sorted(
+            day for day in os.listdir(path)
+            if not day.startswith('.') and os.path.exists(os.path.join(path, day, 'timestamp.npy'))
+        )
+
+    # ═══════════════════════════════════════════════════════════
+    # 📖 LECTURE
+    # ═══════════════════════════════════════════════════════════
+
+    def load_day(self, symbol, timeframe, day, mmap=True):
+        """
+        Colonnes d'une partition (vues memory-mappées, lecture seule)
+
+        Returns:
+            dict: {colonne: np.ndarray} ou None si absente
+        """
+        path = os.path.join(self.series_dir(symbol, timeframe), day)
+        if not os.path.exists(os.path.join(path, 'timestamp.npy')):
+            return None
+
+        mode = 'r' if mmap else None
+        try:
+            return {
+                column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode=mode)
+                for column in self.COLUMNS
+            }
+        except FileNotFoundError:
+            # Partition déplacée pendant son remplacement (_write_day)
+            return None
+
+    def load(self, symbol, timeframe, start=None, end=None):
+        """
+        Colonnes sur une plage [start, end] (ms, bornes incluses)
+
+        Une plage contenue dans un seul jour est renvoyée sans copie
+        (vues sur les fichiers mappés).
+
+        Returns:
+            dict: {colonne: np.ndarray} (vide si rien en cache)
+        """
+        days = self.days(symbol, timeframe)
+        if start is not None:
+            first = self.day_key(start)
+            days = [day for day in days if day >= first]
+        if end is not None:
+            last = self.day_key(end)
+            days = [day for day in days if day <= last]
+
+        parts = []
+        for day in days:
+            data = self.load_day(symbol, timeframe, day)
+            for _ in range(self.LOAD_RETRIES):
+                if data is not None:
+                    break
+                # Remplacement en cours par un autre process : la partition revient aussitôt
+                time.sleep(0.005)
+                data = self.load_day(symbol, timeframe, day)
+            if data is None:
+                continue
+
+            timestamps = data['timestamp']
+
+            lo = 0 if start is None else np.searchsorted(timestamps, start, side='left')
+            hi = len(timestamps) if end is None else np.searchsorted(timestamps, end, side='right')
+            if hi > lo:
+                parts.append({column: values[lo:hi] for column, values in data.items()})
+
+        if not parts:
+            return {column: np.empty(0, dtype=np.int64 if column == 'timestamp' else np.float64)
+                    for column in self.COLUMNS}
+        if len(parts) == 1:
+            return parts[0]
+
+        return {column: np.concatenate([part[column] for part in parts]) for column in self.COLUMNS}
+
+    def load_dataframe(self, symbol, timeframe, start=None, end=None):
+        """
+        Plage en DataFrame (même format que get_historical_data)
+
+        Returns:
+            DataFrame: timestamp, open, high, low, close, volume
+        """
+        df = pd.DataFrame(self.load(symbol, timeframe, start, end))
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def missing_ranges(self, symbol, timeframe, start, end, timeframe_ms):
+        """
+        Plages de bougies absentes du cache entre start et end (ms, incluses)
+
+        Returns:
+            list: [(premier timestamp manquant, dernier timestamp manquant), ...]
+        """
+        start = start // timeframe_ms * timeframe_ms
+        end = end // timeframe_ms * timeframe_ms
+        if end < start:
+            return []
+
+        timestamps = np.asarray(self.load(symbol, timeframe, start, end)['timestamp'])
+        # Ignore d'éventuels timestamps hors grille
+        timestamps = timestamps[timestamps % timeframe_ms == 0]
+
+        if len(timestamps) == 0:
+            return [(start, end)]
+
+        ranges = []
+        if timestamps[0] > start:
+            ranges.append((start, int(timestamps[0]) - timeframe_ms))
+
+        gaps = np.flatnonzero(np.diff(timestamps) > timeframe_ms)
+        for idx in gaps:
+            ranges.append((int(timestamps[idx]) + timeframe_ms, int(timestamps[idx + 1]) - timeframe_ms))
+
+        if timestamps[-1] < end:
+            ranges.append((int(timestamps[-1]) + timeframe_ms, end))
+
+        return ranges
+
+    # ═══════════════════════════════════════════════════════════
+    # ✏️ ÉCRITURE
+    # ═══════════════════════════════════════════════════════════
+
+    def append(self, symbol, timeframe, ohlcv):
+        """
+        Ajoute des bougies (format ccxt ou dict de colonnes)
+
+        Les timestamps déjà présents sont écrasés par la nouvelle version.
+
+        Returns:
+            int: Nombre de bougies écrites (après fusion)
+        """
+        if isinstance(ohlcv, dict):
+            new = {column: np.asarray(ohlcv[column]) for column in self.COLUMNS}
+        else:
+            if len(ohlcv) == 0:
+                return 0
+            array = np.asarray(ohlcv, dtype=np.float64)
+            new = {column: array[:, i] for i, column in enumerate(self.COLUMNS)}
+
+        new['timestamp'] = new['timestamp'].astype(np.int64)
+        if len(new['timestamp']) == 0:
+            return 0
+
+        day_ids = new['timestamp'] // DAY_MS
+        written = 0
+
+        for day_id in np.unique(day_ids):
+            mask = day_ids == day_id
+            day = self.day_key(int(day_id) * DAY_MS)
+            chunk = {column: values[mask] for column, values in new.items()}
+
+            existing = self.load_day(symbol, timeframe, day, mmap=False)
+            if existing is not None:
+                # Nouvelles versions en dernier : gardées par le dédoublonnage
+                chunk = {column: np.concatenate([existing[column], chunk[column]])
+                         for column in self.COLUMNS}
+
+            # Tri stable + dernière occurrence de chaque timestamp
+            order = np.argsort(chunk['timestamp'], kind='stable')
+            timestamps = chunk['timestamp'][order]
+            keep = np.append(timestamps[1:] != timestamps[:-1], True)
+            merged = {column: values[order][keep] for column, values in chunk.items()}
+
+            self._write_day(symbol, timeframe, day, merged)
+            written += int(mask.sum())
+
+        return written
+
+    def _write_day(self, symbol, timeframe, day, columns):
+        """Écrit une partition dans un dossier temporaire puis la remplace"""
+        series = self.series_dir(symbol, timeframe)
+        final_path = os.path.join(series, day)
+        tmp_path = os.path.join(series, f".{day}.tmp{os.getpid()}")
+
+        os.makedirs(tmp_path, exist_ok=True)
+        for column in self.COLUMNS:
+            dtype = np.int64 if column == 'timestamp' else np.float64
+            np.save(os.path.join(tmp_path, f"{column}.npy"), np.ascontiguousarray(columns[column], dtype=dtype))
+
+        if os.path.exists(final_path):
+            old_path = os.path.join(series, f".{day}.old{os.getpid()}")
+            os.replace(final_path, old_path)
+            os.replace(tmp_path, final_path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.replace(tmp_path, final_path)
+
+    def clear(self, symbol, timeframe):
+        """Supprime le cache d'une paire/timeframe"""
+        shutil.rmtree(self.series_dir(symbol, timeframe), ignore_errors=True)
+
+
+# Test du module
+if __name__ == "__main__":
+    import tempfile
+
+    print("🚀 Test du Candle Cache APEX")
+
+    with tempfile.TemporaryDirectory() as root:
+        cache = CandleCache(root)
+        n = 3 * 1440
+        timestamps = 1_700_000_000_000 // 60000 * 60000 + np.arange(n, dtype=np.int64) * 60000
+        close = 3000 + np.cumsum(np.random.normal(0, 1, n))
+        ohlcv = {'timestamp': timestamps, 'open': close, 'high': close + 1,
+                 'low': close - 1, 'close': close, 'volume': np.ones(n)}
+
+        cache.append('ETH/USDT', '1m', ohlcv)
+        print(f"\n✅ {n} bougies écrites sur {len(cache.days('ETH/USDT', '1m'))} jours")
+
+        start = time.perf_counter()
+        df = cache.load_dataframe('ETH/USDT', '1m')
+        print(f"⚡ Chargement: {len(df)} bougies en {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        missing = cache.missing_ranges('ETH/USDT', '1m', int(timestamps[0]),
+                                       int(timestamps[-1]) + 10 * 60000, 60000)
+        print(f"🔍 Plages manquantes: {len(missing)}")
@@ -0,0 +1,282 @@
+# candle_frame.py - Bougies en colonnes NumPy pour le chemin temps réel (APEX)
+
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# Colonnes d'indicateurs (mêmes noms que AdvancedIndicators.calculate_all)
+INDICATOR_COLUMNS = [
+    'ema_fast', 'ema_medium', 'ema_slow', 'ema_trend',
+    'rsi',
+    'macd', 'macd_signal', 'macd_diff',
+    'bb_middle', 'bb_upper', 'bb_lower', 'bb_bandwidth',
+    'atr',
+    'stoch_k', 'stoch_d',
+    'volume_sma', 'volume_ratio', 'obv',
+    'supertrend', 'supertrend_direction',
+    'cci',
+    'williams_r'
+]
+
+# Bougies gardées dans CandleSnapshot.recent (régime de marché sur 50 bougies)
+SNAPSHOT_WINDOW = 50
+
+# Une bougie figée : valeurs Python, None si la colonne est absente
+CandleRow = namedtuple('CandleRow', OHLCV_COLUMNS + INDICATOR_COLUMNS,
+                       defaults=(None,) * (len(OHLCV_COLUMNS) + len(INDICATOR_COLUMNS)))
+
+# Photo d'un tick partagée par toutes les couches de l'IA
+#   length: nombre de bougies, last / prev: CandleRow,
+#   recent: CandleFrame des dernières bougies (vues en lecture seule)
+CandleSnapshot = namedtuple('CandleSnapshot', ['length', 'last', 'prev', 'recent'])
+
+
+class CandleFrame:
+    """
+    Conteneur de bougies léger : un ndarray contigu par colonne
+
+    Remplace le DataFrame pandas sur le chemin temps réel (indicateurs,
+    patterns, S/R, volume profile, couches de l'IA) :
+    - frame['close'] renvoie directement le ndarray (pas de Series)
+    - last() / prev() lisent un scalaire en O(1), sans objet intermédiaire
+    - tail() / window() renvoient des vues (aucune copie des colonnes)
+    - timestamps en int64 (ms), prix et volumes en float64 (ou float32)
+
+    from_pandas() / to_pandas() gardent la compatibilité avec le reste du code.
+    """
+
+    __slots__ = ('_columns', '_length')
+
+    def __init__(self, columns=None):
+        """
+        Args:
+            columns: dict {colonne: ndarray} de même longueur
+        """
+        self._columns = {}
+        self._length = 0
+        for name, values in (columns or {}).items():
+            self[name] = values
+
+    # ═══════════════════════════════════════════════════════════
+    # 🔄 CONVERSIONS
+    # ═══════════════════════════════════════════════════════════
+
+    @classmethod
+    def from_ohlcv(cls, ohlcv, dtype=np.float64):
+        """
+        Construit depuis des bougies ccxt [[timestamp, open, high, low, close, volume], ...]
+        """
+        array = np.asarray(ohlcv, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+
+        frame = cls()
+        frame['timestamp'] = array[:, 0].astype(np.int64)
+        for i, column in enumerate(OHLCV_COLUMNS[1:], start=1):
+            frame[column] = np.ascontiguousarray(array[:, i], dtype=dtype)
+        return frame
+
+    @classmethod
+    def from_pandas(cls, df, dtype=None):
+        """
+        Construit depuis un DataFrame (timestamp datetime ou en ms)
+
+        Args:
+            dtype: Type des colonnes de prix (défaut: conservé)
+        """
+        frame = cls()
+        for column in df.columns:
+            if column == 'timestamp':
+                frame[column] = timestamps_ms(df)
+            elif dtype is not None and column in OHLCV_COLUMNS:
+                frame[column] = df[column].to_numpy(dtype=dtype)
+            else:
+                frame[column] = df[column].to_numpy()
+        return frame
+
+    def to_pandas(self):
+        """
+        DataFrame équivalent (même format que get_historical_data)
+
+        Returns:
+            DataFrame: Colonnes copiées, timestamp en datetime
+        """
+        df = pd.DataFrame({name: values.copy() for name, values in self._columns.items()})
+        if 'timestamp' in df.columns:
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def copy(self):
+        """Copie indépendante des colonnes"""
+        return CandleFrame({name: values.copy() for name, values in self._columns.items()})
+
+    # ═══════════════════════════════════════════════════════════
+    # 📊 ACCÈS
+    # ═══════════════════════════════════════════════════════════
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __setitem__(self, name, values):
+        values = np.asarray(values)
+        if self._columns and len(values) != self._length:
+            raise ValueError(f"Colonne {name}: {len(values)} valeurs pour {self._length} bougies")
+        self._columns[name] = values
+        self._length = len(values)
+
+    @property
+    def columns(self):
+        """Noms des colonnes"""
+        return list(self._columns)
+
+    def get(self, name, default=None):
+        """Colonne ou default si absente"""
+        return self._columns.get(name, default)
+
+    def last(self, name):
+        """Valeur de la dernière bougie (O(1))"""
+        return self._columns[name][self._length - 1].item()
+
+    def prev(self, name):
+        """Valeur de l'avant-dernière bougie (O(1))"""
+        return self._columns[name][self._length - 2].item()
+
+    def value(self, name, index):
+        """Valeur d'une bougie (index négatif accepté)"""
+        return self._columns[name][index].item()
+
+    def row(self, index=-1):
+        """
+        Bougie sous forme de dict {colonne: scalaire}
+
+        Returns:
+            dict: Valeurs Python de toutes les colonnes
+        """
+        return {name: values[index].item() for name, values in self._columns.items()}
+
+    def snapshot(self, window=SNAPSHOT_WINDOW):
+        """
+        Photo immuable du tick : dernière et avant-dernière bougie + fenêtre récente
+
+        Construite une fois par analyse puis passée à chaque couche,
+        au lieu de relire les colonnes dans chacune.
+
+        Args:
+            window: Bougies gardées dans recent
+
+        Returns:
+            CandleSnapshot
+        """
+        last = self._candle_row(self._length - 1) if self._length >= 1 else CandleRow()
+        prev = self._candle_row(self._length - 2) if self._length >= 2 else CandleRow()
+
+        recent = self.tail(window)
+        for values in recent._columns.values():
+            values.flags.writeable = False
+
+        return CandleSnapshot(self._length, last, prev, recent)
+
+    def _candle_row(self, index):
+        """CandleRow d'une bougie (None pour les colonnes absentes)"""
+        columns = self._columns
+        return CandleRow._make(
+            columns[name][index].item() if name in columns else None
+            for name in CandleRow._fields
+        )
+
+    # ═══════════════════════════════════════════════════════════
+    # 🪟 FENÊTRES (vues, sans copie)
+    # ═══════════════════════════════════════════════════════════
+
+    def window(self, start, end=None):
+        """Bougies [start, end) en vues sur les mêmes colonnes"""
+        frame = CandleFrame()
+        for name, values in self._columns.items():
+            frame._columns[name] = values[start:end]
+        frame._length = len(range(*slice(start, end).indices(self._length)))
+        return frame
+
+    def tail(self, n):
+        """n dernières bougies (vues)"""
+        return self.window(max(self._length - n, 0))
+
+    def head(self, n):
+        """n premières bougies (vues)"""
+        return self.window(0, min(n, self._length))
+
+
+def timestamps_ms(data):
+    """
+    Timestamps en ms (int64) d'un DataFrame, d'un CandleFrame ou d'un dict de colonnes
+    """
+    timestamps = data['timestamp']
+    if isinstance(timestamps, pd.Series):
+        if pd.api.types.is_datetime64_any_dtype(timestamps):
+            return timestamps.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        return timestamps.to_numpy(dtype=np.int64)
+
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        return timestamps.astype('datetime64[ms]').astype(np.int64)
+    return timestamps.astype(np.int64, copy=False)
+
+
+def candle_snapshot(data):
+    """
+    CandleSnapshot d'un tick (inchangé si déjà construit)
+
+    Args:
+        data: CandleSnapshot, CandleFrame, DataFrame ou dict de colonnes
+    """
+    if isinstance(data, CandleSnapshot):
+        return data
+    return as_candle_frame(data).snapshot()
+
+
+def as_candle_frame(data, dtype=None):
+    """
+    Adaptateur : CandleFrame (inchangé), DataFrame ou dict de colonnes
+
+    Returns:
+        CandleFrame ou None
+    """
+    if data is None or isinstance(data, CandleFrame):
+        return data
+    if isinstance(data, pd.DataFrame):
+        return CandleFrame.from_pandas(data, dtype)
+    return CandleFrame(data)
+
+
+# Test du module
+if __name__ == "__main__":
+    import time
+
+    print("🚀 Test du Candle Frame APEX")
+
+    n = 500
+    close = 3000 + np.cumsum(np.random.normal(0, 1, n))
+    ohlcv = np.column_stack([1_700_000_000_000 + np.arange(n) * 60000,
+                             close, close + 1, close - 1, close, np.ones(n)])
+
+    frame = CandleFrame.from_ohlcv(ohlcv)
+    df = frame.to_pandas()
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        frame.last('close')
+    frame_us = (time.perf_counter() - start) * 100
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        df.iloc[-1]['close']
+    pandas_us = (time.perf_counter() - start) * 100
+
+    print(f"\n✅ {len(frame)} bougies, colonnes: {frame.columns}")
+    print(f"⚡ Dernier close: {frame_us:.2f} µs (pandas iloc: {pandas_us:.2f} µs)")
+    print(f"🪟 tail(50) sans copie: {np.shares_memory(frame.tail(50)['close'], frame['close'])}")
@@ -0,0 +1,174 @@
+# candle_store.py - Buffer glissant de bougies en mémoire (APEX)
+
+import os
+import numpy as np
+import pandas as pd
+from candle_frame import CandleFrame
+
+class CandleStore:
+    """
+    Buffer glissant de bougies OHLCV indexé par timestamp
+    Garde les `maxlen` dernières bougies, fusionne les nouvelles et
+    écrase la bougie en cours de formation
+    """
+
+    COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+    def __init__(self, maxlen=500):
+        self.maxlen = maxlen
+
+        # Capacité doublée : on ne compacte que lorsque le buffer est plein
+        # (coût amorti O(1) par bougie, fenêtre toujours contiguë)
+        self._capacity = maxlen * 2
+        self._data = {
+            'timestamp': np.zeros(self._capacity, dtype=np.int64),
+            'open': np.zeros(self._capacity, dtype=np.float64),
+            'high': np.zeros(self._capacity, dtype=np.float64),
+            'low': np.zeros(self._capacity, dtype=np.float64),
+            'close': np.zeros(self._capacity, dtype=np.float64),
+            'volume': np.zeros(self._capacity, dtype=np.float64)
+        }
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def last_timestamp(self):
+        """Timestamp (ms) de la dernière bougie stockée"""
+        if self._end == self._start:
+            return None
+        return int(self._data['timestamp'][self._end - 1])
+
+    def clear(self):
+        """Vide le buffer"""
+        self._start = 0
+        self._end = 0
+
+    def merge(self, ohlcv):
+        """
+        Fusionne des bougies au format ccxt [[timestamp, open, high, low, close, volume], ...]
+
+        - Timestamp plus récent : ajout
+        - Timestamp déjà présent : écrase (bougie en cours / révisée)
+        - Timestamp plus ancien que la fenêtre : ignoré
+
+        Returns:
+            int: Nombre de nouvelles bougies ajoutées
+        """
+        added = 0
+
+        for candle in ohlcv:
+            timestamp = int(candle[0])
+            last_timestamp = self.last_timestamp
+
+            if last_timestamp is not None and timestamp <= last_timestamp:
+                # Bougie déjà connue : on écrase la version stockée
+                window = self._data['timestamp'][self._start:self._end]
+                idx = np.searchsorted(window, timestamp)
+                if idx < len(window) and window[idx] == timestamp:
+                    self._write(self._start + idx, candle)
+                continue
+
+            if self._end == self._capacity:
+                self._compact()
+
+            self._write(self._end, candle)
+            self._end += 1
+            added += 1
+
+            # Fenêtre glissante : on oublie la plus ancienne
+            if self._end - self._start > self.maxlen:
+                self._start += 1
+
+        return added
+
+    def _write(self, idx, candle):
+        """Écrit une bougie à la position idx du buffer"""
+        self._data['timestamp'][idx] = int(candle[0])
+        self._data['open'][idx] = candle[1]
+        self._data['high'][idx] = candle[2]
+        self._data['low'][idx] = candle[3]
+        self._data['close'][idx] = candle[4]
+        self._data['volume'][idx] = candle[5]
+
+    def _compact(self):
+        """Ramène la fenêtre courante au début du buffer"""
+        length = self._end - self._start
+        for values in self._data.values():
+            values[:length] = values[self._start:self._end]
+        self._start = 0
+        self._end = length
+
+    def to_dataframe(self):
+        """
+        Construit le DataFrame OHLCV (même format que get_historical_data)
+
+        Returns:
+            DataFrame: timestamp, open, high, low, close, volume
+        """
+        window = slice(self._start, self._end)
+
+        df = pd.DataFrame({
+            column: self._data[column][window].copy()
+            for column in self.COLUMNS
+        })
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+
+        return df
+
+    def to_frame(self):
+        """
+        Construit le CandleFrame OHLCV (colonnes NumPy, timestamp en ms)
+
+        Returns:
+            CandleFrame: Copie de la fenêtre courante
+        """
+        window = slice(self._start, self._end)
+
+        return CandleFrame({
+            column: self._data[column][window].copy()
+            for column in self.COLUMNS
+        })
+
+
+def load_ohlcv_csv(path):
+    """
+    Charge un historique OHLCV stocké en CSV
+    (colonnes timestamp, open, high, low, close, volume - format ccxt)
+
+    Returns:
+        DataFrame: OHLCV trié par timestamp
+    """
+    df = pd.read_csv(path, usecols=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+
+    # Timestamps en texte (DataFrame sauvegardé tel quel) → millisecondes
+    if not pd.api.types.is_numeric_dtype(df['timestamp']):
+        df['timestamp'] = pd.to_datetime(df['timestamp']).astype('datetime64[ms]').astype('int64')
+
+    df = df.sort_values('timestamp', kind='stable').drop_duplicates('timestamp', keep='last')
+
+    return df.reset_index(drop=True)
+
+
+def symbol_timeframe_from_path(path):
+    """
+    Déduit (symbol, timeframe) du nom de fichier : BTC-USDT_1m.csv → (BTC/USDT, 1m)
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    symbol, _, timeframe = name.rpartition('_')
+
+    return symbol.replace('-', '/'), timeframe
+
+
+# Test du module
+if __name__ == "__main__":
+    print("🚀 Test du Candle Store")
+
+    store = CandleStore(maxlen=3)
+    store.merge([[60000 * i, 1, 2, 0.5, 1.5, 10] for i in range(5)])
+    store.merge([[240000, 1, 3, 0.5, 2.5, 12]])
+
+    print(f"\n✅ {len(store)} bougies en mémoire (dernière: {store.last_timestamp})")
+    print(store.to_dataframe())
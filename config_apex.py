@@ -1,6 +1,7 @@
 # config_apex.py - Configuration PRO du bot APEX PREDATOR
 
 import os
+import sys
 
 # ═══════════════════════════════════════════════════════════
 # 🔐 BINANCE API (CHARGÉES DEPUIS VARIABLES D'ENVIRONNEMENT)
@@ -55,10 +56,17 @@ FIRST_TARGET_PERCENT = 0.015   # 1.5% - prend 50% de profit
 SECOND_TARGET_PERCENT = 0.025  # 2.5% - prend 30% de profit
 THIRD_TARGET_PERCENT = 0.04    # 4% - laisse runner 20%
 
-# Trailing stop
+# Trailing stop (bot live, gardien et backtest)
+TRAILING_STOP_ENABLED = False     # Stop remonté derrière le plus haut
 TRAILING_STOP_ACTIVATION = 0.012  # Active à +1.2%
 TRAILING_STOP_DISTANCE = 0.008    # Distance 0.8%
 
+# Ordres de protection côté exchange (mode réel, protective_orders.py)
+PROTECTIVE_ORDERS = None               # None (désactivé), 'oco' (stop + target par tranche) ou 'stop_limit' (stop seul)
+PROTECTIVE_STOP_LIMIT_OFFSET = 0.002   # Limite du stop-limit 0.2% sous son déclenchement
+PROTECTIVE_SYNC_INTERVAL = 2.0         # Polling de l'état des ordres (secondes)
+PROTECTIVE_AMEND_MIN_STEP = 0.001      # Cancel/replace si le stop a monté d'au moins 0.1%
+
 # ═══════════════════════════════════════════════════════════
 # 🧠 APEX SCORE - Seuils d'entrée (V2.3 - QUALITÉ > QUANTITÉ)
 # ═══════════════════════════════════════════════════════════
@@ -117,6 +125,9 @@ STOCH_SMOOTH = 3
 # Volume Profile
 VOLUME_PROFILE_PERIODS = 100  # Nombre de périodes à analyser
 VOLUME_SPIKE_THRESHOLD = 1.5  # Volume spike si > 150% de la moyenne
+ROLLING_VOLUME_PROFILE = False  # Profil incrémental glissant (session / multi-jours)
+ROLLING_PROFILE_PERIODS = 1440  # Fenêtre du profil glissant (1440 bougies 1m = 1 jour)
+VOLUME_PROFILE_TICK_SIZE = 0.5  # Pas de la grille de prix du profil glissant
 
 # VWAP
 VWAP_DEVIATION_THRESHOLD = 0.005  # 0.5% d'écart acceptable
@@ -148,6 +159,12 @@ STRATEGY_WEIGHTS = {
     'support_resistance': 0.10
 }
 
+# Fiabilité des patterns apprise sur l'historique (pattern_reliability.py)
+PATTERN_RELIABILITY_FILE = 'data/pattern_reliability.json'  # None = valeurs par défaut
+PATTERN_RELIABILITY_MIN_SAMPLES = 30   # Occurrences minimum pour remplacer la valeur par défaut
+PATTERN_RELIABILITY_HORIZONS = [1, 3, 5, 10]  # Horizons mesurés (en bougies)
+PATTERN_RELIABILITY_HORIZON = 5        # Horizon retenu pour la fiabilité
+
 # ═══════════════════════════════════════════════════════════
 # 🛡️ GESTION DU RISQUE PRO
 # ═══════════════════════════════════════════════════════════
@@ -161,6 +178,10 @@ MAX_CONSECUTIVE_LOSSES = 4        # Arrêt après 4 pertes consécutives
 MIN_RISK_REWARD_RATIO = 2.0       # R/R minimum 2:1
 MAX_POSITION_RISK = 0.015         # 1.5% du capital max par trade
 
+# Portefeuille multi-paires (multi_symbol_apex.py)
+PORTFOLIO_MAX_OPEN_POSITIONS = 5  # Positions simultanées max (toutes paires)
+PORTFOLIO_MAX_EXPOSURE = 0.60     # 60% du capital investi max (toutes paires)
+
 # Période d'observation avant 1er trade
 MIN_OBSERVATION_TIME = 1800       # 30 minutes (en secondes)
 MIN_CANDLES_BEFORE_TRADE = 100    # 100 bougies minimum avant trade
@@ -228,10 +249,49 @@ BINANCE_FEE = 0.001            # 0.1% de frais (réduit à 0.075% avec BNB)
 
 # Analyse
 DATA_FETCH_LIMIT = 500         # Nombre de bougies à récupérer
-ANALYSIS_INTERVAL = 10         # Analyse toutes les 10 secondes
+ANALYSIS_INTERVAL = 10         # Analyse toutes les 10 secondes (sans flux WebSocket)
+ASYNC_MAIN_LOOP = True         # Boucle asyncio (fetch / analyse / ordres en tâches séparées)
+ORDER_FLOW_INTERVAL = 50       # Polling de l'order flow en secondes (boucle asyncio)
+LATENCY_SAMPLES = 1000         # Latences gardées pour médiane / p95 (les plus récentes)
+POSITION_GUARDIAN_ENABLED = True  # Stop / targets / trailing contrôlés à chaque trade (thread dédié)
+GUARDIAN_POLL_INTERVAL = 1.0   # Polling du prix par le gardien sans trade reçu (secondes)
+INCREMENTAL_INDICATORS = True  # Indicateurs en streaming (O(1) par bougie)
+CLOSED_BAR_STRUCTURE = True    # S/R, Volume Profile et patterns calculés 1x par bougie clôturée
+
+# Requêtes REST
+API_WEIGHT_LIMIT = 6000        # Poids Binance autorisé par minute (partagé entre threads)
+COLLECTOR_MAX_WORKERS = 4      # Requêtes REST simultanées
+
+# Scan multi-paires
+MULTI_SYMBOLS = []             # Watchlist explicite (vide = top paires par volume)
+MULTI_TOP_N = 50               # Nombre de paires si watchlist vide
+MULTI_QUOTE = 'USDT'           # Devise de cotation des paires scannées
+MULTI_FETCH_WORKERS = 16       # Téléchargements simultanés (sous API_WEIGHT_LIMIT)
+MULTI_ANALYSIS_WORKERS = 4     # Analyses simultanées
+MULTI_SCAN_DELAY = 2           # Secondes après la clôture de bougie avant le scan
+MULTI_VERBOSE = False          # Affichages détaillés par paire (init des modules, bougies récupérées)
 
 # Cache
-CACHE_DURATION = 30            # Durée du cache en secondes
+CACHE_DURATION = 30            # Durée du cache en secondes (lectures API sans TTL dédié)
+CACHE_TTLS = {                 # TTL par endpoint (secondes, 0 = pas de cache)
+    'ticker': 1.0,
+    'order_book': 1.0,
+    'trades': 2.0,
+    'markets': 3600
+}
+CACHE_STALE_DURATION = 2.0     # Valeur périmée servie pendant son rafraîchissement
+CACHE_MAX_ENTRIES = 256        # Entrées max (éviction LRU)
+CANDLE_CACHE_ENABLED = False   # Cache disque des bougies clôturées (écrit dans CANDLE_CACHE_DIR)
+CANDLE_CACHE_DIR = 'data/candles'
+DOWNLOAD_WORKERS = 8           # Pages téléchargées simultanément (downloader_apex.py)
+
+# Streaming WebSocket (klines, aggTrades, carnet par diffs)
+STREAM_ENABLED = False         # Données temps réel par WebSocket (REST en secours)
+STREAM_URL = 'wss://stream.binance.com:9443/stream'
+STREAM_DEPTH_SPEED = '100ms'   # Fréquence des diffs du carnet (100ms ou 1000ms)
+STREAM_BOOK_DEPTH = 1000       # Profondeur du snapshot REST du carnet
+STREAM_TRADES_MAXLEN = 1000    # Trades gardés en mémoire
+STREAM_RECONNECT_MAX_DELAY = 30  # Backoff max entre reconnexions (secondes)
 
 # ═══════════════════════════════════════════════════════════
 # 🎨 AFFICHAGE
@@ -250,6 +310,7 @@ STATS_DISPLAY_FREQUENCY = 10    # Affiche stats toutes les 10 itérations
 # 📊 PROFILS PRE-CONFIGURÉS
 # ═══════════════════════════════════════════════════════════
 
+# Clé optionnelle 'overrides': {PARAMETRE: valeur} pour d'autres seuils (profils de l'optimiseur)
 PROFILES = {
     'dynamic': {
         'position_size': 0.16,
@@ -300,22 +361,65 @@ ACTIVE_PROFILE = 'dynamic'
 # 🔧 FONCTIONS UTILITAIRES
 # ═══════════════════════════════════════════════════════════
 
+# Correspondance clés de profil → paramètres de configuration
+PROFILE_PARAMETERS = {
+    'position_size': 'DEFAULT_POSITION_SIZE',
+    'min_apex_score': 'MIN_APEX_SCORE',
+    'stop_loss': 'STOP_LOSS_PERCENT',
+    'take_profit': 'TAKE_PROFIT_PERCENT',
+    'max_daily_trades': 'MAX_DAILY_TRADES'
+}
+
+class ConfigOverlay:
+    """
+    Vue de la configuration avec surcharges locales
+
+    Lit les paramètres du module (ou d'une autre vue) sauf ceux surchargés,
+    sans jamais modifier les globales : plusieurs jeux de paramètres peuvent
+    coexister (backtests, optimiseur multi-processus).
+
+    Exemple:
+        settings = ConfigOverlay(MIN_APEX_SCORE=80, DRY_RUN=True)
+        ai = ApexAI(settings=settings)
+    """
+
+    def __init__(self, base=None, **overrides):
+        self._base = base
+        self._overrides = overrides
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in self._overrides:
+            return self._overrides[name]
+        base = self._base if self._base is not None else sys.modules[__name__]
+        return getattr(base, name)
+
+    def overrides(self):
+        """Paramètres surchargés (dict)"""
+        return dict(self._overrides)
+
+def profile_overrides(profile_name):
+    """
+    Paramètres d'un profil sous forme de surcharges de configuration
+
+    Returns:
+        dict: {NOM_PARAMETRE: valeur}
+    """
+    profile = PROFILES[profile_name]
+
+    overrides = {name: profile[key] for key, name in PROFILE_PARAMETERS.items() if key in profile}
+    overrides.update(profile.get('overrides', {}))
+
+    return overrides
+
 def load_profile(profile_name):
     """Charge un profil de configuration"""
     if profile_name not in PROFILES:
         print(f"⚠️  Profil '{profile_name}' inconnu, utilisation du profil par défaut")
         profile_name = ACTIVE_PROFILE
     
-    profile = PROFILES[profile_name]
-    
-    global DEFAULT_POSITION_SIZE, MIN_APEX_SCORE, STOP_LOSS_PERCENT
-    global TAKE_PROFIT_PERCENT, MAX_DAILY_TRADES
-    
-    DEFAULT_POSITION_SIZE = profile['position_size']
-    MIN_APEX_SCORE = profile['min_apex_score']
-    STOP_LOSS_PERCENT = profile['stop_loss']
-    TAKE_PROFIT_PERCENT = profile['take_profit']
-    MAX_DAILY_TRADES = profile['max_daily_trades']
+    globals().update(profile_overrides(profile_name))
     
     print(f"✅ Profil '{profile_name}' chargé")
     print(f"   Position: {DEFAULT_POSITION_SIZE*100}%")
@@ -1,11 +1,17 @@
 # data_collector_apex.py - Collecteur de données Binance (APEX)
 
 import ccxt
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor
 import config_apex as config
 from logger_apex import get_logger
+from candle_store import CandleStore
+from candle_cache import CandleCache
+from rate_limiter import WeightRateLimiter, BINANCE_WEIGHTS, order_book_weight
+from ttl_cache import TTLCache
 
 class DataCollectorApex:
     """Collecteur de données depuis Binance - Version APEX"""
@@ -14,6 +20,25 @@ class DataCollectorApex:
         """Initialise la connexion Binance"""
         self.logger = get_logger()
 
+        # Buffers de bougies en mémoire par (symbol, timeframe)
+        self.candle_stores = {}
+
+        # Flux WebSocket (voir start_stream)
+        self.stream = None
+
+        # Cache disque des bougies clôturées
+        self.cache = CandleCache() if config.CANDLE_CACHE_ENABLED else None
+
+        # Requêtes REST concurrentes sous un budget de poids commun
+        self.rate_limiter = WeightRateLimiter(config.API_WEIGHT_LIMIT)
+        self.request_pool = ThreadPoolExecutor(max_workers=config.COLLECTOR_MAX_WORKERS,
+                                               thread_name_prefix="apex-rest")
+
+        # Cache TTL des lectures REST (prix, carnet, trades, marchés)
+        self.read_cache = TTLCache(maxsize=config.CACHE_MAX_ENTRIES,
+                                   ttl=config.CACHE_DURATION,
+                                   stale_ttl=config.CACHE_STALE_DURATION)
+
         try:
             self.exchange = ccxt.binance({
                 'apiKey': config.BINANCE_API_KEY,
@@ -25,7 +50,9 @@ class DataCollectorApex:
             })
 
             # Test de connexion
+            self.rate_limiter.acquire(BINANCE_WEIGHTS['load_markets'])
             self.exchange.load_markets()
+            self.read_cache.set(('markets',), self.exchange.markets, ttl=self._cache_ttl('markets'))
             print("✅ Connexion Binance établie")
             self.logger.info("Connexion Binance établie")
 
@@ -34,6 +61,81 @@ class DataCollectorApex:
             self.logger.error(f"Erreur connexion Binance: {e}")
             self.exchange = None
 
+    # ═══════════════════════════════════════════════════════════
+    # 🗄️ CACHE DES LECTURES
+    # ═══════════════════════════════════════════════════════════
+
+    @staticmethod
+    def _cache_ttl(endpoint):
+        """TTL d'un endpoint (CACHE_TTLS, sinon CACHE_DURATION)"""
+        return config.CACHE_TTLS.get(endpoint, config.CACHE_DURATION)
+
+    def _cached(self, endpoint, key, fetch):
+        """
+        Lecture REST via le cache TTL
+
+        Args:
+            endpoint: Nom de l'endpoint ('ticker', 'order_book', ...)
+            key: Paramètres de la lecture (tuple)
+            fetch: Fonction qui interroge l'API (None en cas d'erreur)
+        """
+        return self.read_cache.get((endpoint,) + key, fetch, ttl=self._cache_ttl(endpoint))
+
+    def load_markets(self, reload=False):
+        """
+        Marchés Binance (gardés CACHE_TTLS['markets'] secondes)
+
+        Args:
+            reload: Ignore le cache et recharge
+
+        Returns:
+            dict: Marchés ccxt ou None
+        """
+        if self.exchange is None:
+            return None
+
+        if reload:
+            self.read_cache.invalidate(('markets',))
+
+        def fetch():
+            try:
+                self.rate_limiter.acquire(BINANCE_WEIGHTS['load_markets'])
+                self.exchange.load_markets(reload=True)
+                return self.exchange.markets
+            except Exception as e:
+                print(f"❌ Erreur marchés: {e}")
+                return None
+
+        return self._cached('markets', (), fetch)
+
+    def start_stream(self, symbols=None, timeframe=None):
+        """
+        Démarre le flux WebSocket temps réel dans un thread dédié
+
+        Tant que le flux est connecté et synchronisé, get_live_data,
+        get_current_price, get_order_book et get_recent_trades le lisent
+        en mémoire au lieu d'interroger l'API REST.
+
+        Args:
+            symbols: Paires suivies (défaut: [config.SYMBOL])
+            timeframe: Timeframe des klines (défaut: config)
+
+        Returns:
+            StreamCollectorApex ou None si indisponible
+        """
+        from stream_collector_apex import StreamCollectorApex, aiohttp
+
+        if self.exchange is None or aiohttp is None:
+            print("⚠️  Streaming indisponible - mode REST")
+            return None
+
+        self.stream = StreamCollectorApex(self.exchange, symbols, timeframe,
+                                          limit=config.DATA_FETCH_LIMIT)
+        self.stream.start_in_thread()
+        self.logger.info(f"Flux WebSocket démarré: {self.stream.symbols}")
+
+        return self.stream
+
     def _retry_api_call(self, func, max_retries=3, delay=2):
         """
         Exécute un appel API avec retry en cas d'erreur
@@ -63,10 +165,57 @@ class DataCollectorApex:
                 self.logger.error(f"Erreur API: {e}")
                 return None
     
+    def _fetch_cached(self, symbol, timeframe, limit):
+        """
+        Fenêtre des `limit` dernières bougies via le cache disque
+
+        Seules les plages absentes du cache sont demandées à l'API (par pages
+        de 1000), plus la bougie en cours qui n'est jamais mise en cache.
+
+        Returns:
+            dict: {colonne: np.ndarray}
+        """
+        timeframe_ms = self.exchange.parse_timeframe(timeframe) * 1000
+        current_open = self.exchange.milliseconds() // timeframe_ms * timeframe_ms
+        start = current_open - (limit - 1) * timeframe_ms
+        last_closed = current_open - timeframe_ms
+
+        ranges = self.cache.missing_ranges(symbol, timeframe, start, last_closed, timeframe_ms)
+        if ranges and ranges[-1][1] == last_closed:
+            ranges[-1] = (ranges[-1][0], current_open)
+        else:
+            ranges.append((current_open, current_open))
+
+        forming = []
+        for range_start, range_end in ranges:
+            since = range_start
+            while since <= range_end:
+                count = min(1000, (range_end - since) // timeframe_ms + 1)
+                self.rate_limiter.acquire(BINANCE_WEIGHTS['fetch_ohlcv'])
+                batch = self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=count)
+                if not batch:
+                    break
+
+                self.cache.append(symbol, timeframe, [c for c in batch if c[0] < current_open])
+                forming = [c for c in batch if c[0] >= current_open] or forming
+                since = batch[-1][0] + timeframe_ms
+
+        data = self.cache.load(symbol, timeframe, start, last_closed)
+        if forming:
+            data = {
+                column: np.append(values, forming[-1][i])
+                for i, (column, values) in enumerate(data.items())
+            }
+
+        return data
+
     def get_historical_data(self, symbol=None, timeframe=None, limit=500):
         """
         Récupère les données historiques avec retry automatique
 
+        Avec le cache disque activé, seules les bougies absentes du cache
+        sont téléchargées.
+
         Args:
             symbol: Paire (défaut: config)
             timeframe: Timeframe (défaut: config)
@@ -86,7 +235,11 @@ class DataCollectorApex:
 
         def fetch_data():
             # Récupère les bougies
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            if self.cache is not None:
+                ohlcv = self._fetch_cached(symbol, timeframe, limit)
+            else:
+                self.rate_limiter.acquire(BINANCE_WEIGHTS['fetch_ohlcv'])
+                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
 
             # Convertit en DataFrame
             df = pd.DataFrame(
@@ -104,44 +257,136 @@ class DataCollectorApex:
 
         # Utilise le retry mechanism
         return self._retry_api_call(fetch_data)
+
+    def get_live_data(self, symbol=None, timeframe=None, limit=500, as_frame=False, verbose=None):
+        """
+        Récupère les bougies via le buffer incrémental en mémoire
+
+        Le 1er appel charge toute la fenêtre, les suivants ne demandent que
+        les bougies depuis le dernier timestamp stocké (since=) et écrasent
+        la bougie en cours de formation.
+
+        Args:
+            symbol: Paire (défaut: config)
+            timeframe: Timeframe (défaut: config)
+            limit: Taille de la fenêtre glissante
+            as_frame: Renvoie un CandleFrame (chemin temps réel, sans pandas)
+            verbose: Affiche les bougies reçues (défaut: config.VERBOSE)
+
+        Returns:
+            DataFrame: OHLCV (CandleFrame si as_frame)
+        """
+        if self.exchange is None:
+            print("❌ Pas de connexion Binance")
+            return None
+
+        if symbol is None:
+            symbol = config.SYMBOL
+        if timeframe is None:
+            timeframe = config.TIMEFRAME
+        if verbose is None:
+            verbose = config.VERBOSE
+
+        # Flux WebSocket à jour : pas d'appel REST
+        if self.stream is not None and self.stream.has_candles(symbol, timeframe):
+            if as_frame:
+                return self.stream.get_candles(symbol, as_frame=True).tail(limit)
+            return self.stream.get_candles(symbol).tail(limit).reset_index(drop=True)
+
+        key = (symbol, timeframe)
+        store = self.candle_stores.get(key)
+        if store is None or store.maxlen != limit:
+            store = CandleStore(maxlen=limit)
+            self.candle_stores[key] = store
+
+        def fetch_data():
+            timeframe_ms = self.exchange.parse_timeframe(timeframe) * 1000
+            last_timestamp = store.last_timestamp
+            now = self.exchange.milliseconds()
+
+            # Buffer vide ou trop en retard : recharge la fenêtre complète
+            if last_timestamp is None or now - last_timestamp >= limit * timeframe_ms:
+                store.clear()
+                if self.cache is not None:
+                    data = self._fetch_cached(symbol, timeframe, limit)
+                    ohlcv = np.column_stack([data[column] for column in CandleCache.COLUMNS])
+                else:
+                    self.rate_limiter.acquire(BINANCE_WEIGHTS['fetch_ohlcv'])
+                    ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+                added = store.merge(ohlcv)
+            else:
+                self.rate_limiter.acquire(BINANCE_WEIGHTS['fetch_ohlcv'])
+                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since=last_timestamp)
+                added = store.merge(ohlcv)
+
+                # Nouvelle bougie : les précédentes sont clôturées → cache disque
+                if added and self.cache is not None:
+                    current_open = now // timeframe_ms * timeframe_ms
+                    self.cache.append(symbol, timeframe, [c for c in ohlcv if c[0] < current_open])
+
+            if verbose:
+                print(f"✅ {added} nouvelle(s) bougie(s) pour {symbol} ({timeframe}) - {len(store)} en mémoire")
+
+            return store.to_frame() if as_frame else store.to_dataframe()
+
+        return self._retry_api_call(fetch_data)
     
     def get_current_price(self, symbol=None):
-        """Récupère le prix actuel"""
+        """Récupère le prix actuel (gardé CACHE_TTLS['ticker'] secondes)"""
         if self.exchange is None:
             return None
         
         if symbol is None:
             symbol = config.SYMBOL
+
+        if self.stream is not None:
+            price = self.stream.get_last_price(symbol)
+            if price is not None:
+                return price
         
-        try:
-            ticker = self.exchange.fetch_ticker(symbol)
-            return ticker['last']
-        except Exception as e:
-            print(f"❌ Erreur prix: {e}")
-            return None
+        def fetch():
+            try:
+                self.rate_limiter.acquire(BINANCE_WEIGHTS['fetch_ticker'])
+                ticker = self.exchange.fetch_ticker(symbol)
+                return ticker['last']
+            except Exception as e:
+                print(f"❌ Erreur prix: {e}")
+                return None
+
+        return self._cached('ticker', (symbol,), fetch)
     
     def get_order_book(self, symbol=None, limit=20):
         """
         Récupère le carnet d'ordres (Order Book)
-        Pour analyse Order Flow
+        Pour analyse Order Flow (gardé CACHE_TTLS['order_book'] secondes)
         """
         if self.exchange is None:
             return None
         
         if symbol is None:
             symbol = config.SYMBOL
+
+        # Carnet local synchronisé par diffs
+        if self.stream is not None:
+            order_book = self.stream.get_order_book(symbol, limit)
+            if order_book is not None:
+                return order_book
         
-        try:
-            order_book = self.exchange.fetch_order_book(symbol, limit=limit)
-            
-            return {
-                'bids': order_book['bids'],  # Ordres d'achat
-                'asks': order_book['asks'],  # Ordres de vente
-                'timestamp': order_book['timestamp']
-            }
-        except Exception as e:
-            print(f"❌ Erreur order book: {e}")
-            return None
+        def fetch():
+            try:
+                self.rate_limiter.acquire(order_book_weight(limit))
+                order_book = self.exchange.fetch_order_book(symbol, limit=limit)
+                
+                return {
+                    'bids': order_book['bids'],  # Ordres d'achat
+                    'asks': order_book['asks'],  # Ordres de vente
+                    'timestamp': order_book['timestamp']
+                }
+            except Exception as e:
+                print(f"❌ Erreur order book: {e}")
+                return None
+
+        return self._cached('order_book', (symbol, limit), fetch)
     
     def analyze_order_book_imbalance(self, order_book):
         """
@@ -191,24 +436,33 @@ class DataCollectorApex:
         }
     
     def get_recent_trades(self, symbol=None, limit=100):
-        """Récupère les trades récents (Time & Sales)"""
+        """Récupère les trades récents (Time & Sales, gardés CACHE_TTLS['trades'] secondes)"""
         if self.exchange is None:
             return None
         
         if symbol is None:
             symbol = config.SYMBOL
+
+        if self.stream is not None:
+            trades_df = self.stream.get_recent_trades(symbol, limit)
+            if trades_df is not None:
+                return trades_df
         
-        try:
-            trades = self.exchange.fetch_trades(symbol, limit=limit)
-            
-            df = pd.DataFrame(trades)
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            
-            return df
-            
-        except Exception as e:
-            print(f"❌ Erreur trades: {e}")
-            return None
+        def fetch():
+            try:
+                self.rate_limiter.acquire(BINANCE_WEIGHTS['fetch_trades'])
+                trades = self.exchange.fetch_trades(symbol, limit=limit)
+                
+                df = pd.DataFrame(trades)
+                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                
+                return df
+                
+            except Exception as e:
+                print(f"❌ Erreur trades: {e}")
+                return None
+
+        return self._cached('trades', (symbol, limit), fetch)
     
     def detect_large_orders(self, trades_df):
         """
@@ -237,14 +491,65 @@ class DataCollectorApex:
         
         return large_orders_list
     
+    def get_market_snapshot(self, symbol=None, timeframe=None, limit=500, with_order_flow=True,
+                            as_frame=False):
+        """
+        Photo cohérente du marché : bougies, carnet et trades récupérés en
+        parallèle (durée ≈ la requête la plus lente au lieu de la somme)
+
+        Args:
+            symbol: Paire (défaut: config)
+            timeframe: Timeframe (défaut: config)
+            limit: Taille de la fenêtre de bougies
+            with_order_flow: Récupère aussi carnet + trades et les analyse
+            as_frame: Bougies en CandleFrame plutôt qu'en DataFrame
+
+        Returns:
+            dict: symbol, timeframe, timestamp, candles, order_book, trades, order_flow
+        """
+        if symbol is None:
+            symbol = config.SYMBOL
+        if timeframe is None:
+            timeframe = config.TIMEFRAME
+
+        requests = {'candles': self.request_pool.submit(self.get_live_data, symbol, timeframe, limit,
+                                                         as_frame)}
+        if with_order_flow:
+            requests['order_book'] = self.request_pool.submit(self.get_order_book, symbol)
+            requests['trades'] = self.request_pool.submit(self.get_recent_trades, symbol)
+
+        results = {name: future.result() for name, future in requests.items()}
+
+        order_book = results.get('order_book')
+        trades = results.get('trades')
+
+        return {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'timestamp': datetime.now(),
+            'candles': results['candles'],
+            'order_book': order_book,
+            'trades': trades,
+            'order_flow': self.analyze_market_depth(order_book, trades) if with_order_flow else None
+        }
+
     def get_market_depth_analysis(self, symbol=None):
         """
         Analyse complète de la profondeur de marché
-        Combine order book + trades récents
+        Combine order book + trades récents (récupérés en parallèle)
+        """
+        order_book_future = self.request_pool.submit(self.get_order_book, symbol)
+        trades_future = self.request_pool.submit(self.get_recent_trades, symbol)
+
+        return self.analyze_market_depth(order_book_future.result(), trades_future.result())
+
+    def analyze_market_depth(self, order_book, trades):
+        """
+        Analyse un carnet et des trades déjà récupérés
+
+        Returns:
+            dict: Analyse order flow ou None si données manquantes
         """
-        order_book = self.get_order_book(symbol)
-        trades = self.get_recent_trades(symbol)
-        
         if not order_book or trades is None:
             return None
         
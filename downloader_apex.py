@@ -0,0 +1,338 @@
+# downloader_apex.py - Téléchargement massif de l'historique (APEX)
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import ccxt
+import numpy as np
+import pandas as pd
+import config_apex as config
+from logger_apex import get_logger
+from candle_cache import CandleCache, DAY_MS
+from rate_limiter import WeightRateLimiter, BINANCE_WEIGHTS
+
+
+def split_range(start, end, timeframe_ms, page_size=1000):
+    """
+    Découpe [start, end] (ms, inclus) en pages d'au plus page_size bougies
+
+    Returns:
+        list: [(premier timestamp, dernier timestamp), ...]
+    """
+    pages = []
+    since = start
+    step = page_size * timeframe_ms
+    while since <= end:
+        pages.append((since, min(since + step - timeframe_ms, end)))
+        since += step
+    return pages
+
+
+class HistoryDownloader:
+    """
+    Télécharge une plage de bougies par pages concurrentes vers le CandleCache
+
+    - pages de 1000 bougies, téléchargées par un pool de threads
+    - budget de poids API partagé (WeightRateLimiter) + retry avec backoff
+    - reprise : seules les plages absentes du cache sont demandées
+    - manifeste par paire/timeframe : couverture contiguë, checksum par jour,
+      plages vides côté exchange (non redemandées à la reprise)
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, exchange, cache=None, rate_limiter=None, workers=None,
+                 page_size=1000, max_retries=5):
+        """
+        Args:
+            exchange: Client ccxt (ou FakeExchange)
+            cache: CandleCache de destination (défaut: config.CANDLE_CACHE_DIR)
+            rate_limiter: Budget de poids partagé (défaut: config.API_WEIGHT_LIMIT)
+            workers: Pages téléchargées simultanément (défaut: config)
+            page_size: Bougies par appel (1000 max sur Binance)
+            max_retries: Tentatives par page
+        """
+        self.logger = get_logger()
+        self.exchange = exchange
+        self.cache = cache or CandleCache()
+        self.rate_limiter = rate_limiter or WeightRateLimiter(config.API_WEIGHT_LIMIT)
+        self.workers = workers or config.DOWNLOAD_WORKERS
+        self.page_size = page_size
+        self.max_retries = max_retries
+
+        # Les pages d'un même jour réécrivent la même partition
+        self._write_lock = threading.Lock()
+
+    # ═══════════════════════════════════════════════════════════
+    # ⬇️ TÉLÉCHARGEMENT
+    # ═══════════════════════════════════════════════════════════
+
+    def _fetch_page(self, symbol, timeframe, page_start, page_end, timeframe_ms):
+        """Une page, avec retry (erreur réseau / limite de débit)"""
+        count = (page_end - page_start) // timeframe_ms + 1
+        delay = 1.0
+
+        for attempt in range(self.max_retries):
+            try:
+                self.rate_limiter.acquire(BINANCE_WEIGHTS['fetch_ohlcv'])
+                candles = self.exchange.fetch_ohlcv(symbol, timeframe, since=page_start, limit=count)
+                return [candle for candle in candles if page_start <= candle[0] <= page_end]
+
+            except (ccxt.RateLimitExceeded, ccxt.DDoSProtection) as e:
+                # Budget dépassé côté exchange : pause plus longue
+                self.logger.warning(f"Limite de débit ({symbol} {page_start}): {e}")
+                time.sleep(delay * 5)
+
+            except ccxt.NetworkError as e:
+                self.logger.warning(f"Erreur réseau ({symbol} {page_start}), tentative {attempt + 1}: {e}")
+                time.sleep(delay)
+
+            delay = min(delay * 2, 30)
+
+        raise RuntimeError(f"Page {symbol} {timeframe} {page_start} en échec après {self.max_retries} tentatives")
+
+    def _store_page(self, symbol, timeframe, candles):
+        with self._write_lock:
+            return self.cache.append(symbol, timeframe, candles)
+
+    def download(self, symbol, timeframe, start, end=None, verbose=True):
+        """
+        Complète le cache sur [start, end] (ms)
+
+        Args:
+            symbol: Paire
+            timeframe: Timeframe
+            start: Début (ms)
+            end: Fin incluse (défaut: dernière bougie clôturée)
+            verbose: Affiche la progression
+
+        Returns:
+            dict: Bilan (pages, bougies, échecs, durée, manifeste)
+        """
+        timeframe_ms = self.exchange.parse_timeframe(timeframe) * 1000
+        last_closed = self.exchange.milliseconds() // timeframe_ms * timeframe_ms - timeframe_ms
+        start = -(-start // timeframe_ms) * timeframe_ms
+        end = last_closed if end is None else min(end // timeframe_ms * timeframe_ms, last_closed)
+
+        manifest = self.load_manifest(symbol, timeframe)
+        known_gaps = [tuple(gap) for gap in manifest.get('exchange_gaps', [])]
+
+        # Reprise : uniquement les plages absentes, hors trous connus de l'exchange
+        missing = [
+            (lo, hi) for lo, hi in self.cache.missing_ranges(symbol, timeframe, start, end, timeframe_ms)
+            if not any(gap_lo <= lo and hi <= gap_hi for gap_lo, gap_hi in known_gaps)
+        ]
+        pages = [page for lo, hi in missing for page in split_range(lo, hi, timeframe_ms, self.page_size)]
+
+        if verbose:
+            print(f"⬇️  {symbol} {timeframe}: {len(pages)} page(s) à télécharger "
+                  f"({sum((hi - lo) // timeframe_ms + 1 for lo, hi in missing)} bougies manquantes)")
+
+        started = time.perf_counter()
+        downloaded = 0
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="apex-download") as pool:
+            futures = {
+                pool.submit(self._fetch_page, symbol, timeframe, lo, hi, timeframe_ms): (lo, hi)
+                for lo, hi in pages
+            }
+
+            for done, future in enumerate(as_completed(futures), 1):
+                page = futures[future]
+                try:
+                    candles = future.result()
+                except Exception as e:
+                    failed.append(page)
+                    self.logger.error(str(e))
+                    continue
+
+                if candles:
+                    self._store_page(symbol, timeframe, candles)
+                    downloaded += len(candles)
+
+                if verbose and (done % 50 == 0 or done == len(pages)):
+                    print(f"   {done}/{len(pages)} pages - {downloaded} bougies")
+
+        # Plages toujours absentes après un téléchargement réussi = trous de l'exchange
+        if not failed:
+            for lo, hi in self.cache.missing_ranges(symbol, timeframe, start, end, timeframe_ms):
+                if any(p_lo <= lo and hi <= p_hi for p_lo, p_hi in missing) and (lo, hi) not in known_gaps:
+                    known_gaps.append((lo, hi))
+
+        manifest = self.update_manifest(symbol, timeframe, timeframe_ms, known_gaps)
+
+        return {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'pages': len(pages),
+            'candles': downloaded,
+            'failed_pages': failed,
+            'elapsed': time.perf_counter() - started,
+            'manifest': manifest
+        }
+
+    # ═══════════════════════════════════════════════════════════
+    # 🧾 MANIFESTE
+    # ═══════════════════════════════════════════════════════════
+
+    def _manifest_path(self, symbol, timeframe):
+        return os.path.join(self.cache.series_dir(symbol, timeframe), self.MANIFEST)
+
+    def load_manifest(self, symbol, timeframe):
+        """Manifeste existant (dict vide si absent)"""
+        path = self._manifest_path(symbol, timeframe)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def day_checksum(self, symbol, timeframe, day):
+        """SHA-256 des colonnes d'une partition"""
+        data = self.cache.load_day(symbol, timeframe, day)
+        digest = hashlib.sha256()
+        for column in CandleCache.COLUMNS:
+            digest.update(np.ascontiguousarray(data[column]).tobytes())
+        return digest.hexdigest()
+
+    def coverage(self, symbol, timeframe, timeframe_ms):
+        """
+        Plages contiguës présentes dans le cache
+
+        Returns:
+            list: [(début ms, fin ms), ...]
+        """
+        timestamps = np.asarray(self.cache.load(symbol, timeframe)['timestamp'])
+        if len(timestamps) == 0:
+            return []
+
+        breaks = np.flatnonzero(np.diff(timestamps) != timeframe_ms)
+        starts = np.concatenate([[0], breaks + 1])
+        ends = np.concatenate([breaks, [len(timestamps) - 1]])
+        return [(int(timestamps[s]), int(timestamps[e])) for s, e in zip(starts, ends)]
+
+    def update_manifest(self, symbol, timeframe, timeframe_ms, exchange_gaps=None):
+        """Recalcule et écrit le manifeste (couverture, checksums par jour)"""
+        expected_per_day = DAY_MS // timeframe_ms
+        days = {}
+        for day in self.cache.days(symbol, timeframe):
+            count = len(self.cache.load_day(symbol, timeframe, day)['timestamp'])
+            days[day] = {
+                'candles': count,
+                'complete': count == expected_per_day,
+                'sha256': self.day_checksum(symbol, timeframe, day)
+            }
+
+        coverage = self.coverage(symbol, timeframe, timeframe_ms)
+        manifest = {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'coverage': coverage,
+            'contiguous': len(coverage) <= 1,
+            'exchange_gaps': sorted(exchange_gaps or []),
+            'days': days,
+            'sha256': hashlib.sha256(
+                ''.join(days[day]['sha256'] for day in sorted(days)).encode()
+            ).hexdigest()
+        }
+
+        path = self._manifest_path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        return manifest
+
+    def verify(self, symbol, timeframe, repair=False):
+        """
+        Compare les partitions au manifeste
+
+        Args:
+            repair: Supprime les jours corrompus (re-téléchargés à la reprise)
+
+        Returns:
+            list: Jours dont le checksum ne correspond pas
+        """
+        manifest = self.load_manifest(symbol, timeframe)
+        corrupted = []
+
+        for day, info in manifest.get('days', {}).items():
+            try:
+                checksum = self.day_checksum(symbol, timeframe, day)
+            except (OSError, ValueError, TypeError):
+                checksum = None
+            if checksum != info['sha256']:
+                corrupted.append(day)
+
+        if repair:
+            for day in corrupted:
+                day_path = os.path.join(self.cache.series_dir(symbol, timeframe), day)
+                for column in CandleCache.COLUMNS:
+                    path = os.path.join(day_path, f"{column}.npy")
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        return corrupted
+
+
+def export_csv(cache, symbol, timeframe, output_dir):
+    """Exporte le cache au format CSV des outils batch (SYMBOL-QUOTE_TIMEFRAME.csv)"""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{symbol.replace('/', '-')}_{timeframe}.csv")
+    pd.DataFrame(cache.load(symbol, timeframe)).to_csv(path, index=False)
+    return path
+
+
+def main():
+    """Point d'entrée du téléchargement"""
+    parser = argparse.ArgumentParser(description="Téléchargement de l'historique (APEX)")
+    parser.add_argument('symbols', nargs='+', help="Paires (ex: ETH/USDT BTC/USDT)")
+    parser.add_argument('--timeframe', default=config.TIMEFRAME)
+    parser.add_argument('--start', required=True, help="Date de début (ex: 2024-01-01)")
+    parser.add_argument('--end', default=None, help="Date de fin (exclue, défaut: maintenant)")
+    parser.add_argument('--workers', type=int, default=config.DOWNLOAD_WORKERS)
+    parser.add_argument('--cache-dir', default=config.CANDLE_CACHE_DIR)
+    parser.add_argument('--verify', action='store_true', help="Vérifie les checksums avant la reprise")
+    parser.add_argument('--export-csv', default=None, help="Dossier d'export CSV (ex: data/history)")
+    parser.add_argument('--fake', action='store_true', help="Utilise l'exchange simulé (tests hors ligne)")
+    args = parser.parse_args()
+
+    if args.fake:
+        from fake_exchange import FakeExchange
+        exchange = FakeExchange(symbols=args.symbols, latency=0.05)
+    else:
+        exchange = ccxt.binance({'enableRateLimit': False, 'options': {'defaultType': 'spot'}})
+
+    start = pd.Timestamp(args.start).value // 10**6
+    end = pd.Timestamp(args.end).value // 10**6 - 1 if args.end else None
+
+    cache = CandleCache(args.cache_dir)
+    downloader = HistoryDownloader(exchange, cache, workers=args.workers)
+
+    for symbol in args.symbols:
+        if args.verify:
+            corrupted = downloader.verify(symbol, args.timeframe, repair=True)
+            if corrupted:
+                print(f"⚠️  {symbol}: {len(corrupted)} jour(s) corrompu(s) supprimé(s), re-téléchargement")
+
+        result = downloader.download(symbol, args.timeframe, start, end)
+        manifest = result['manifest']
+
+        print(f"✅ {symbol}: {result['candles']} bougies en {result['elapsed']:.1f}s "
+              f"({len(manifest['coverage'])} plage(s) contiguë(s), "
+              f"{len(manifest['exchange_gaps'])} trou(s) exchange)")
+        if result['failed_pages']:
+            print(f"❌ {len(result['failed_pages'])} page(s) en échec - relancer pour reprendre")
+
+        if args.export_csv:
+            print(f"💾 {export_csv(cache, symbol, args.timeframe, args.export_csv)}")
+
+
+if __name__ == "__main__":
+    main()
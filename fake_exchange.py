@@ -0,0 +1,473 @@
+# fake_exchange.py - Exchange local simulé pour les tests hors ligne (APEX)
+
+import threading
+import time
+from collections import deque
+import ccxt
+import numpy as np
+
+
+class FakeExchange:
+    """
+    Imitation minimale d'un client ccxt Binance, sans réseau
+
+    - bougies déterministes : une bougie ne dépend que de (paire, timestamp),
+      toute page redemandée renvoie exactement les mêmes valeurs
+    - pagination comme Binance (since / limit, 1000 bougies max par appel)
+    - latence simulée, erreurs réseau aléatoires, plages sans données
+    - budget de poids par fenêtre : au-delà, ccxt.RateLimitExceeded
+    - compteurs (appels, poids, appels simultanés max) pour les vérifications
+    - ordres : market, limit, STOP_LOSS_LIMIT et listes OCO (endpoint
+      orderList/oco brut de Binance), exécutés par set_price() ; un ordre
+      d'une liste exécuté fait expirer l'autre, comme sur Binance
+    """
+
+    MAX_OHLCV_LIMIT = 1000
+
+    def __init__(self, symbols=None, now=None, latency=0.0, error_rate=0.0,
+                 gaps=None, weight_limit=None, weight_period=60.0, seed=0):
+        """
+        Args:
+            symbols: Paires disponibles (défaut: ETH/USDT, BTC/USDT)
+            now: Horloge figée en ms (défaut: heure réelle)
+            latency: Durée simulée d'un appel (secondes)
+            error_rate: Probabilité d'une ccxt.NetworkError par appel
+            gaps: Plages sans données [(début ms, fin ms), ...] (maintenance)
+            weight_limit: Poids autorisé par période (None = illimité)
+            weight_period: Fenêtre du budget de poids (secondes)
+            seed: Graine des prix et des erreurs
+        """
+        self.symbols = symbols or ['ETH/USDT', 'BTC/USDT']
+        self.now = now
+        self.latency = latency
+        self.error_rate = error_rate
+        self.gaps = gaps or []
+        self.weight_limit = weight_limit
+        self.weight_period = weight_period
+        self.seed = seed
+
+        self.markets = {
+            symbol: {
+                'symbol': symbol,
+                'base': symbol.split('/')[0],
+                'quote': symbol.split('/')[1],
+                'spot': True,
+                'active': True,
+                # Filtres LOT_SIZE / NOTIONAL de Binance (spot)
+                'limits': {'amount': {'min': 0.0001}, 'cost': {'min': 5.0}}
+            }
+            for symbol in self.symbols
+        }
+
+        # Ordres (prix forcés par set_price, quantités détenues par actif)
+        self.prices = {}
+        self.balances = {}
+        self.orders = {}
+        self.order_lists = {}
+        self._next_id = 1
+
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(seed)
+        self._weights = deque()
+        self._in_flight = 0
+
+        self.stats = {
+            'calls': 0,
+            'weight': 0,
+            'errors': 0,
+            'rate_limited': 0,
+            'max_concurrency': 0
+        }
+
+    # ═══════════════════════════════════════════════════════════
+    # ⏱️ OUTILS
+    # ═══════════════════════════════════════════════════════════
+
+    parse_timeframe = staticmethod(ccxt.Exchange.parse_timeframe)
+
+    def milliseconds(self):
+        return self.now if self.now is not None else int(time.time() * 1000)
+
+    def load_markets(self, reload=False):
+        return self.markets
+
+    def market_id(self, symbol):
+        return symbol.replace('/', '')
+
+    def amount_to_precision(self, symbol, amount):
+        return f"{np.floor(amount * 1e6) / 1e6:.6f}"
+
+    def price_to_precision(self, symbol, price):
+        return f"{price:.2f}"
+
+    def _call(self, weight):
+        """Latence, budget de poids et erreurs simulées d'un appel"""
+        with self._lock:
+            now = time.monotonic()
+            while self._weights and now - self._weights[0][0] >= self.weight_period:
+                self._weights.popleft()
+
+            used = sum(w for _, w in self._weights)
+            if self.weight_limit is not None and used + weight > self.weight_limit:
+                self.stats['rate_limited'] += 1
+                raise ccxt.RateLimitExceeded("fake exchange: budget de poids dépassé")
+
+            self._weights.append((now, weight))
+            self.stats['calls'] += 1
+            self.stats['weight'] += weight
+            self._in_flight += 1
+            self.stats['max_concurrency'] = max(self.stats['max_concurrency'], self._in_flight)
+            fail = self._rng.random() < self.error_rate
+
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                with self._lock:
+                    self.stats['errors'] += 1
+                raise ccxt.NetworkError("fake exchange: erreur réseau simulée")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    # ═══════════════════════════════════════════════════════════
+    # 📊 DONNÉES DE MARCHÉ
+    # ═══════════════════════════════════════════════════════════
+
+    def last_price(self, symbol):
+        """Prix courant : forcé par set_price, sinon close de la bougie en cours"""
+        if symbol in self.prices:
+            return self.prices[symbol]
+        return self.candle(symbol, self.milliseconds() // 60000 * 60000)[4]
+
+    def candle(self, symbol, timestamp, timeframe_ms=60000):
+        """Bougie déterministe [timestamp, open, high, low, close, volume]"""
+        symbol_seed = sum(ord(char) for char in symbol)
+        step = timestamp // timeframe_ms
+        rng = np.random.default_rng([self.seed, symbol_seed, step])
+
+        base = 100.0 + symbol_seed % 50
+        trend = base * (1 + 0.05 * np.sin(step / 720.0))
+        open_ = trend * (1 + rng.normal(0, 0.002))
+        close = trend * (1 + rng.normal(0, 0.002))
+        high = max(open_, close) * (1 + rng.random() * 0.001)
+        low = min(open_, close) * (1 - rng.random() * 0.001)
+
+        return [int(timestamp), float(open_), float(high), float(low), float(close), float(rng.random() * 100)]
+
+    def _in_gap(self, timestamp):
+        return any(start <= timestamp <= end for start, end in self.gaps)
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        """Bougies à partir de since (ou les dernières), 1000 max"""
+        self._call(2)
+
+        timeframe_ms = self.parse_timeframe(timeframe) * 1000
+        limit = min(limit or 500, self.MAX_OHLCV_LIMIT)
+        current_open = self.milliseconds() // timeframe_ms * timeframe_ms
+
+        if since is None:
+            start = current_open - (limit - 1) * timeframe_ms
+        else:
+            start = -(-since // timeframe_ms) * timeframe_ms
+
+        candles = []
+        timestamp = start
+        while timestamp <= current_open and len(candles) < limit:
+            if not self._in_gap(timestamp):
+                candles.append(self.candle(symbol, timestamp, timeframe_ms))
+            timestamp += timeframe_ms
+
+        return candles
+
+    def fetch_ticker(self, symbol):
+        self._call(2)
+        return {'symbol': symbol, 'last': self.last_price(symbol), 'timestamp': self.milliseconds()}
+
+    def fetch_tickers(self, symbols=None):
+        self._call(80)
+        return {
+            symbol: {'symbol': symbol, 'last': self.last_price(symbol),
+                     'quoteVolume': float(i + 1)}
+            for i, symbol in enumerate(symbols or self.symbols)
+        }
+
+    def fetch_order_book(self, symbol, limit=20, params=None):
+        self._call(5)
+        price = self.last_price(symbol)
+        return {
+            'bids': [[price * (1 - 0.0001 * (i + 1)), 1.0 + i] for i in range(limit)],
+            'asks': [[price * (1 + 0.0001 * (i + 1)), 1.0 + i] for i in range(limit)],
+            'timestamp': self.milliseconds(),
+            'nonce': self.stats['calls']
+        }
+
+    def fetch_trades(self, symbol, since=None, limit=100, params=None):
+        self._call(25)
+        price = self.last_price(symbol)
+        now = self.milliseconds()
+        return [
+            {'id': i, 'timestamp': now - (limit - i) * 100, 'price': price,
+             'amount': 1.0 + (i % 7), 'side': 'buy' if i % 2 else 'sell'}
+            for i in range(limit)
+        ]
+
+    # ═══════════════════════════════════════════════════════════
+    # 📝 ORDRES (moteur d'exécution simplifié)
+    # ═══════════════════════════════════════════════════════════
+
+    def set_price(self, symbol, price):
+        """
+        Force le prix courant et exécute les ordres concernés
+
+        Returns:
+            list: Ordres exécutés à ce prix
+        """
+        with self._lock:
+            self.prices[symbol] = price
+            return [dict(order) for order in self._match(symbol)]
+
+    def _new_order(self, symbol, type_, side, amount, price=None, stop_price=None, list_id=None):
+        order_id = str(self._next_id)
+        self._next_id += 1
+        order = {
+            'id': order_id,
+            'symbol': symbol,
+            'type': type_,
+            'side': side,
+            'price': price,
+            'triggerPrice': stop_price,
+            'stopPrice': stop_price,
+            'amount': amount,
+            'filled': 0.0,
+            'remaining': amount,
+            'average': None,
+            'status': 'open',
+            'timestamp': self.milliseconds(),
+            'info': {'orderListId': list_id, 'triggered': False}
+        }
+        self.orders[order_id] = order
+        return order
+
+    def _locked_amount(self, base):
+        """Quantité bloquée par les ventes ouvertes (une liste OCO bloque sa quantité une fois)"""
+        locked = 0.0
+        seen_lists = set()
+        for order in self.orders.values():
+            if order['status'] != 'open' or order['side'] != 'sell' or order['symbol'].split('/')[0] != base:
+                continue
+            list_id = order['info']['orderListId']
+            if list_id is not None:
+                if list_id in seen_lists:
+                    continue
+                seen_lists.add(list_id)
+            locked += order['remaining']
+        return locked
+
+    def _check_balance(self, symbol, amount):
+        base = symbol.split('/')[0]
+        free = self.balances.get(base, 0.0) - self._locked_amount(base)
+        if amount > free + 1e-9:
+            raise ccxt.InsufficientFunds(f"fake exchange: {amount} {base} demandés, {free} disponibles")
+
+    def _check_limits(self, symbol, amount, price):
+        limits = self.markets[symbol]['limits']
+        if amount < limits['amount']['min'] or amount * price < limits['cost']['min']:
+            raise ccxt.InvalidOrder(f"fake exchange: {amount} {symbol} sous LOT_SIZE / NOTIONAL")
+
+    def _fill(self, order, price):
+        """Exécution complète d'un ordre ; l'autre ordre de sa liste expire"""
+        order['filled'] = order['amount']
+        order['remaining'] = 0.0
+        order['average'] = price
+        order['status'] = 'closed'
+        if order['type'] == 'market':
+            order['price'] = price
+
+        base = order['symbol'].split('/')[0]
+        sign = 1 if order['side'] == 'buy' else -1
+        self.balances[base] = self.balances.get(base, 0.0) + sign * order['amount']
+
+        list_id = order['info']['orderListId']
+        for other_id in self.order_lists.get(list_id, []):
+            other = self.orders[other_id]
+            if other['status'] == 'open':
+                other['status'] = 'expired'
+
+    def _match(self, symbol):
+        """Exécute les ordres déclenchés au prix courant"""
+        price = self.last_price(symbol)
+        filled = []
+
+        for order in self.orders.values():
+            if order['symbol'] != symbol or order['status'] != 'open':
+                continue
+
+            if order['type'] == 'stop_loss_limit' and not order['info']['triggered']:
+                if price > order['triggerPrice']:
+                    continue
+                order['info']['triggered'] = True
+
+            if order['side'] == 'sell' and price >= order['price']:
+                # Stop déclenché : exécuté au marché (au-dessus de sa limite)
+                fill_price = price if order['type'] == 'stop_loss_limit' else order['price']
+            elif order['side'] == 'buy' and price <= order['price']:
+                fill_price = order['price']
+            else:
+                continue
+
+            self._fill(order, fill_price)
+            filled.append(order)
+
+        return filled
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        """Ordre market, limit ou STOP_LOSS_LIMIT (params: triggerPrice)"""
+        self._call(1)
+        params = params or {}
+        type_ = type.lower()
+        stop_price = params.get('triggerPrice', params.get('stopPrice'))
+
+        with self._lock:
+            if type_ not in ('market', 'limit', 'stop_loss_limit'):
+                raise ccxt.InvalidOrder(f"fake exchange: type {type} non supporté")
+            if type_ == 'stop_loss_limit':
+                if stop_price is None:
+                    raise ccxt.InvalidOrder("fake exchange: triggerPrice requis")
+                if side == 'sell' and self.last_price(symbol) <= stop_price:
+                    raise ccxt.InvalidOrder("fake exchange: le stop se déclencherait immédiatement")
+            self._check_limits(symbol, amount, price if type_ != 'market' else self.last_price(symbol))
+            if side == 'sell':
+                self._check_balance(symbol, amount)
+
+            order = self._new_order(symbol, type_, side, amount, price, stop_price)
+            if type_ == 'market':
+                self._fill(order, self.last_price(symbol))
+            else:
+                self._match(symbol)
+            return dict(order)
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, 'market', 'buy', amount, params=params)
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, 'market', 'sell', amount, params=params)
+
+    def _order_or_raise(self, order_id):
+        order = self.orders.get(str(order_id))
+        if order is None:
+            raise ccxt.OrderNotFound(f"fake exchange: ordre {order_id} inconnu")
+        return order
+
+    def fetch_order(self, id, symbol=None, params=None):
+        self._call(4)
+        with self._lock:
+            return dict(self._order_or_raise(id))
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        self._call(6)
+        with self._lock:
+            return [dict(order) for order in self.orders.values()
+                    if order['status'] == 'open' and (symbol is None or order['symbol'] == symbol)]
+
+    def cancel_order(self, id, symbol=None, params=None):
+        """Annule un ordre ouvert (toute sa liste s'il fait partie d'une OCO)"""
+        self._call(1)
+        with self._lock:
+            order = self._order_or_raise(id)
+            if order['status'] != 'open':
+                raise ccxt.OrderNotFound(f"fake exchange: ordre {id} déjà {order['status']}")
+            list_id = order['info']['orderListId']
+            for order_id in self.order_lists.get(list_id, [order['id']]):
+                if self.orders[order_id]['status'] == 'open':
+                    self.orders[order_id]['status'] = 'canceled'
+            return dict(order)
+
+    # Endpoints bruts Binance (ccxt n'a pas de méthode unifiée pour les OCO)
+
+    def _report(self, order):
+        """Ordre au format brut Binance (orderReports)"""
+        status = {'open': 'NEW', 'closed': 'FILLED', 'canceled': 'CANCELED', 'expired': 'EXPIRED'}[order['status']]
+        return {
+            'symbol': self.market_id(order['symbol']),
+            'orderId': int(order['id']),
+            'orderListId': order['info']['orderListId'],
+            'price': f"{order['price']:.8f}",
+            'origQty': f"{order['amount']:.8f}",
+            'executedQty': f"{order['filled']:.8f}",
+            'status': status,
+            'type': order['type'].upper(),
+            'side': order['side'].upper(),
+            'stopPrice': f"{order['triggerPrice']:.8f}" if order['triggerPrice'] is not None else None
+        }
+
+    def _symbol_of(self, market_id):
+        for symbol in self.symbols:
+            if self.market_id(symbol) == market_id:
+                return symbol
+        raise ccxt.BadSymbol(f"fake exchange: paire {market_id} inconnue")
+
+    def private_post_orderlist_oco(self, params):
+        """OCO de vente : LIMIT_MAKER au-dessus, STOP_LOSS_LIMIT en dessous"""
+        self._call(1)
+        symbol = self._symbol_of(params['symbol'])
+        amount = float(params['quantity'])
+        above = float(params['abovePrice'])
+        stop = float(params['belowStopPrice'])
+        below = float(params['belowPrice'])
+
+        with self._lock:
+            if params['side'] != 'SELL':
+                raise ccxt.NotSupported("fake exchange: OCO de vente uniquement")
+            if not above > self.last_price(symbol) > stop:
+                raise ccxt.InvalidOrder("fake exchange: prix de l'OCO incohérents avec le marché")
+            self._check_limits(symbol, amount, below)
+            self._check_balance(symbol, amount)
+
+            list_id = self._next_id
+            stop_order = self._new_order(symbol, 'stop_loss_limit', 'sell', amount, below, stop, list_id)
+            limit_order = self._new_order(symbol, 'limit_maker', 'sell', amount, above, None, list_id)
+            self.order_lists[list_id] = [stop_order['id'], limit_order['id']]
+
+            return {
+                'orderListId': list_id,
+                'contingencyType': 'OCO',
+                'listStatusType': 'EXEC_STARTED',
+                'listOrderStatus': 'EXECUTING',
+                'symbol': params['symbol'],
+                'orders': [{'symbol': params['symbol'], 'orderId': int(order['id'])}
+                           for order in (stop_order, limit_order)],
+                'orderReports': [self._report(order) for order in (stop_order, limit_order)]
+            }
+
+    def private_delete_orderlist(self, params):
+        """Annule une liste OCO encore ouverte"""
+        self._call(1)
+        list_id = int(params['orderListId'])
+
+        with self._lock:
+            orders = [self.orders[order_id] for order_id in self.order_lists.get(list_id, [])]
+            if not any(order['status'] == 'open' for order in orders):
+                raise ccxt.OrderNotFound(f"fake exchange: liste {list_id} introuvable ou terminée")
+            for order in orders:
+                if order['status'] == 'open':
+                    order['status'] = 'canceled'
+
+            return {
+                'orderListId': list_id,
+                'listStatusType': 'ALL_DONE',
+                'listOrderStatus': 'ALL_DONE',
+                'orderReports': [self._report(order) for order in orders]
+            }
+
+
+# Test du module
+if __name__ == "__main__":
+    print("🚀 Test du Fake Exchange APEX")
+
+    exchange = FakeExchange(now=1_700_000_000_000)
+    page = exchange.fetch_ohlcv('ETH/USDT', '1m', since=1_699_990_000_000, limit=1000)
+
+    print(f"\n✅ {len(page)} bougies, première: {page[0]}")
+    print(f"🔁 Déterministe: {page == exchange.fetch_ohlcv('ETH/USDT', '1m', since=1_699_990_000_000, limit=1000)}")
+    print(f"📊 Stats: {exchange.stats}")
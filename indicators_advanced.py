@@ -3,6 +3,7 @@
 import pandas as pd
 import numpy as np
 import config_apex as config
+from candle_frame import CandleFrame, as_candle_frame, candle_snapshot
 
 class AdvancedIndicators:
     """Tous les indicateurs techniques PRO en un seul endroit"""
@@ -11,13 +12,17 @@ class AdvancedIndicators:
     def calculate_all(df):
         """
         Calcule TOUS les indicateurs sur le DataFrame
+        (un CandleFrame passe par pandas puis est reconverti)
         
         Returns:
-            DataFrame: Avec tous les indicateurs
+            DataFrame: Avec tous les indicateurs (CandleFrame si reçu)
         """
         if df is None or len(df) < 200:
             return df
         
+        if isinstance(df, CandleFrame):
+            return as_candle_frame(AdvancedIndicators.calculate_all(df.to_pandas()))
+        
         # EMA (Exponential Moving Averages)
         df = AdvancedIndicators.calculate_ema(df)
         
@@ -138,17 +143,12 @@ class AdvancedIndicators:
         # Volume ratio
         df['volume_ratio'] = df['volume'] / df['volume_sma']
         
-        # OBV (On Balance Volume)
-        obv = [0]
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > df['close'].iloc[i-1]:
-                obv.append(obv[-1] + df['volume'].iloc[i])
-            elif df['close'].iloc[i] < df['close'].iloc[i-1]:
-                obv.append(obv[-1] - df['volume'].iloc[i])
-            else:
-                obv.append(obv[-1])
+        # OBV (On Balance Volume) : somme cumulée du volume signé par la variation du close
+        close = df['close'].to_numpy(dtype=float)
+        volume = df['volume'].to_numpy(dtype=float)
         
-        df['obv'] = obv
+        price_direction = np.nan_to_num(np.sign(np.diff(close)))
+        df['obv'] = np.concatenate(([0.0], np.cumsum(price_direction * volume[1:])))
         
         return df
     
@@ -164,39 +164,71 @@ class AdvancedIndicators:
         upperband = hl2 + (multiplier * df['atr'])
         lowerband = hl2 - (multiplier * df['atr'])
         
-        supertrend = [True] * len(df)
-        direction = [1] * len(df)
+        upper = upperband.to_numpy(dtype=float)
+        lower = lowerband.to_numpy(dtype=float)
         
-        for i in range(1, len(df)):
-            # SuperTrend calculation
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
+        direction = AdvancedIndicators._supertrend_direction(
+            df['close'].to_numpy(dtype=float), upper, lower
+        )
         
-        df['supertrend'] = supertrend
+        df['supertrend'] = np.where(direction == 1, lower, upper)
         df['supertrend_direction'] = direction
         
         return df
     
+    @staticmethod
+    def _supertrend_direction(close, upper, lower):
+        """
+        Direction du SuperTrend sur des ndarrays
+        
+        1 si close > bande haute précédente, -1 si close < bande basse précédente,
+        sinon la direction précédente (propagée par forward-fill)
+        """
+        n = len(close)
+        signal = np.zeros(n, dtype=np.int64)
+        if n == 0:
+            return signal
+        
+        signal[0] = 1
+        signal[1:] = np.where(close[1:] > upper[:-1], 1,
+                              np.where(close[1:] < lower[:-1], -1, 0))
+        
+        # Forward-fill : index du dernier signal non nul
+        last_signal = np.where(signal != 0, np.arange(n), 0)
+        np.maximum.accumulate(last_signal, out=last_signal)
+        
+        return signal[last_signal]
+    
     @staticmethod
     def calculate_cci(df, period=20):
         """Calcule le CCI (Commodity Channel Index)"""
         typical_price = (df['high'] + df['low'] + df['close']) / 3
         sma_tp = typical_price.rolling(window=period).mean()
         
-        mad = typical_price.rolling(window=period).apply(
-            lambda x: np.abs(x - x.mean()).mean()
-        )
+        mad = AdvancedIndicators._rolling_mad(typical_price.to_numpy(dtype=float), period)
         
         df['cci'] = (typical_price - sma_tp) / (0.015 * mad)
         
         return df
     
+    @staticmethod
+    def _rolling_mad(values, period):
+        """
+        Écart absolu moyen glissant (Mean Absolute Deviation) sur un ndarray
+        
+        Équivalent à rolling(period).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True)
+        mais calculé en une passe sur toutes les fenêtres (sliding_window_view)
+        """
+        mad = np.full(len(values), np.nan)
+        if len(values) < period:
+            return mad
+        
+        windows = np.lib.stride_tricks.sliding_window_view(values, period)
+        window_means = windows.mean(axis=1)
+        mad[period - 1:] = np.abs(windows - window_means[:, None]).mean(axis=1)
+        
+        return mad
+    
     @staticmethod
     def calculate_williams_r(df, period=14):
         """Calcule Williams %R"""
@@ -210,113 +242,127 @@ class AdvancedIndicators:
     @staticmethod
     def print_current_indicators(df):
         """Affiche les indicateurs actuels de manière lisible"""
-        if df is None or len(df) < 2:
+        if df is None:
+            return
+        
+        snapshot = candle_snapshot(df)
+        if snapshot.length < 2:
             return
         
-        last = df.iloc[-1]
-        prev = df.iloc[-2]
+        last = snapshot.last
         
         print("\n" + "="*60)
         print("📊 INDICATEURS TECHNIQUES ACTUELS")
         print("="*60)
         
-        print(f"\n💰 Prix: ${last['close']:.2f}")
-        print(f"📊 Volume: {last['volume']:,.0f} ({last.get('volume_ratio', 1):.2f}x moyenne)")
+        print(f"\n💰 Prix: ${last.close:.2f}")
+        print(f"📊 Volume: {last.volume:,.0f} ({(last.volume_ratio if last.volume_ratio is not None else 1):.2f}x moyenne)")
         
         # Tendance (EMAs)
         print(f"\n📈 TENDANCE:")
-        print(f"   EMA 9:   ${last['ema_fast']:.2f}")
-        print(f"   EMA 20:  ${last['ema_medium']:.2f}")
-        print(f"   EMA 50:  ${last['ema_slow']:.2f}")
-        print(f"   EMA 200: ${last['ema_trend']:.2f}")
+        print(f"   EMA 9:   ${last.ema_fast:.2f}")
+        print(f"   EMA 20:  ${last.ema_medium:.2f}")
+        print(f"   EMA 50:  ${last.ema_slow:.2f}")
+        print(f"   EMA 200: ${last.ema_trend:.2f}")
         
-        if last['ema_fast'] > last['ema_medium'] > last['ema_slow']:
+        if last.ema_fast > last.ema_medium > last.ema_slow:
             print(f"   ✅ Tendance HAUSSIÈRE forte")
-        elif last['ema_fast'] < last['ema_medium'] < last['ema_slow']:
+        elif last.ema_fast < last.ema_medium < last.ema_slow:
             print(f"   ❌ Tendance BAISSIÈRE forte")
         else:
             print(f"   ⚪ Tendance MIXTE")
         
         # Momentum
         print(f"\n📊 MOMENTUM:")
-        rsi = last['rsi']
+        rsi = last.rsi
         rsi_status = "🔴 SURACHAT" if rsi > config.RSI_OVERBOUGHT else "🟢 SURVENTE" if rsi < config.RSI_OVERSOLD else "⚪ NEUTRE"
         print(f"   RSI: {rsi:.1f} {rsi_status}")
         
-        macd_trend = "🟢 HAUSSIER" if last['macd'] > last['macd_signal'] else "🔴 BAISSIER"
-        print(f"   MACD: {last['macd']:.2f} {macd_trend}")
+        macd_trend = "🟢 HAUSSIER" if last.macd > last.macd_signal else "🔴 BAISSIER"
+        print(f"   MACD: {last.macd:.2f} {macd_trend}")
         
-        stoch = last['stoch_k']
+        stoch = last.stoch_k
         stoch_status = "🔴 SURACHAT" if stoch > 80 else "🟢 SURVENTE" if stoch < 20 else "⚪ NEUTRE"
         print(f"   Stochastic: {stoch:.1f} {stoch_status}")
         
         # Volatilité
         print(f"\n⚡ VOLATILITÉ:")
-        print(f"   ATR: {last['atr']:.2f}")
-        print(f"   Bollinger Width: {last.get('bb_bandwidth', 0)*100:.2f}%")
+        print(f"   ATR: {last.atr:.2f}")
+        print(f"   Bollinger Width: {(last.bb_bandwidth or 0)*100:.2f}%")
         
         # Support/Résistance Bollinger
         print(f"\n📊 BOLLINGER BANDS:")
-        print(f"   Supérieure: ${last['bb_upper']:.2f}")
-        print(f"   Moyenne:    ${last['bb_middle']:.2f}")
-        print(f"   Inférieure: ${last['bb_lower']:.2f}")
+        print(f"   Supérieure: ${last.bb_upper:.2f}")
+        print(f"   Moyenne:    ${last.bb_middle:.2f}")
+        print(f"   Inférieure: ${last.bb_lower:.2f}")
         
-        if last['close'] > last['bb_upper']:
+        if last.close > last.bb_upper:
             print(f"   ⚠️  Prix AU-DESSUS de la bande supérieure")
-        elif last['close'] < last['bb_lower']:
+        elif last.close < last.bb_lower:
             print(f"   ⚠️  Prix EN-DESSOUS de la bande inférieure")
         
         # SuperTrend
-        if 'supertrend_direction' in df.columns:
-            st_dir = "🟢 ACHAT" if last['supertrend_direction'] == 1 else "🔴 VENTE"
+        if last.supertrend_direction is not None:
+            st_dir = "🟢 ACHAT" if last.supertrend_direction == 1 else "🔴 VENTE"
             print(f"\n🎯 SUPERTREND: {st_dir}")
         
         print("="*60)
     
     @staticmethod
-    def get_momentum_score(df):
+    def get_momentum_score(df, settings=None):
         """
         Calcule un score de momentum combiné
         
+        Args:
+            df: CandleSnapshot du tick (ou CandleFrame / DataFrame)
+            settings: Paramètres (défaut: module config, ou ConfigOverlay)
+        
         Returns:
             dict: Scores et analyse
         """
-        if df is None or len(df) < 2:
+        if df is None:
+            return {'score': 0, 'strength': 'neutre'}
+        
+        snapshot = candle_snapshot(df)
+        if snapshot.length < 2:
             return {'score': 0, 'strength': 'neutre'}
         
-        last = df.iloc[-1]
-        prev = df.iloc[-2]
+        if settings is None:
+            settings = config
+        
+        last = snapshot.last
+        prev = snapshot.prev
         
         score = 0
         reasons = []
         
         # RSI
-        if last['rsi'] < config.RSI_OVERSOLD:
+        if last.rsi < settings.RSI_OVERSOLD:
             score += 30
-            reasons.append(f"RSI survente ({last['rsi']:.1f})")
-        elif last['rsi'] > config.RSI_OVERBOUGHT:
+            reasons.append(f"RSI survente ({last.rsi:.1f})")
+        elif last.rsi > settings.RSI_OVERBOUGHT:
             score -= 30
-            reasons.append(f"RSI surachat ({last['rsi']:.1f})")
+            reasons.append(f"RSI surachat ({last.rsi:.1f})")
         
         # MACD
-        if prev['macd'] <= prev['macd_signal'] and last['macd'] > last['macd_signal']:
+        if prev.macd <= prev.macd_signal and last.macd > last.macd_signal:
             score += 25
             reasons.append("MACD croisement haussier")
-        elif prev['macd'] >= prev['macd_signal'] and last['macd'] < last['macd_signal']:
+        elif prev.macd >= prev.macd_signal and last.macd < last.macd_signal:
             score -= 25
             reasons.append("MACD croisement baissier")
         
         # Stochastic
-        if last['stoch_k'] < 20:
+        if last.stoch_k < 20:
             score += 15
             reasons.append("Stoch survente")
-        elif last['stoch_k'] > 80:
+        elif last.stoch_k > 80:
             score -= 15
             reasons.append("Stoch surachat")
         
         # SuperTrend
-        if 'supertrend_direction' in df.columns:
-            if last['supertrend_direction'] == 1:
+        if last.supertrend_direction is not None:
+            if last.supertrend_direction == 1:
                 score += 20
                 reasons.append("SuperTrend haussier")
             else:
@@ -348,6 +394,61 @@ class AdvancedIndicators:
 if __name__ == "__main__":
     print("🚀 Test des Indicateurs Avancés")
     
+    def obv_loop(df):
+        """OBV de référence (ancienne boucle)"""
+        obv = [0]
+        for i in range(1, len(df)):
+            if df['close'].iloc[i] > df['close'].iloc[i-1]:
+                obv.append(obv[-1] + df['volume'].iloc[i])
+            elif df['close'].iloc[i] < df['close'].iloc[i-1]:
+                obv.append(obv[-1] - df['volume'].iloc[i])
+            else:
+                obv.append(obv[-1])
+        return np.array(obv, dtype=float)
+    
+    def supertrend_loop(df, upperband, lowerband):
+        """SuperTrend de référence (ancienne boucle)"""
+        supertrend = [True] * len(df)
+        direction = [1] * len(df)
+        for i in range(1, len(df)):
+            if df['close'].iloc[i] > upperband.iloc[i-1]:
+                direction[i] = 1
+            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
+                direction[i] = -1
+            else:
+                direction[i] = direction[i-1]
+            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
+        return np.array(supertrend[1:], dtype=float), np.array(direction)
+    
+    # Parité avec les anciennes boucles : 5000 bougies dont un palier de prix plat
+    rng = np.random.default_rng(7)
+    close = 3000 + np.cumsum(rng.normal(0, 2, 5000))
+    close[2000:2300] = close[1999]
+    df = pd.DataFrame({
+        'open': close,
+        'high': close + rng.uniform(0, 3, 5000),
+        'low': close - rng.uniform(0, 3, 5000),
+        'close': close,
+        'volume': rng.uniform(1, 50, 5000)
+    })
+    
+    df = AdvancedIndicators.calculate_volume_indicators(df)
+    df = AdvancedIndicators.calculate_supertrend(df)
+    
+    hl2 = (df['high'] + df['low']) / 2
+    supertrend, direction = supertrend_loop(df, hl2 + 3 * df['atr'], hl2 - 3 * df['atr'])
+    
+    checks = {
+        'OBV': np.array_equal(df['obv'].to_numpy(), obv_loop(df)),
+        'SuperTrend direction': np.array_equal(df['supertrend_direction'].to_numpy(), direction),
+        # Ligne 0 : NaN (ATR en préchauffage) au lieu du True de l'ancienne boucle
+        'SuperTrend': np.array_equal(df['supertrend'].to_numpy()[1:], supertrend, equal_nan=True)
+    }
+    for name, ok in checks.items():
+        print(f"{'✅' if ok else '❌'} Parité {name} (ancienne boucle, {len(df)} bougies)")
+    if not all(checks.values()):
+        raise SystemExit(1)
+    
     print("\n✅ Module opérationnel")
     print("📊 Indicateurs disponibles:")
     print("  - EMA (9, 20, 50, 200)")
@@ -0,0 +1,388 @@
+# indicators_incremental.py - Indicateurs techniques en streaming (APEX)
+
+import math
+from collections import deque
+import numpy as np
+import config_apex as config
+from candle_frame import INDICATOR_COLUMNS, timestamps_ms
+
+# Colonnes produites (mêmes noms que AdvancedIndicators.calculate_all)
+OUTPUT_COLUMNS = INDICATOR_COLUMNS
+
+NAN = float('nan')
+
+
+def _div(a, b):
+    """Division flottante avec la sémantique NumPy (x/0 = ±inf, 0/0 = NaN)"""
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.inf if (a > 0) == (math.copysign(1, b) > 0) else -math.inf
+    return a / b
+
+
+def _mean(values, period):
+    """Moyenne glissante (NaN tant que la fenêtre n'est pas pleine, comme pandas)"""
+    if len(values) < period or any(v != v for v in values):
+        return NAN
+    return math.fsum(values) / period
+
+
+def _ema(previous, value, span):
+    """Une étape d'EMA (identique à pandas ewm(span, adjust=False))"""
+    if previous is None:
+        return value
+
+    alpha = 2 / (span + 1)
+    old_weight = 1 - alpha
+    if previous == value:
+        return previous
+    return (old_weight * previous + alpha * value) / (old_weight + alpha)
+
+
+class _RollingColumns:
+    """Historique borné des valeurs calculées, stocké en colonnes NumPy contiguës"""
+
+    def __init__(self, columns, maxlen):
+        self.maxlen = maxlen
+        self._capacity = maxlen * 2
+        self.timestamps = np.zeros(self._capacity, dtype=np.int64)
+        self.values = {col: np.full(self._capacity, np.nan) for col in columns}
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def append(self, timestamp, row):
+        """Ajoute une ligne (nouvelle bougie)"""
+        if self._end == self._capacity:
+            length = self._end - self._start
+            self.timestamps[:length] = self.timestamps[self._start:self._end]
+            for values in self.values.values():
+                values[:length] = values[self._start:self._end]
+            self._start = 0
+            self._end = length
+
+        self.timestamps[self._end] = timestamp
+        self._end += 1
+        self.set_last(row)
+
+        if self._end - self._start > self.maxlen:
+            self._start += 1
+
+    def set_last(self, row):
+        """Remplace la dernière ligne (bougie en cours révisée)"""
+        for col, value in row.items():
+            self.values[col][self._end - 1] = value
+
+    def tail_timestamps(self, n):
+        return self.timestamps[self._end - n:self._end]
+
+    def tail(self, col, n):
+        return self.values[col][self._end - n:self._end]
+
+
+class IncrementalIndicators:
+    """
+    Moteur d'indicateurs incrémental (streaming)
+
+    Garde l'état de récurrence de chaque indicateur (dernière EMA, fenêtres
+    glissantes, direction SuperTrend...) et met à jour en O(1) par bougie.
+    La bougie en cours de formation est recalculée depuis l'état de la
+    dernière bougie clôturée, sans l'altérer.
+
+    Les valeurs sont identiques à AdvancedIndicators.calculate_all appliqué
+    sur tout l'historique vu par le moteur (pas seulement la fenêtre de
+    500 bougies : EMA et OBV ne repartent pas de zéro à chaque tick).
+    """
+
+    def __init__(self, maxlen=None, settings=None):
+        if settings is None:
+            settings = config
+        if maxlen is None:
+            maxlen = settings.DATA_FETCH_LIMIT
+
+        self.maxlen = maxlen
+
+        # Paramètres (figés à la création)
+        self.ema_spans = {
+            'ema_fast': settings.EMA_FAST,
+            'ema_medium': settings.EMA_MEDIUM,
+            'ema_slow': settings.EMA_SLOW,
+            'ema_trend': settings.EMA_TREND
+        }
+        self.macd_fast = settings.MACD_FAST
+        self.macd_slow = settings.MACD_SLOW
+        self.macd_signal = settings.MACD_SIGNAL
+        self.rsi_period = settings.RSI_PERIOD
+        self.bb_period = settings.BB_PERIOD
+        self.bb_std = settings.BB_STD
+        self.atr_period = settings.ATR_PERIOD
+        self.stoch_k = settings.STOCH_K
+        self.stoch_d = settings.STOCH_D
+        self.volume_period = 20
+        self.supertrend_multiplier = 3
+        self.cci_period = 20
+        self.williams_period = 14
+
+        self.reset()
+
+    def reset(self):
+        """Réinitialise tout l'état"""
+        # État après la dernière bougie clôturée
+        self._state = None
+        self._windows = {
+            'gain': deque(maxlen=self.rsi_period - 1),
+            'loss': deque(maxlen=self.rsi_period - 1),
+            'close': deque(maxlen=self.bb_period - 1),
+            'tr': deque(maxlen=self.atr_period - 1),
+            'stoch_low': deque(maxlen=self.stoch_k - 1),
+            'stoch_high': deque(maxlen=self.stoch_k - 1),
+            'stoch_k': deque(maxlen=self.stoch_d - 1),
+            'volume': deque(maxlen=self.volume_period - 1),
+            'tp': deque(maxlen=self.cci_period - 1),
+            'williams_low': deque(maxlen=self.williams_period - 1),
+            'williams_high': deque(maxlen=self.williams_period - 1)
+        }
+
+        # Bougie en cours (timestamp, entrées dérivées, nouvel état)
+        self._pending_timestamp = None
+        self._pending = None
+
+        self.history = _RollingColumns(OUTPUT_COLUMNS, self.maxlen)
+
+    def update(self, timestamp, open_, high, low, close, volume):
+        """
+        Intègre une bougie (nouvelle ou révision de la bougie en cours)
+
+        Args:
+            timestamp: Timestamp de la bougie (ms)
+
+        Returns:
+            dict: Valeurs des indicateurs pour cette bougie (None si bougie trop ancienne)
+        """
+        if self._pending_timestamp is not None and timestamp < self._pending_timestamp:
+            return None
+
+        if self._pending_timestamp is not None and timestamp > self._pending_timestamp:
+            self._commit()
+
+        values, derived = self._compute(high, low, close, volume)
+
+        if timestamp == self._pending_timestamp:
+            self.history.set_last(values)
+        else:
+            self.history.append(timestamp, values)
+
+        self._pending_timestamp = timestamp
+        self._pending = derived
+
+        return values
+
+    def _commit(self):
+        """Fige la bougie en cours : son état devient l'état de référence"""
+        derived = self._pending
+        for name, window in self._windows.items():
+            window.append(derived['inputs'][name])
+        self._state = derived['state']
+
+    def _compute(self, high, low, close, volume):
+        """Calcule les indicateurs d'une bougie depuis l'état clôturé (sans le modifier)"""
+        state = self._state
+        windows = self._windows
+        prev_close = state['close'] if state else NAN
+
+        def window(name, value):
+            return list(windows[name]) + [value]
+
+        values = {}
+        new_state = {'close': close}
+
+        # EMA
+        for col, span in self.ema_spans.items():
+            new_state[col] = _ema(state[col] if state else None, close, span)
+            values[col] = new_state[col]
+
+        # RSI (moyenne simple des gains/pertes)
+        delta = close - prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else -0.0
+        avg_gain = _mean(window('gain', gain), self.rsi_period)
+        avg_loss = _mean(window('loss', loss), self.rsi_period)
+        rs = _div(avg_gain, avg_loss)
+        values['rsi'] = 100 - _div(100, 1 + rs)
+
+        # MACD
+        new_state['macd_fast'] = _ema(state['macd_fast'] if state else None, close, self.macd_fast)
+        new_state['macd_slow'] = _ema(state['macd_slow'] if state else None, close, self.macd_slow)
+        macd = new_state['macd_fast'] - new_state['macd_slow']
+        new_state['macd_signal'] = _ema(state['macd_signal'] if state else None, macd, self.macd_signal)
+        values['macd'] = macd
+        values['macd_signal'] = new_state['macd_signal']
+        values['macd_diff'] = macd - new_state['macd_signal']
+
+        # Bollinger Bands
+        closes = window('close', close)
+        bb_middle = _mean(closes, self.bb_period)
+        if bb_middle == bb_middle:
+            variance = math.fsum((c - bb_middle) ** 2 for c in closes) / (self.bb_period - 1)
+            std = math.sqrt(variance)
+        else:
+            std = NAN
+        values['bb_middle'] = bb_middle
+        values['bb_upper'] = bb_middle + (std * self.bb_std)
+        values['bb_lower'] = bb_middle - (std * self.bb_std)
+        values['bb_bandwidth'] = _div(values['bb_upper'] - values['bb_lower'], bb_middle)
+
+        # ATR
+        if prev_close == prev_close:
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        else:
+            true_range = high - low
+        atr = _mean(window('tr', true_range), self.atr_period)
+        values['atr'] = atr
+
+        # Stochastic
+        stoch_lows = window('stoch_low', low)
+        stoch_highs = window('stoch_high', high)
+        if len(stoch_lows) < self.stoch_k:
+            stoch_k = NAN
+        else:
+            low_min = min(stoch_lows)
+            high_max = max(stoch_highs)
+            stoch_k = 100 * _div(close - low_min, high_max - low_min)
+        values['stoch_k'] = stoch_k
+        values['stoch_d'] = _mean(window('stoch_k', stoch_k), self.stoch_d)
+
+        # Volume
+        volume_sma = _mean(window('volume', volume), self.volume_period)
+        values['volume_sma'] = volume_sma
+        values['volume_ratio'] = _div(volume, volume_sma)
+
+        obv = state['obv'] if state else 0
+        if close > prev_close:
+            obv += volume
+        elif close < prev_close:
+            obv -= volume
+        new_state['obv'] = obv
+        values['obv'] = obv
+
+        # SuperTrend
+        hl2 = (high + low) / 2
+        upperband = hl2 + (self.supertrend_multiplier * atr)
+        lowerband = hl2 - (self.supertrend_multiplier * atr)
+        direction = state['direction'] if state else 1
+        if state:
+            if close > state['upperband']:
+                direction = 1
+            elif close < state['lowerband']:
+                direction = -1
+        new_state['direction'] = direction
+        new_state['upperband'] = upperband
+        new_state['lowerband'] = lowerband
+        values['supertrend'] = lowerband if direction == 1 else upperband
+        values['supertrend_direction'] = direction
+
+        # CCI
+        typical_price = (high + low + close) / 3
+        tps = window('tp', typical_price)
+        sma_tp = _mean(tps, self.cci_period)
+        if sma_tp == sma_tp:
+            window_mean = float(np.mean(tps))
+            mad = float(np.mean(np.abs(np.array(tps) - window_mean)))
+        else:
+            mad = NAN
+        values['cci'] = _div(typical_price - sma_tp, 0.015 * mad)
+
+        # Williams %R
+        williams_lows = window('williams_low', low)
+        williams_highs = window('williams_high', high)
+        if len(williams_lows) < self.williams_period:
+            values['williams_r'] = NAN
+        else:
+            highest_high = max(williams_highs)
+            lowest_low = min(williams_lows)
+            values['williams_r'] = -100 * _div(highest_high - close, highest_high - lowest_low)
+
+        derived = {
+            'inputs': {
+                'gain': gain,
+                'loss': loss,
+                'close': close,
+                'tr': true_range,
+                'stoch_low': low,
+                'stoch_high': high,
+                'stoch_k': stoch_k,
+                'volume': volume,
+                'tp': typical_price,
+                'williams_low': low,
+                'williams_high': high
+            },
+            'state': new_state
+        }
+
+        return values, derived
+
+    def calculate_all(self, df):
+        """
+        Met à jour le moteur avec les nouvelles bougies du DataFrame
+        (ou CandleFrame) et y ajoute les colonnes d'indicateurs
+
+        Seules les bougies à partir de la bougie en cours sont traitées ;
+        si l'historique ne correspond plus (trou, changement de symbole),
+        le moteur est réinitialisé et rejoue tout le DataFrame.
+
+        Returns:
+            DataFrame: Avec tous les indicateurs (même type qu'en entrée)
+        """
+        if df is None or len(df) < 200:
+            return df
+
+        n = len(df)
+        timestamps = timestamps_ms(df)
+
+        if n > self.maxlen:
+            self.maxlen = n
+            self.reset()
+
+        if not self._feed(df, timestamps):
+            self.reset()
+            self._feed(df, timestamps)
+
+        for col in OUTPUT_COLUMNS:
+            df[col] = self.history.tail(col, n).copy()
+
+        return df
+
+    def _feed(self, df, timestamps):
+        """Intègre les bougies nouvelles ; False si l'historique est désynchronisé"""
+        if self._pending_timestamp is None:
+            start = 0
+        else:
+            start = int(np.searchsorted(timestamps, self._pending_timestamp))
+            # La bougie en cours doit figurer dans le DataFrame : sinon trou
+            # entre l'historique et les nouvelles bougies
+            if start == len(df) or timestamps[start] != self._pending_timestamp:
+                return False
+
+        highs = np.asarray(df['high'], dtype=float)
+        lows = np.asarray(df['low'], dtype=float)
+        closes = np.asarray(df['close'], dtype=float)
+        volumes = np.asarray(df['volume'], dtype=float)
+
+        for i in range(start, len(df)):
+            self.update(int(timestamps[i]), None, highs[i], lows[i], closes[i], volumes[i])
+
+        n = len(df)
+        return len(self.history) >= n and np.array_equal(self.history.tail_timestamps(n), timestamps)
+
+
+# Test du module
+if __name__ == "__main__":
+    print("🚀 Test des Indicateurs Incrémentaux")
+
+    engine = IncrementalIndicators()
+
+    print("\n✅ Moteur incrémental opérationnel")
+    print(f"📊 {len(OUTPUT_COLUMNS)} colonnes mises à jour en O(1) par bougie")
@@ -18,14 +18,18 @@ Fonctionnalités PRO:
 Créé avec ❤️ et beaucoup de café ☕
 """
 
+import asyncio
 import time
 import sys
 from datetime import datetime, timedelta
 import config_apex as config
 from data_collector_apex import DataCollectorApex
 from indicators_advanced import AdvancedIndicators
+from indicators_incremental import IncrementalIndicators
 from ai_apex import ApexAI
 from trader_apex import TraderApex
+from position_guardian import PositionGuardian
+from runtime_apex import AsyncRuntimeApex
 from setup_interactive import run_interactive_setup
 
 class ApexPredatorBot:
@@ -49,8 +53,12 @@ class ApexPredatorBot:
         # Initialise les composants
         print("\n📦 Chargement des modules...")
         self.collector = DataCollectorApex()
+        if config.STREAM_ENABLED:
+            self.collector.start_stream()
+        self.indicators = IncrementalIndicators(maxlen=config.DATA_FETCH_LIMIT)
         self.ai = ApexAI()
         self.trader = TraderApex()
+        self.guardian = PositionGuardian(self.trader, self.collector)
         
         # État
         self.running = False
@@ -58,6 +66,7 @@ class ApexPredatorBot:
         self.session_start = datetime.now()
         self.observation_start = None
         self.can_trade = False
+        self.runtime = None
         
         # Stats session
         self.stats = {
@@ -117,79 +126,19 @@ class ApexPredatorBot:
         print("="*70)
         
         try:
-            # 1. Récupère les données
-            print("\n📊 Récupération des données...")
-            df = self.collector.get_historical_data(limit=config.DATA_FETCH_LIMIT)
-            
-            if df is None or len(df) < config.MIN_CANDLES_BEFORE_TRADE:
-                print("❌ Pas assez de données")
+            # Bougies + order flow récupérés en parallèle
+            with_order_flow = config.SHOW_ORDER_FLOW and self.iteration % 5 == 0
+            df, snapshot = self.fetch_market(with_order_flow)
+            if df is None:
                 return
             
-            print(f"✅ {len(df)} bougies récupérées")
-            
-            # 2. Calcule les indicateurs
-            print("🔢 Calcul des indicateurs avancés...")
-            df = AdvancedIndicators.calculate_all(df)
-            
-            # 3. Prix actuel
-            current_price = df.iloc[-1]['close']
-            
-            # 4. Affiche les indicateurs
-            if config.SHOW_INDICATORS:
-                AdvancedIndicators.print_current_indicators(df)
-            
-            # 5. Analyse Order Flow
-            if config.SHOW_ORDER_FLOW and self.iteration % 5 == 0:
-                print("\n📊 Analyse Order Flow...")
-                order_flow = self.collector.get_market_depth_analysis()
-                if order_flow:
-                    self.collector.print_order_flow_analysis(order_flow)
-            
-            # 6. Analyse IA COMPLÈTE
-            print("\n🧠 Analyse IA APEX en cours...")
-            analysis = self.ai.analyze_complete(df)
-            
-            if not analysis:
-                print("❌ Analyse IA impossible")
-                return
-            
-            # Affiche l'analyse
-            self.ai.print_analysis(analysis)
-            
-            # Enregistre le score
-            self.stats['apex_scores'].append(analysis['apex_score']['total_score'])
-            
-            # 7. Vérifie phase d'observation
-            if not self.can_trade:
-                if not self.is_observation_complete():
-                    remaining = config.MIN_OBSERVATION_TIME - (datetime.now() - self.observation_start).total_seconds()
-                    print(f"\n⏳ Phase d'observation: {remaining/60:.1f} minutes restantes")
-
-                    # EMERGENCY BUY : Si opportunité EXCEPTIONNELLE, trade quand même !
-                    apex_score = analysis['apex_score']['total_score']
-                    if apex_score >= 92 and analysis['decision']['action'] == 'buy':
-                        print(f"\n🚨 OPPORTUNITÉ EXCEPTIONNELLE DÉTECTÉE!")
-                        print(f"   APEX Score: {apex_score:.1f}/100 (>92)")
-                        print(f"   🔥 EMERGENCY BUY activé - Phase d'observation ignorée!")
-                        self.can_trade = True  # Active temporairement
-                    else:
-                        return
-                else:
-                    self.can_trade = True
-                    print("\n✅ PHASE D'OBSERVATION TERMINÉE!")
-                    print("🦈 Le bot peut maintenant attaquer!")
-            
-            # 8. Gestion des positions existantes
-            if self.trader.has_position():
-                self._manage_open_position(current_price, df, analysis)
+            df, analysis = self.analyze(df)
             
-            # 9. Cherche opportunités d'achat
-            else:
-                self._look_for_entry(current_price, df, analysis)
+            # Analyse Order Flow
+            if snapshot['order_flow']:
+                self.show_order_flow(snapshot['order_flow'])
             
-            # 10. Stats toutes les 10 itérations
-            if self.iteration % config.STATS_DISPLAY_FREQUENCY == 0:
-                self._print_session_stats()
+            self.handle_analysis(df, analysis)
         
         except KeyboardInterrupt:
             raise
@@ -198,6 +147,118 @@ class ApexPredatorBot:
             import traceback
             traceback.print_exc()
     
+    def fetch_market(self, with_order_flow=False):
+        """
+        1. Récupère la photo du marché (bougies, et carnet + trades si demandé)
+        
+        Returns:
+            tuple: (CandleFrame OHLCV ou None si pas assez de données, snapshot)
+        """
+        print("\n📊 Récupération des données...")
+        snapshot = self.collector.get_market_snapshot(limit=config.DATA_FETCH_LIMIT,
+                                                      with_order_flow=with_order_flow,
+                                                      as_frame=True)
+        df = snapshot['candles']
+        
+        if df is None or len(df) < config.MIN_CANDLES_BEFORE_TRADE:
+            print("❌ Pas assez de données")
+            return None, snapshot
+        
+        print(f"✅ {len(df)} bougies récupérées")
+        return df, snapshot
+    
+    def fetch_candles(self):
+        """
+        1. Récupère les bougies seules
+        
+        Returns:
+            CandleFrame OHLCV ou None si pas assez de données
+        """
+        df, _ = self.fetch_market()
+        return df
+    
+    def analyze(self, df):
+        """
+        2. Indicateurs + analyse IA complète (partie coûteuse en CPU)
+        
+        Returns:
+            tuple: (CandleFrame avec indicateurs, analyse ou None)
+        """
+        print("🔢 Calcul des indicateurs avancés...")
+        if config.INCREMENTAL_INDICATORS:
+            df = self.indicators.calculate_all(df)
+        else:
+            df = AdvancedIndicators.calculate_all(df)
+        
+        print("\n🧠 Analyse IA APEX en cours...")
+        analysis = self.ai.analyze_complete(df, forming=config.CLOSED_BAR_STRUCTURE)
+        
+        return df, analysis
+    
+    def show_order_flow(self, order_flow=None):
+        """Analyse Order Flow (récupérée si non fournie)"""
+        print("\n📊 Analyse Order Flow...")
+        if order_flow is None:
+            order_flow = self.collector.get_market_depth_analysis()
+        if order_flow:
+            self.collector.print_order_flow_analysis(order_flow)
+    
+    def handle_analysis(self, df, analysis):
+        """
+        3. Affichage, phase d'observation puis gestion position / entrée
+        
+        Returns:
+            bool: True si l'analyse a été transmise à la gestion des ordres
+        """
+        current_price = df.last('close')
+        
+        if config.SHOW_INDICATORS:
+            AdvancedIndicators.print_current_indicators(df)
+        
+        if not analysis:
+            print("❌ Analyse IA impossible")
+            return False
+        
+        # Affiche l'analyse
+        self.ai.print_analysis(analysis)
+        
+        # Enregistre le score
+        self.stats['apex_scores'].append(analysis['apex_score']['total_score'])
+        
+        # Vérifie phase d'observation
+        if not self.can_trade:
+            if not self.is_observation_complete():
+                remaining = config.MIN_OBSERVATION_TIME - (datetime.now() - self.observation_start).total_seconds()
+                print(f"\n⏳ Phase d'observation: {remaining/60:.1f} minutes restantes")
+
+                # EMERGENCY BUY : Si opportunité EXCEPTIONNELLE, trade quand même !
+                apex_score = analysis['apex_score']['total_score']
+                if apex_score >= 92 and analysis['decision']['action'] == 'buy':
+                    print(f"\n🚨 OPPORTUNITÉ EXCEPTIONNELLE DÉTECTÉE!")
+                    print(f"   APEX Score: {apex_score:.1f}/100 (>92)")
+                    print(f"   🔥 EMERGENCY BUY activé - Phase d'observation ignorée!")
+                    self.can_trade = True  # Active temporairement
+                else:
+                    return False
+            else:
+                self.can_trade = True
+                print("\n✅ PHASE D'OBSERVATION TERMINÉE!")
+                print("🦈 Le bot peut maintenant attaquer!")
+        
+        # Gestion des positions existantes
+        if self.trader.has_position():
+            self._manage_open_position(current_price, df, analysis)
+        
+        # Cherche opportunités d'achat
+        else:
+            self._look_for_entry(current_price, df, analysis)
+        
+        # Stats toutes les 10 itérations
+        if self.iteration % config.STATS_DISPLAY_FREQUENCY == 0:
+            self._print_session_stats()
+        
+        return True
+    
     def _manage_open_position(self, current_price, df, analysis):
         """Gère une position ouverte avec sorties dynamiques intelligentes"""
         position = self.trader.get_position_info()
@@ -219,25 +280,17 @@ class ApexPredatorBot:
         if position['targets_hit']:
             print(f"✅ Targets atteints: {', '.join(position['targets_hit'])}")
 
-        # Vérifie multi-targets
-        target_hit = self.trader.check_multi_target_exit(current_price)
-
-        # Vérifie stop-loss
-        if current_price <= position['stop_loss']:
-            print(f"\n🛑 STOP-LOSS ATTEINT!")
-            self.trader.sell(current_price, "Stop-loss")
-            return
-
-        # Vérifie take-profit
-        if current_price >= position['take_profit']:
-            print(f"\n🎯 TAKE-PROFIT ATTEINT!")
-            self.trader.sell(current_price, "Take-profit")
+        # Stop-loss, trailing, multi-targets, take-profit (même contrôle que le
+        # gardien, qui a pu fermer la position pendant l'analyse)
+        self.guardian.check(config.SYMBOL, current_price)
+        if not self.trader.has_position():
             return
 
         # 🔥 NOUVEAU: ÉVALUE LES CONDITIONS DE SORTIE DYNAMIQUE
         if config.DYNAMIC_EXITS_ENABLED:
             entry_apex_score = position.get('entry_apex_score', 70)  # Default si pas stocké
-            exit_eval = self.ai.evaluate_exit_conditions(df, current_price, position, entry_apex_score)
+            exit_eval = self.ai.evaluate_exit_conditions(df, current_price, position, entry_apex_score,
+                                                         forming=config.CLOSED_BAR_STRUCTURE)
 
             if exit_eval['should_exit']:
                 print(f"\n🚨 SORTIE DYNAMIQUE DÉTECTÉE!")
@@ -320,24 +373,12 @@ class ApexPredatorBot:
             print(f"   APEX Score: {apex_score:.1f}/100 ✅")
             print(f"   Confiance: {analysis['confidence']:.0f}%")
             
-            # Calcule stop-loss et take-profit
-            atr = df.iloc[-1]['atr']
-            regime = analysis['market_regime']
-            
-            # Stop-loss adaptatif
-            stop_distance = max(
-                config.STOP_LOSS_PERCENT,
-                (atr / current_price) * config.ATR_MULTIPLIER
-            )
-            stop_loss = current_price * (1 - stop_distance)
-            
-            # Take-profit adaptatif
-            take_profit = current_price * (1 + config.TAKE_PROFIT_PERCENT)
-            
-            # Vérifie Risk/Reward
-            risk = current_price - stop_loss
-            reward = take_profit - current_price
-            rr_ratio = reward / risk if risk > 0 else 0
+            # Calcule stop-loss, take-profit et taille de position
+            plan = self.trader.compute_entry_plan(current_price, df.last('atr'), apex_score)
+            stop_loss = plan['stop_loss']
+            take_profit = plan['take_profit']
+            stop_distance = plan['stop_distance']
+            rr_ratio = plan['rr_ratio']
             
             print(f"\n📊 ANALYSE DU TRADE:")
             print(f"   Prix entrée: ${current_price:.2f}")
@@ -350,31 +391,12 @@ class ApexPredatorBot:
                 print(f"\n❌ R/R ratio insuffisant (min: {config.MIN_RISK_REWARD_RATIO}:1)")
                 return
             
-            # 🆕 Calcule la taille de position ADAPTATIVE (selon APEX Score)
-            capital = config.INITIAL_CAPITAL + self.trader.total_profit
-            base_position_size = capital * config.DEFAULT_POSITION_SIZE
-
-            # Ajuste la taille selon le score APEX
-            if config.ADAPTIVE_POSITION_SIZING:
-                if apex_score >= config.IDEAL_APEX_SCORE:
-                    # Score excellent (88+) → Grande position (130%)
-                    multiplier = config.LARGE_POSITION_MULTIPLIER
-                    size_label = "GRANDE"
-                elif apex_score >= config.GOOD_APEX_SCORE:
-                    # Bon score (80-88) → Position moyenne (100%)
-                    multiplier = config.MEDIUM_POSITION_MULTIPLIER
-                    size_label = "MOYENNE"
-                else:
-                    # Score acceptable (75-80) → Petite position (60%)
-                    multiplier = config.SMALL_POSITION_MULTIPLIER
-                    size_label = "PETITE"
-
-                position_size = base_position_size * multiplier
-            else:
-                position_size = base_position_size
-                size_label = "STANDARD"
-
-            quantity = position_size / current_price
+            # 🆕 Taille de position ADAPTATIVE (selon APEX Score)
+            capital = plan['capital']
+            position_size = plan['position_size']
+            quantity = plan['quantity']
+            multiplier = plan['multiplier']
+            size_label = plan['size_label']
 
             print(f"\n💰 POSITION ({size_label}):")
             print(f"   Capital disponible: ${capital:.2f}")
@@ -427,6 +449,29 @@ class ApexPredatorBot:
             print(f"\n🎯 APEX Score moyen: {avg_score:.1f}/100")
             print(f"🎯 APEX Score max: {max_score:.1f}/100")
         
+        cache = self.ai.cache_stats
+        if cache['hits']:
+            print(f"🧠 Cache d'analyse: {cache['hits']} réutilisations / {cache['misses']} calculs")
+        if cache['structure_hits']:
+            print(f"🏗️  Structure (S/R, profil, patterns): {cache['structure_misses']} calculs "
+                  f"pour {cache['structure_hits'] + cache['structure_misses']} ticks")
+        
+        guardian = self.guardian.get_summary()
+        if guardian['checks']:
+            print(f"🛡️  Gardien: {guardian['checks']} contrôles ({guardian['avg_check_us']:.0f} µs en moyenne), "
+                  f"{guardian['exits']} sorties")
+        
+        read_cache = self.collector.read_cache
+        if read_cache.stats['hits'] or read_cache.stats['stale_hits']:
+            print(f"🗄️  Cache API: {read_cache.hit_rate:.0%} de lectures sans appel "
+                  f"({read_cache.stats['misses']} appels)")
+        
+        if self.runtime is not None:
+            latency = self.runtime.get_latency_summary()
+            if latency:
+                print(f"⏱️  Latence bougie → décision: médiane {latency['median_ms']:.0f} ms, "
+                      f"p95 {latency['p95_ms']:.0f} ms")
+        
         # Performance trading
         perf = self.trader.get_performance_summary()
         if perf['total_trades'] > 0:
@@ -449,13 +494,20 @@ class ApexPredatorBot:
         
         self.running = True
         self.start_observation_phase()
+        if config.POSITION_GUARDIAN_ENABLED:
+            self.guardian.start()
         
         try:
-            while self.running:
-                self.run_iteration()
-                
-                if self.running:
-                    time.sleep(config.ANALYSIS_INTERVAL)
+            if config.ASYNC_MAIN_LOOP:
+                # Analyse déclenchée par les bougies, I/O et calculs en parallèle
+                self.runtime = AsyncRuntimeApex(self)
+                asyncio.run(self.runtime.run())
+            else:
+                while self.running:
+                    self.run_iteration()
+                    
+                    if self.running:
+                        time.sleep(config.ANALYSIS_INTERVAL)
         
         except KeyboardInterrupt:
             print("\n\n⚠️  Arrêt demandé...")
@@ -474,6 +526,9 @@ class ApexPredatorBot:
         print("="*70)
         
         self.running = False
+
+        if self.collector.stream is not None:
+            self.collector.stream.stop()
         
         # Position ouverte ?
         if self.trader.has_position():
@@ -485,10 +540,17 @@ class ApexPredatorBot:
                 pnl = ((current_price - position['entry_price']) / position['entry_price']) * 100
                 print(f"   P&L actuel: {pnl:+.2f}%")
             
+            if self.trader.protection.active:
+                print(f"   🛡️  Stop posé sur l'exchange (${self.trader.protection.placed_stop:.2f}) : "
+                      f"reste actif après l'arrêt")
+
             response = input("\nFermer la position maintenant? (y/n): ")
             if response.lower() == 'y':
                 if current_price:
                     self.trader.sell(current_price, "Arrêt du bot")
+
+        # Le gardien protège la position jusqu'à la réponse ci-dessus
+        self.guardian.stop()
         
         # Rapport final
         self._generate_final_report()
@@ -0,0 +1,457 @@
+# multi_symbol_apex.py - Scan multi-paires dans un seul processus (APEX)
+
+import argparse
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import config_apex as config
+from config_apex import ConfigOverlay
+from logger_apex import get_logger
+from data_collector_apex import DataCollectorApex
+from indicators_incremental import IncrementalIndicators
+from ai_apex import ApexAI
+from trader_apex import TraderApex
+from position_guardian import PositionGuardian
+from rate_limiter import BINANCE_WEIGHTS
+
+# Bases exclues de la sélection automatique (stablecoins, tokens à levier)
+EXCLUDED_BASES = {'USDC', 'BUSD', 'TUSD', 'FDUSD', 'USDP', 'DAI', 'EUR', 'GBP'}
+LEVERAGED_SUFFIXES = ('UP', 'DOWN', 'BULL', 'BEAR')
+
+
+def select_top_symbols(collector, n=None, quote=None):
+    """
+    Sélectionne les paires spot les plus liquides (volume 24h en devise de cotation)
+
+    Args:
+        collector: DataCollectorApex connecté
+        n: Nombre de paires (défaut: config.MULTI_TOP_N)
+        quote: Devise de cotation (défaut: config.MULTI_QUOTE)
+
+    Returns:
+        list: Paires triées par volume décroissant
+    """
+    n = n or config.MULTI_TOP_N
+    quote = quote or config.MULTI_QUOTE
+
+    markets = collector.load_markets() or {}
+    collector.rate_limiter.acquire(BINANCE_WEIGHTS['fetch_tickers'])
+    tickers = collector.exchange.fetch_tickers()
+
+    candidates = []
+    for symbol, ticker in tickers.items():
+        market = markets.get(symbol)
+        if market is None or not market.get('spot') or not market.get('active', True):
+            continue
+        if market['quote'] != quote:
+            continue
+
+        base = market['base']
+        if base in EXCLUDED_BASES or base.endswith(LEVERAGED_SUFFIXES):
+            continue
+
+        candidates.append((ticker.get('quoteVolume') or 0, symbol))
+
+    candidates.sort(reverse=True)
+    return [symbol for _, symbol in candidates[:n]]
+
+
+class SymbolState:
+    """État complet d'une paire : paramètres, indicateurs, IA, trader"""
+
+    def __init__(self, symbol, settings=None, exchange=None):
+        """
+        Args:
+            symbol: Paire suivie
+            settings: Paramètres de base (défaut: config)
+            exchange: Client ccxt partagé pour les ordres réels
+        """
+        self.symbol = symbol
+        base = settings if settings is not None else config
+        # Modules de la paire silencieux (sauf ordres) : MULTI_VERBOSE pour les détails
+        self.settings = ConfigOverlay(settings, SYMBOL=symbol, VERBOSE=base.MULTI_VERBOSE)
+
+        self.indicators = IncrementalIndicators(maxlen=self.settings.DATA_FETCH_LIMIT,
+                                                settings=self.settings)
+        self.ai = ApexAI(settings=self.settings)
+        self.trader = TraderApex(settings=self.settings, exchange=exchange)
+
+        self.df = None
+        self.analysis = None
+        self.error = None
+
+    @property
+    def apex_score(self):
+        if not self.analysis:
+            return None
+        return self.analysis['apex_score']['total_score']
+
+    @property
+    def current_price(self):
+        if self.df is None:
+            return None
+        return self.df.last('close')
+
+    def analyze(self, df):
+        """Indicateurs incrémentaux + analyse IA complète"""
+        self.df = self.indicators.calculate_all(df)
+        self.analysis = self.ai.analyze_complete(self.df, forming=self.settings.CLOSED_BAR_STRUCTURE)
+        return self.analysis
+
+
+class PortfolioRiskManager:
+    """
+    Plafonds de risque au niveau du portefeuille
+
+    - nombre de positions simultanées limité
+    - exposition totale (valeur des positions) limitée à une fraction du capital
+    - capital = capital initial + profits réalisés de toutes les paires
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings if settings is not None else config
+
+    def equity(self, states):
+        """Capital du portefeuille"""
+        return self.settings.INITIAL_CAPITAL + sum(state.trader.total_profit for state in states)
+
+    @staticmethod
+    def open_positions(states):
+        return [state for state in states if state.trader.has_position()]
+
+    def exposure(self, states):
+        """Valeur investie (prix d'entrée × quantité restante)"""
+        return sum(
+            state.trader.position['entry_price'] * state.trader.position['quantity']
+            for state in self.open_positions(states)
+        )
+
+    def allowed_size(self, requested_size, states):
+        """
+        Taille autorisée pour une nouvelle position
+
+        Returns:
+            float: Taille en devise de cotation (0 si refusée)
+        """
+        if len(self.open_positions(states)) >= self.settings.PORTFOLIO_MAX_OPEN_POSITIONS:
+            return 0.0
+
+        budget = self.equity(states) * self.settings.PORTFOLIO_MAX_EXPOSURE - self.exposure(states)
+        size = min(requested_size, budget)
+
+        if size < self.settings.MIN_ORDER_SIZE:
+            return 0.0
+        return size
+
+
+class MultiSymbolScanner:
+    """
+    Scan d'une watchlist à chaque clôture de bougie
+
+    1. Téléchargement des bougies de toutes les paires en parallèle
+       (pool de threads, budget de poids API partagé)
+    2. Analyse IA de chaque paire (pool de workers, état propre à chaque paire)
+    3. Gestion des positions ouvertes
+    4. Classement des candidats par APEX Score, entrées dans l'ordre
+       tant que le plafond de risque du portefeuille le permet
+    """
+
+    def __init__(self, collector=None, symbols=None, settings=None):
+        """
+        Args:
+            collector: DataCollectorApex (créé si absent)
+            symbols: Watchlist (défaut: config.MULTI_SYMBOLS ou top paires)
+            settings: Paramètres (défaut: module config, ou ConfigOverlay)
+        """
+        self.logger = get_logger()
+        self.settings = settings if settings is not None else config
+        self.collector = collector or DataCollectorApex()
+
+        if symbols is None:
+            symbols = self.settings.MULTI_SYMBOLS or select_top_symbols(self.collector)
+        self.symbols = list(symbols)
+
+        exchange = None if self.settings.DRY_RUN else self.collector.exchange
+        self.states = {
+            symbol: SymbolState(symbol, self.settings, exchange)
+            for symbol in self.symbols
+        }
+        self.risk = PortfolioRiskManager(self.settings)
+        self.guardian = PositionGuardian({symbol: state.trader for symbol, state in self.states.items()},
+                                         self.collector, self.settings)
+
+        self.fetch_pool = ThreadPoolExecutor(max_workers=self.settings.MULTI_FETCH_WORKERS,
+                                             thread_name_prefix="apex-multi-fetch")
+        self.analysis_pool = ThreadPoolExecutor(max_workers=self.settings.MULTI_ANALYSIS_WORKERS,
+                                                thread_name_prefix="apex-multi-analysis")
+
+        self.timeframe_ms = self.collector.exchange.parse_timeframe(self.settings.TIMEFRAME) * 1000 \
+            if self.collector.exchange is not None else 60000
+
+        self.start_time = datetime.now()
+        self.cycles = 0
+        self.running = False
+
+        print(f"✅ Scanner multi-paires: {len(self.symbols)} paire(s)")
+        self.logger.info(f"Scanner multi-paires: {self.symbols}")
+
+    # ═══════════════════════════════════════════════════════════
+    # 🔄 CYCLE
+    # ═══════════════════════════════════════════════════════════
+
+    def _fetch(self, symbol):
+        return self.collector.get_live_data(symbol, self.settings.TIMEFRAME,
+                                            limit=self.settings.DATA_FETCH_LIMIT, as_frame=True,
+                                            verbose=self.settings.MULTI_VERBOSE)
+
+    def fetch_all(self):
+        """
+        Bougies de toutes les paires en parallèle
+
+        Returns:
+            dict: {symbol: DataFrame ou None}
+        """
+        futures = {symbol: self.fetch_pool.submit(self._fetch, symbol) for symbol in self.symbols}
+        return {symbol: future.result() for symbol, future in futures.items()}
+
+    def _analyze(self, state, df):
+        try:
+            state.error = None
+            return state.analyze(df)
+        except Exception as e:
+            state.error = str(e)
+            state.analysis = None
+            return None
+
+    def analyze_all(self, candles):
+        """Analyse IA de chaque paire ayant assez de bougies"""
+        futures = []
+        for symbol, df in candles.items():
+            state = self.states[symbol]
+            if df is None or len(df) < self.settings.MIN_CANDLES_BEFORE_TRADE:
+                state.analysis = None
+                continue
+            futures.append(self.analysis_pool.submit(self._analyze, state, df))
+
+        for future in futures:
+            future.result()
+
+    def rank(self):
+        """
+        Paires analysées classées par APEX Score décroissant
+
+        Returns:
+            list: SymbolState
+        """
+        analyzed = [state for state in self.states.values() if state.analysis]
+        return sorted(analyzed, key=lambda state: state.apex_score, reverse=True)
+
+    def _observation_complete(self):
+        elapsed = (datetime.now() - self.start_time).total_seconds()
+        return elapsed >= self.settings.MIN_OBSERVATION_TIME
+
+    def manage_positions(self):
+        """Stop, target, sorties dynamiques des positions ouvertes"""
+        for state in self.risk.open_positions(self.states.values()):
+            if not state.analysis:
+                continue
+
+            trader = state.trader
+            current_price = state.current_price
+
+            # Stop, trailing, targets, take-profit (contrôle du gardien)
+            self.guardian.check(state.symbol, current_price)
+            position = trader.position
+            if position is None:
+                continue
+
+            if self.settings.DYNAMIC_EXITS_ENABLED:
+                exit_eval = state.ai.evaluate_exit_conditions(state.df, current_price, position,
+                                                              position.get('entry_apex_score', 70),
+                                                              forming=self.settings.CLOSED_BAR_STRUCTURE)
+
+                if exit_eval['should_exit'] and exit_eval['urgency'] in ['critical', 'high', 'medium']:
+                    reasons = ', '.join(exit_eval['reasons'][:2])
+                    if exit_eval['exit_type'] == 'full':
+                        trader.sell(current_price, f"Sortie dynamique: {reasons}")
+                    else:
+                        trader.sell_partial(current_price, exit_eval['exit_percent'],
+                                            f"Sortie partielle: {reasons}")
+                    continue
+
+            if state.analysis['decision']['action'] == 'sell' and state.analysis['confidence'] >= 80:
+                trader.sell(current_price, "Signal IA")
+
+    def route_entries(self, ranked):
+        """
+        Entrées dans l'ordre du classement, sous plafond de risque du portefeuille
+
+        Returns:
+            list: Paires achetées
+        """
+        observation_done = self._observation_complete()
+        states = list(self.states.values())
+        entered = []
+
+        for state in ranked:
+            apex_score = state.apex_score
+            if apex_score < self.settings.MIN_APEX_SCORE:
+                break
+
+            if state.trader.has_position() or state.analysis['decision']['action'] != 'buy':
+                continue
+
+            # Phase d'observation (sauf opportunité exceptionnelle)
+            if not observation_done and apex_score < 92:
+                continue
+
+            current_price = state.current_price
+            plan = state.trader.compute_entry_plan(current_price, state.df.last('atr'), apex_score)
+            if plan['rr_ratio'] < self.settings.MIN_RISK_REWARD_RATIO:
+                continue
+
+            # Taille calculée sur le capital du portefeuille, puis plafonnée
+            requested = plan['position_size'] * self.risk.equity(states) / plan['capital']
+            size = self.risk.allowed_size(requested, states)
+            if size <= 0:
+                continue
+
+            position = state.trader.buy(current_price, size / current_price, plan['stop_loss'],
+                                        plan['take_profit'], apex_score=apex_score)
+            if position:
+                entered.append(state.symbol)
+
+        return entered
+
+    def run_cycle(self):
+        """
+        Un cycle complet (fetch → analyse → positions → entrées)
+
+        Les détails par paire suivent MULTI_VERBOSE ; les ordres et les
+        sorties du gardien restent toujours affichés.
+
+        Returns:
+            dict: Résumé du cycle (durées, classement, entrées)
+        """
+        self.cycles += 1
+        start = time.perf_counter()
+
+        candles = self.fetch_all()
+        fetched = time.perf_counter()
+
+        self.analyze_all(candles)
+        analyzed = time.perf_counter()
+
+        ranked = self.rank()
+        self.manage_positions()
+        entered = self.route_entries(ranked)
+
+        end = time.perf_counter()
+
+        return {
+            'cycle': self.cycles,
+            'scanned': len(ranked),
+            'fetch_time': fetched - start,
+            'analysis_time': analyzed - fetched,
+            'total_time': end - start,
+            'ranking': [(state.symbol, state.apex_score, state.analysis['decision']['action'])
+                        for state in ranked],
+            'entered': entered,
+            'errors': {state.symbol: state.error for state in self.states.values() if state.error}
+        }
+
+    def print_cycle(self, summary, top=10):
+        """Affiche le résumé d'un cycle"""
+        states = list(self.states.values())
+
+        print("\n" + "="*70)
+        print(f"🌐 SCAN MULTI-PAIRES #{summary['cycle']} - {datetime.now().strftime('%H:%M:%S')}".center(70))
+        print("="*70)
+        print(f"📊 {summary['scanned']}/{len(self.symbols)} paires analysées en {summary['total_time']:.2f}s "
+              f"(fetch {summary['fetch_time']:.2f}s, analyse {summary['analysis_time']:.2f}s)")
+
+        print(f"\n🏆 TOP {top} APEX SCORE:")
+        for rank, (symbol, score, action) in enumerate(summary['ranking'][:top], 1):
+            emoji = "🟢" if action == 'buy' else "🔴" if action == 'sell' else "⚪"
+            print(f"   {rank:>2}. {emoji} {symbol:<12} {score:>5.1f}/100  {action.upper()}")
+
+        if summary['entered']:
+            print(f"\n🚀 Entrées: {', '.join(summary['entered'])}")
+
+        open_positions = self.risk.open_positions(states)
+        print(f"\n💼 Positions: {len(open_positions)}/{self.settings.PORTFOLIO_MAX_OPEN_POSITIONS} "
+              f"| Exposition: ${self.risk.exposure(states):.2f} "
+              f"| Capital: ${self.risk.equity(states):.2f}")
+
+        for symbol, error in summary['errors'].items():
+            print(f"   ⚠️  {symbol}: {error}")
+
+        print("="*70)
+
+    def _wait_next_candle(self):
+        """Attend la clôture de la prochaine bougie (+ MULTI_SCAN_DELAY)"""
+        now_ms = time.time() * 1000
+        next_close = math.ceil(now_ms / self.timeframe_ms) * self.timeframe_ms
+        time.sleep(max(0.0, (next_close - now_ms) / 1000 + self.settings.MULTI_SCAN_DELAY))
+
+    def run(self, cycles=None):
+        """
+        Boucle calée sur les clôtures de bougies
+
+        Args:
+            cycles: Nombre de cycles (défaut: infini)
+        """
+        self.running = True
+        period = self.timeframe_ms / 1000
+        if self.settings.POSITION_GUARDIAN_ENABLED:
+            self.guardian.start()
+
+        try:
+            while self.running and (cycles is None or self.cycles < cycles):
+                summary = self.run_cycle()
+                self.print_cycle(summary)
+
+                if summary['total_time'] > period:
+                    print(f"⚠️  Cycle plus long que la bougie ({summary['total_time']:.1f}s > {period:.0f}s)")
+                    self.logger.warning(f"Scan multi-paires en retard: {summary['total_time']:.1f}s")
+
+                if self.running and (cycles is None or self.cycles < cycles):
+                    self._wait_next_candle()
+
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Arrêt demandé...")
+
+        finally:
+            self.running = False
+            self.guardian.stop()
+            self.fetch_pool.shutdown(wait=False)
+            self.analysis_pool.shutdown(wait=False)
+
+
+def main():
+    """Point d'entrée du scan multi-paires"""
+    parser = argparse.ArgumentParser(description="Scan multi-paires APEX")
+    parser.add_argument('--symbols', nargs='+', default=None,
+                        help="Watchlist (défaut: config.MULTI_SYMBOLS ou top paires)")
+    parser.add_argument('--top', type=int, default=None, help="Nombre de paires les plus liquides")
+    parser.add_argument('--quote', default=None, help="Devise de cotation (défaut: USDT)")
+    parser.add_argument('--profile', default=config.ACTIVE_PROFILE)
+    parser.add_argument('--cycles', type=int, default=None, help="Nombre de scans (défaut: infini)")
+    args = parser.parse_args()
+
+    settings = ConfigOverlay(**config.profile_overrides(args.profile))
+    collector = DataCollectorApex()
+    if collector.exchange is None:
+        return
+
+    symbols = args.symbols
+    if symbols is None and (args.top or args.quote or not config.MULTI_SYMBOLS):
+        symbols = select_top_symbols(collector, args.top, args.quote)
+
+    scanner = MultiSymbolScanner(collector, symbols, settings)
+    scanner.run(args.cycles)
+
+
+if __name__ == "__main__":
+    main()
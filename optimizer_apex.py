@@ -0,0 +1,404 @@
+# optimizer_apex.py - Optimisation walk-forward des profils et seuils (APEX)
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import config_apex as config
+from config_apex import ConfigOverlay
+from candle_store import load_ohlcv_csv, symbol_timeframe_from_path
+from backtest_apex import BacktestEngine, OHLCV_COLUMNS
+
+# Espace de recherche par défaut (noms des paramètres de config_apex)
+DEFAULT_SEARCH_SPACE = {
+    'MIN_APEX_SCORE': [70, 75, 80, 85],
+    'STOP_LOSS_PERCENT': [0.006, 0.009, 0.012],
+    'TAKE_PROFIT_PERCENT': [0.020, 0.028, 0.035],
+    'EXIT_APEX_DROP_THRESHOLD': [-10, -15, -25]
+}
+
+METRICS = ['calmar', 'return', 'profit']
+
+# Données partagées du worker (vues numpy sur la mémoire partagée)
+_shared = {}
+
+
+# ═══════════════════════════════════════════════════════════
+# 🧮 DONNÉES PARTAGÉES (lecture seule, sans copie par worker)
+# ═══════════════════════════════════════════════════════════
+
+def _share_candles(df):
+    """
+    Copie les bougies une seule fois en mémoire partagée
+    Disposition : timestamps int64 (n) puis bloc float64 (5 x n) OHLCV
+
+    Returns:
+        SharedMemory: Segment à passer aux workers (par nom)
+    """
+    n = len(df)
+    shm = shared_memory.SharedMemory(create=True, size=n * 8 * (1 + len(OHLCV_COLUMNS)))
+
+    timestamps = np.ndarray((n,), dtype=np.int64, buffer=shm.buf)
+    timestamps[:] = df['timestamp'].to_numpy(dtype=np.int64)
+
+    block = np.ndarray((len(OHLCV_COLUMNS), n), dtype=np.float64, buffer=shm.buf, offset=n * 8)
+    for k, col in enumerate(OHLCV_COLUMNS):
+        block[k] = df[col].to_numpy(dtype=float)
+
+    return shm
+
+
+def _init_worker(shm_name, n):
+    """Initialise un worker : se rattache à la mémoire partagée, coupe les affichages"""
+    sys.stdout = open(os.devnull, 'w')
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _shared['shm'] = shm  # Garde le segment ouvert tant que le worker vit
+    _shared['timestamp'] = np.ndarray((n,), dtype=np.int64, buffer=shm.buf)
+
+    block = np.ndarray((len(OHLCV_COLUMNS), n), dtype=np.float64, buffer=shm.buf, offset=n * 8)
+    for k, col in enumerate(OHLCV_COLUMNS):
+        _shared[col] = block[k]
+
+
+def _run_task(task):
+    """
+    Worker : un backtest sur une portion de l'historique
+    Les paramètres sont passés via un ConfigOverlay (config global intact)
+    """
+    combo_id, params, base_overrides, symbol, timeframe, lo, hi, fold, segment = task
+
+    settings = ConfigOverlay(**{**base_overrides, **params})
+    data = {col: _shared[col][lo:hi] for col in ['timestamp'] + OHLCV_COLUMNS}
+
+    engine = BacktestEngine(data, symbol, timeframe, settings=settings)
+    summary = engine.run(progress_every=0)
+
+    return {
+        'combo_id': combo_id,
+        'fold': fold,
+        'segment': segment,
+        'return_percent': summary['return_percent'],
+        'max_drawdown_percent': summary['max_drawdown_percent'],
+        'total_profit': summary['total_profit'],
+        'total_trades': summary['total_trades'],
+        'win_rate': summary['win_rate']
+    }
+
+
+# ═══════════════════════════════════════════════════════════
+# 🔬 RECHERCHE
+# ═══════════════════════════════════════════════════════════
+
+def build_combinations(search_space, mode='grid', samples=20, seed=42):
+    """
+    Combinaisons de paramètres à tester
+
+    Args:
+        search_space: dict {PARAMETRE: [valeurs]}
+        mode: 'grid' (toutes) ou 'random' (échantillon de la grille)
+        samples: Nombre de combinaisons en mode random
+
+    Returns:
+        list: Liste de dicts {PARAMETRE: valeur}
+    """
+    names = list(search_space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*search_space.values())]
+
+    if mode == 'random' and samples < len(grid):
+        grid = random.Random(seed).sample(grid, samples)
+
+    return grid
+
+
+def walk_forward_splits(n, folds, train_ratio=0.75):
+    """
+    Découpe l'historique en `folds` segments consécutifs : chaque segment
+    est divisé en apprentissage (début) et test hors échantillon (fin)
+
+    Returns:
+        list: [((train_start, train_end), (test_start, test_end)), ...]
+    """
+    segment = n // folds
+    splits = []
+
+    for k in range(folds):
+        start = k * segment
+        end = n if k == folds - 1 else start + segment
+        cut = start + int((end - start) * train_ratio)
+        splits.append(((start, cut), (cut, end)))
+
+    return splits
+
+
+def score_run(result, metric='calmar'):
+    """
+    Score d'un backtest
+
+    - calmar : rendement / drawdown max (drawdown plancher 1%)
+    - return : rendement en %
+    - profit : profit net en USDT
+    """
+    if metric == 'return':
+        return result['return_percent']
+    if metric == 'profit':
+        return result['total_profit']
+    return result['return_percent'] / max(abs(result['max_drawdown_percent']), 1.0)
+
+
+def run_optimization(df, symbol, timeframe, search_space=None, mode='grid', samples=20,
+                     folds=3, train_ratio=0.75, metric='calmar', base_profile=None,
+                     workers=None, seed=42):
+    """
+    Lance la recherche walk-forward en parallèle
+
+    Chaque combinaison est backtestée sur la partie apprentissage et sur la
+    partie test de chaque segment. Les bougies précédant un test servent
+    uniquement à préchauffer les indicateurs.
+
+    Returns:
+        tuple: (classement des combinaisons retenues, choix par segment)
+               - voir rank_results
+    """
+    if search_space is None:
+        search_space = DEFAULT_SEARCH_SPACE
+    if base_profile is None:
+        base_profile = config.ACTIVE_PROFILE
+
+    base_overrides = config.profile_overrides(base_profile)
+    combinations = build_combinations(search_space, mode, samples, seed)
+    splits = walk_forward_splits(len(df), folds, train_ratio)
+
+    context = BacktestEngine.warmup_bars(ConfigOverlay(**base_overrides)) - 1
+
+    tasks = []
+    for combo_id, params in enumerate(combinations):
+        for fold, ((train_lo, train_hi), (test_lo, test_hi)) in enumerate(splits):
+            tasks.append((combo_id, params, base_overrides, symbol, timeframe,
+                          train_lo, train_hi, fold, 'train'))
+            tasks.append((combo_id, params, base_overrides, symbol, timeframe,
+                          max(0, test_lo - context), test_hi, fold, 'test'))
+
+    print(f"🔬 {len(combinations)} combinaisons x {folds} segments = {len(tasks)} backtests")
+
+    shm = _share_candles(df)
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name, len(df))) as executor:
+            futures = [executor.submit(_run_task, task) for task in tasks]
+            for done, future in enumerate(as_completed(futures), start=1):
+                results.append(future.result())
+                if done % max(1, len(tasks) // 20) == 0 or done == len(tasks):
+                    print(f"⏳ {done}/{len(tasks)} backtests")
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return rank_results(results, combinations, metric)
+
+
+def select_walk_forward(runs, combinations):
+    """
+    Choix walk-forward : sur chaque segment, la combinaison au meilleur
+    score d'apprentissage, évaluée sur le test qui suit (jamais vu au choix)
+
+    Args:
+        runs: DataFrame des backtests (avec colonne 'score')
+
+    Returns:
+        DataFrame: Une ligne par segment (combinaison choisie, scores train / test)
+    """
+    train = runs[runs['segment'] == 'train'].sort_values(['fold', 'combo_id'])
+    test = runs[runs['segment'] == 'test'].set_index(['fold', 'combo_id'])
+
+    rows = []
+    for fold, fold_runs in train.groupby('fold'):
+        # Premier meilleur score (égalité : ordre des combinaisons)
+        chosen = fold_runs.loc[fold_runs['score'].idxmax()]
+        combo_id = int(chosen['combo_id'])
+        oos = test.loc[(fold, combo_id)]
+
+        rows.append({
+            'fold': fold,
+            'combo_id': combo_id,
+            **combinations[combo_id],
+            'train_score': chosen['score'],
+            'test_score': oos['score'],
+            'test_return_percent': oos['return_percent'],
+            'test_max_drawdown_percent': oos['max_drawdown_percent'],
+            'test_trades': oos['total_trades'],
+            'test_win_rate': oos['win_rate']
+        })
+
+    return pd.DataFrame(rows)
+
+
+def rank_results(results, combinations, metric='calmar'):
+    """
+    Classe les combinaisons retenues par le walk-forward
+
+    Seules les combinaisons choisies sur un segment (meilleur score
+    d'apprentissage) sont classées : par nombre de segments où elles sont
+    choisies, puis segment le plus récent, puis score d'apprentissage. Les
+    colonnes test_* sont les résultats hors échantillon de ces choix ; elles
+    ne servent jamais au classement.
+
+    Returns:
+        tuple: (classement, choix par segment - voir select_walk_forward)
+    """
+    runs = pd.DataFrame(results)
+    runs['score'] = [score_run(result, metric) for result in results]
+
+    selections = select_walk_forward(runs, combinations)
+
+    rows = []
+    for combo_id, chosen in selections.groupby('combo_id'):
+        rows.append({
+            **combinations[combo_id],
+            'folds_selected': len(chosen),
+            'last_fold': chosen['fold'].max(),
+            'train_score': chosen['train_score'].mean(),
+            'test_score': chosen['test_score'].mean(),
+            'test_return_percent': chosen['test_return_percent'].mean(),
+            'test_max_drawdown_percent': chosen['test_max_drawdown_percent'].min(),
+            'test_trades': chosen['test_trades'].sum(),
+            'test_win_rate': chosen['test_win_rate'].mean()
+        })
+
+    ranking = pd.DataFrame(rows).sort_values(['folds_selected', 'last_fold', 'train_score'],
+                                             ascending=False, kind='stable')
+
+    return ranking.reset_index(drop=True), selections
+
+
+def build_profile(params, base_profile=None, description=None):
+    """
+    Profil prêt à coller dans config_apex.PROFILES
+
+    Les paramètres du format profil (position, score min, stop, target,
+    trades max) remplissent les clés habituelles ; les autres seuils vont
+    dans 'overrides' (appliqués par load_profile).
+    """
+    if base_profile is None:
+        base_profile = config.ACTIVE_PROFILE
+
+    profile = {key: value for key, value in config.PROFILES[base_profile].items()
+               if key in config.PROFILE_PARAMETERS}
+    overrides = dict(config.PROFILES[base_profile].get('overrides', {}))
+
+    names_to_keys = {name: key for key, name in config.PROFILE_PARAMETERS.items()}
+    for name, value in params.items():
+        value = value.item() if isinstance(value, np.generic) else value
+        if name in names_to_keys:
+            profile[names_to_keys[name]] = value
+        else:
+            overrides[name] = value
+
+    profile['description'] = description or f"🔬 Optimisé walk-forward (base: {base_profile})"
+    if overrides:
+        profile['overrides'] = overrides
+
+    return profile
+
+
+def print_ranking(ranking, selections=None, top=10):
+    """Affiche le classement et les choix walk-forward par segment"""
+    float_format = lambda x: f"{x:.4g}"
+
+    with pd.option_context('display.width', 160, 'display.max_columns', None):
+        if selections is not None:
+            print("\n" + "="*60)
+            print("🧭 WALK-FORWARD (choix sur l'apprentissage, résultat hors échantillon)")
+            print("="*60)
+            print(selections.to_string(index=False, float_format=float_format))
+            print(f"\n📈 Score hors échantillon moyen: {selections['test_score'].mean():.4g} - "
+                  f"rendement moyen: {selections['test_return_percent'].mean():+.2f}%")
+
+        print("\n" + "="*60)
+        print(f"🏆 CLASSEMENT (top {min(top, len(ranking))} / {len(ranking)})")
+        print("="*60)
+        print(ranking.head(top).to_string(float_format=float_format))
+
+    print("="*60)
+
+
+def _parse_value(text):
+    """Convertit une valeur de la ligne de commande (int ou float)"""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def main():
+    """Point d'entrée de l'optimiseur"""
+    parser = argparse.ArgumentParser(description="Optimisation walk-forward APEX")
+    parser.add_argument('csv', help="CSV OHLCV (ex: data/history/ETH-USDT_1m.csv)")
+    parser.add_argument('--symbol', help="Paire (défaut: déduite du nom de fichier)")
+    parser.add_argument('--timeframe', help="Timeframe (défaut: déduit du nom de fichier)")
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--samples', type=int, default=20, help="Combinaisons en mode random")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--train-ratio', type=float, default=0.75)
+    parser.add_argument('--metric', choices=METRICS, default='calmar')
+    parser.add_argument('--profile', default=config.ACTIVE_PROFILE, help="Profil de base")
+    parser.add_argument('--param', action='append', default=[],
+                        help="Espace de recherche NOM=v1,v2,... (remplace l'espace par défaut)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='data/optimizer')
+    args = parser.parse_args()
+
+    symbol, timeframe = symbol_timeframe_from_path(args.csv)
+    symbol = args.symbol or symbol
+    timeframe = args.timeframe or timeframe
+
+    search_space = DEFAULT_SEARCH_SPACE
+    if args.param:
+        search_space = {}
+        for spec in args.param:
+            name, _, values = spec.partition('=')
+            search_space[name.strip()] = [_parse_value(v) for v in values.split(',')]
+
+    df = load_ohlcv_csv(args.csv)
+    print(f"📂 {args.csv}: {len(df)} bougies ({symbol} {timeframe})")
+
+    ranking, selections = run_optimization(
+        df, symbol, timeframe, search_space,
+        mode=args.mode, samples=args.samples, folds=args.folds,
+        train_ratio=args.train_ratio, metric=args.metric,
+        base_profile=args.profile, workers=args.workers, seed=args.seed
+    )
+    print_ranking(ranking, selections)
+
+    best = {name: ranking.loc[0, name] for name in search_space}
+    profile = build_profile(best, args.profile)
+
+    print("\n🎯 PROFIL RECOMMANDÉ (à ajouter dans PROFILES):")
+    print(f"'optimized': {json.dumps(profile, indent=4, ensure_ascii=False)}")
+
+    os.makedirs(args.output, exist_ok=True)
+    name = f"{symbol.replace('/', '-')}_{timeframe}"
+    ranking_path = os.path.join(args.output, f"{name}_ranking.csv")
+    folds_path = os.path.join(args.output, f"{name}_walk_forward.csv")
+    profile_path = os.path.join(args.output, f"{name}_profile.json")
+
+    ranking.to_csv(ranking_path, index=False)
+    selections.to_csv(folds_path, index=False)
+    with open(profile_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+
+    print(f"\n💾 Classement: {ranking_path}")
+    print(f"💾 Walk-forward: {folds_path}")
+    print(f"💾 Profil: {profile_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# pattern_reliability.py - Fiabilité des patterns apprise sur l'historique (APEX)
+
+import argparse
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import config_apex as config
+from candle_store import load_ohlcv_csv, symbol_timeframe_from_path
+from pattern_scanner import PatternScanner
+
+# Bougies par tâche envoyée aux workers
+CHUNK_SIZE = 250_000
+
+
+def compute_pattern_stats(df, horizons, start=0, end=None):
+    """
+    Compte les succès de chaque pattern aux différents horizons
+
+    Succès :
+    - pattern haussier : clôture plus haute après h bougies
+    - pattern baissier : clôture plus basse après h bougies
+    - pattern neutre : retournement (rendement futur de signe opposé au rendement passé)
+
+    Args:
+        df: DataFrame OHLCV
+        horizons: Horizons en bougies
+        start, end: Bougies comptabilisées (les autres ne servent que de contexte)
+
+    Returns:
+        dict: {pattern: {horizon: [occurrences, succès, somme des rendements]}}
+    """
+    catalog = PatternScanner._init_pattern_catalog()
+    flags = PatternScanner.pattern_flags(df)
+    close = df['close'].to_numpy(dtype=float)
+    n = len(close)
+
+    counted = np.zeros(n, dtype=bool)
+    counted[start:end] = True
+
+    # Rendements passés et futurs par horizon (NaN hors historique)
+    forward = {}
+    backward = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for h in horizons:
+            fwd = np.full(n, np.nan)
+            past = np.full(n, np.nan)
+            if n > h:
+                fwd[:-h] = close[h:] / close[:-h] - 1
+                past[h:] = close[h:] / close[:-h] - 1
+            forward[h] = fwd
+            backward[h] = past
+
+    stats = {}
+    for name, detected in flags.items():
+        pattern_type = catalog[name]['type']
+        stats[name] = {}
+
+        for h in horizons:
+            fwd = forward[h]
+            valid = detected & counted & np.isfinite(fwd)
+
+            if pattern_type == 'bullish':
+                hits = fwd > 0
+            elif pattern_type == 'bearish':
+                hits = fwd < 0
+            else:
+                past = backward[h]
+                valid &= np.isfinite(past)
+                hits = np.sign(fwd) == -np.sign(past)
+                hits &= fwd != 0
+
+            stats[name][h] = [
+                int(np.count_nonzero(valid)),
+                int(np.count_nonzero(valid & hits)),
+                float(fwd[valid].sum())
+            ]
+
+    return stats
+
+
+def _scan_chunk(task):
+    """Worker : statistiques d'un morceau d'historique (avec marges de contexte)"""
+    key, ohlc, start, end, horizons = task
+    df = pd.DataFrame(ohlc)
+
+    return key, compute_pattern_stats(df, horizons, start, end)
+
+
+def _make_tasks(key, df, horizons, chunk_size=CHUNK_SIZE):
+    """
+    Découpe un historique en morceaux indépendants
+
+    Chaque morceau embarque les bougies précédentes (patterns 3 bougies,
+    rendement passé) et suivantes (rendement futur) nécessaires pour que
+    le résultat soit identique à un scan d'un seul bloc.
+    """
+    max_horizon = max(horizons)
+    before = max(2, max_horizon)
+    after = max_horizon
+    n = len(df)
+
+    columns = {
+        column: df[column].to_numpy(dtype=float)
+        for column in ['open', 'high', 'low', 'close']
+    }
+
+    tasks = []
+    for chunk_start in range(0, n, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, n)
+        lo = max(0, chunk_start - before)
+        hi = min(n, chunk_end + after)
+
+        ohlc = {column: values[lo:hi] for column, values in columns.items()}
+        tasks.append((key, ohlc, chunk_start - lo, chunk_end - lo, horizons))
+
+    return tasks
+
+
+def _merge_stats(total, stats):
+    """Additionne les compteurs d'un morceau"""
+    for name, by_horizon in stats.items():
+        pattern_total = total.setdefault(name, {})
+        for h, (samples, hits, sum_return) in by_horizon.items():
+            counters = pattern_total.setdefault(h, [0, 0, 0.0])
+            counters[0] += samples
+            counters[1] += hits
+            counters[2] += sum_return
+
+
+def build_reliability_table(histories, horizons=None, primary_horizon=None, workers=None):
+    """
+    Calcule la table de fiabilité de plusieurs historiques en parallèle
+
+    Args:
+        histories: dict {(symbol, timeframe): DataFrame OHLCV}
+        horizons: Horizons mesurés (défaut: config)
+        primary_horizon: Horizon retenu pour la fiabilité (défaut: config)
+        workers: Nombre de processus (défaut: nombre de CPU)
+
+    Returns:
+        dict: Table prête à être sérialisée en JSON
+    """
+    if horizons is None:
+        horizons = config.PATTERN_RELIABILITY_HORIZONS
+    if primary_horizon is None:
+        primary_horizon = config.PATTERN_RELIABILITY_HORIZON
+
+    horizons = sorted(set(horizons) | {primary_horizon})
+    catalog = PatternScanner._init_pattern_catalog()
+
+    tasks = []
+    bars = {}
+    for (symbol, timeframe), df in histories.items():
+        key = f"{symbol}|{timeframe}"
+        bars[key] = len(df)
+        tasks.extend(_make_tasks(key, df, horizons))
+
+    totals = {key: {} for key in bars}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for key, stats in executor.map(_scan_chunk, tasks):
+            _merge_stats(totals[key], stats)
+
+    tables = {}
+    for key, total in totals.items():
+        table = {}
+        for name, by_horizon in total.items():
+            horizon_stats = {}
+            for h, (samples, hits, sum_return) in sorted(by_horizon.items()):
+                horizon_stats[str(h)] = {
+                    'samples': samples,
+                    'hit_rate': hits / samples if samples else None,
+                    'avg_return': sum_return / samples if samples else None
+                }
+
+            primary = horizon_stats[str(primary_horizon)]
+            table[name] = {
+                'type': catalog[name]['type'],
+                'samples': primary['samples'],
+                'reliability': round(primary['hit_rate'] * 100, 1) if primary['samples'] else None,
+                'horizons': horizon_stats
+            }
+        tables[key] = table
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'horizons': horizons,
+        'primary_horizon': primary_horizon,
+        'bars': bars,
+        'tables': tables
+    }
+
+
+def print_reliability_table(result):
+    """Affiche la table de fiabilité"""
+    for key, table in result['tables'].items():
+        print("\n" + "="*60)
+        print(f"📚 FIABILITÉ DES PATTERNS - {key} ({result['bars'][key]} bougies)")
+        print("="*60)
+
+        rows = sorted(table.items(), key=lambda item: item[1]['reliability'] or 0, reverse=True)
+        for name, stats in rows:
+            emoji = "🟢" if stats['type'] == 'bullish' else "🔴" if stats['type'] == 'bearish' else "⚪"
+            if stats['samples'] == 0:
+                print(f"{emoji} {name:<22} aucune occurrence")
+                continue
+            print(f"{emoji} {name:<22} {stats['reliability']:>5.1f}%  ({stats['samples']} occurrences)")
+
+        print("="*60)
+
+
+def main():
+    """Point d'entrée du batch"""
+    parser = argparse.ArgumentParser(description="Table de fiabilité des patterns (APEX)")
+    parser.add_argument('files', nargs='*',
+                        help="CSV OHLCV nommés SYMBOL-QUOTE_TIMEFRAME.csv (ex: BTC-USDT_1m.csv)")
+    parser.add_argument('--data-dir', default='data/history',
+                        help="Dossier scanné si aucun fichier n'est donné")
+    parser.add_argument('--output', default=config.PATTERN_RELIABILITY_FILE or 'data/pattern_reliability.json')
+    parser.add_argument('--horizons', type=int, nargs='+', default=config.PATTERN_RELIABILITY_HORIZONS)
+    parser.add_argument('--primary-horizon', type=int, default=config.PATTERN_RELIABILITY_HORIZON)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(args.data_dir, '*.csv')))
+    if not files:
+        print(f"❌ Aucun historique trouvé dans {args.data_dir}")
+        return
+
+    histories = {}
+    for path in files:
+        df = load_ohlcv_csv(path)
+        histories[symbol_timeframe_from_path(path)] = df
+        print(f"📂 {path}: {len(df)} bougies")
+
+    result = build_reliability_table(histories, args.horizons, args.primary_horizon, args.workers)
+    print_reliability_table(result)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+
+    print(f"\n💾 Table sauvegardée: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,137 @@
 # pattern_scanner.py - Scan 15+ patterns de chandeliers (PRO)
 
+import json
+import os
 import pandas as pd
 import numpy as np
+import config_apex as config
+
+# Ordre de détection des patterns = position du bit dans le masque
+PATTERN_NAMES = [
+    # 1 bougie
+    'hammer', 'inverted_hammer', 'shooting_star', 'hanging_man',
+    'doji', 'dragonfly_doji', 'gravestone_doji', 'spinning_top',
+    # 2 bougies
+    'bullish_engulfing', 'bearish_engulfing', 'piercing_line', 'dark_cloud_cover',
+    'bullish_harami', 'bearish_harami',
+    # 3 bougies
+    'morning_star', 'evening_star', 'three_white_soldiers', 'three_black_crows'
+]
+
+PATTERN_BITS = {name: 1 << i for i, name in enumerate(PATTERN_NAMES)}
+
 
 class PatternScanner:
     """Scanner de patterns de chandeliers japonais - Version PRO"""
     
-    def __init__(self):
+    def __init__(self, symbol=None, timeframe=None, settings=None):
+        self.settings = settings if settings is not None else config
         self.patterns_detected = []
         self.pattern_catalog = self._init_pattern_catalog()
         
-        print("✅ Pattern Scanner initialisé (15+ patterns)")
+        if self.settings.VERBOSE:
+            print("✅ Pattern Scanner initialisé (15+ patterns)")
+        
+        # Fiabilités apprises sur l'historique (pattern_reliability.py)
+        if self.settings.PATTERN_RELIABILITY_FILE:
+            self.load_reliability_table(
+                self.settings.PATTERN_RELIABILITY_FILE,
+                symbol or self.settings.SYMBOL,
+                timeframe or self.settings.TIMEFRAME
+            )
     
-    def _init_pattern_catalog(self):
+    @staticmethod
+    def _init_pattern_catalog():
         """Catalogue des patterns avec leur fiabilité"""
         return {
             # PATTERNS HAUSSIERS (bullish)
-            'hammer': {'type': 'bullish', 'reliability': 80},
-            'inverted_hammer': {'type': 'bullish', 'reliability': 75},
-            'bullish_engulfing': {'type': 'bullish', 'reliability': 85},
-            'piercing_line': {'type': 'bullish', 'reliability': 75},
-            'morning_star': {'type': 'bullish', 'reliability': 90},
-            'three_white_soldiers': {'type': 'bullish', 'reliability': 85},
-            'bullish_harami': {'type': 'bullish', 'reliability': 70},
-            'dragonfly_doji': {'type': 'bullish', 'reliability': 65},
+            'hammer': {'type': 'bullish', 'reliability': 80,
+                       'description': '🔨 Marteau - Fort signal haussier'},
+            'inverted_hammer': {'type': 'bullish', 'reliability': 75,
+                                'description': '🔨 Marteau inversé - Signal haussier'},
+            'bullish_engulfing': {'type': 'bullish', 'reliability': 85,
+                                  'description': '📊 Engloutissant haussier - Fort signal achat'},
+            'piercing_line': {'type': 'bullish', 'reliability': 75,
+                              'description': '🗡️ Ligne perçante - Signal haussier'},
+            'morning_star': {'type': 'bullish', 'reliability': 90,
+                             'description': '⭐🌅 Étoile du matin - Très fort signal haussier'},
+            'three_white_soldiers': {'type': 'bullish', 'reliability': 85,
+                                     'description': '🪖🪖🪖 Trois soldats blancs - Fort signal haussier'},
+            'bullish_harami': {'type': 'bullish', 'reliability': 70,
+                               'description': '🤰 Harami haussier - Signal achat'},
+            'dragonfly_doji': {'type': 'bullish', 'reliability': 65,
+                               'description': '🦗 Doji libellule - Signal haussier'},
             
             # PATTERNS BAISSIERS (bearish)
-            'shooting_star': {'type': 'bearish', 'reliability': 80},
-            'hanging_man': {'type': 'bearish', 'reliability': 75},
-            'bearish_engulfing': {'type': 'bearish', 'reliability': 85},
-            'dark_cloud_cover': {'type': 'bearish', 'reliability': 75},
-            'evening_star': {'type': 'bearish', 'reliability': 90},
-            'three_black_crows': {'type': 'bearish', 'reliability': 85},
-            'bearish_harami': {'type': 'bearish', 'reliability': 70},
-            'gravestone_doji': {'type': 'bearish', 'reliability': 65},
+            'shooting_star': {'type': 'bearish', 'reliability': 80,
+                              'description': '⭐ Étoile filante - Fort signal baissier'},
+            'hanging_man': {'type': 'bearish', 'reliability': 75,
+                            'description': '🧑‍🦯 Pendu - Signal baissier'},
+            'bearish_engulfing': {'type': 'bearish', 'reliability': 85,
+                                  'description': '📉 Engloutissant baissier - Fort signal vente'},
+            'dark_cloud_cover': {'type': 'bearish', 'reliability': 75,
+                                 'description': '☁️ Couverture nuage noir - Signal baissier'},
+            'evening_star': {'type': 'bearish', 'reliability': 90,
+                             'description': '⭐🌆 Étoile du soir - Très fort signal baissier'},
+            'three_black_crows': {'type': 'bearish', 'reliability': 85,
+                                  'description': '🦅🦅🦅 Trois corbeaux noirs - Fort signal baissier'},
+            'bearish_harami': {'type': 'bearish', 'reliability': 70,
+                               'description': '🤰 Harami baissier - Signal vente'},
+            'gravestone_doji': {'type': 'bearish', 'reliability': 65,
+                                'description': '🪦 Doji pierre tombale - Signal baissier'},
             
             # PATTERNS NEUTRES
-            'doji': {'type': 'neutral', 'reliability': 60},
-            'spinning_top': {'type': 'neutral', 'reliability': 50}
+            'doji': {'type': 'neutral', 'reliability': 60,
+                     'description': '🎯 Doji - Indécision, possible retournement'},
+            'spinning_top': {'type': 'neutral', 'reliability': 50,
+                             'description': '🌪️ Toupie - Indécision forte'}
         }
     
+    def load_reliability_table(self, path, symbol, timeframe, min_samples=None):
+        """
+        Remplace les fiabilités du catalogue par celles mesurées sur l'historique
+        
+        Args:
+            path: Fichier JSON produit par pattern_reliability.py
+            symbol: Paire (ex: BTC/USDT)
+            timeframe: Timeframe (ex: 1m)
+            min_samples: Occurrences minimum pour remplacer la valeur par défaut
+        
+        Returns:
+            int: Nombre de patterns mis à jour
+        """
+        if min_samples is None:
+            min_samples = self.settings.PATTERN_RELIABILITY_MIN_SAMPLES
+        
+        if not os.path.exists(path):
+            return 0
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Table de fiabilité illisible ({path}): {e}")
+            return 0
+        
+        key = f"{symbol}|{timeframe}"
+        table = data.get('tables', {}).get(key)
+        if not table:
+            return 0
+        
+        updated = 0
+        for name, stats in table.items():
+            if name in self.pattern_catalog and stats.get('samples', 0) >= min_samples:
+                self.pattern_catalog[name]['reliability'] = stats['reliability']
+                updated += 1
+        
+        if self.settings.VERBOSE:
+            print(f"📚 Fiabilité des patterns chargée: {updated} patterns ({key})")
+        
+        return updated
+    
     def scan_all_patterns(self, df):
         """
-        Scanne TOUS les patterns sur les dernières bougies
+        Scanne TOUS les patterns sur la dernière bougie
         
         Returns:
             list: Patterns détectés avec scores
@@ -50,459 +139,183 @@ class PatternScanner:
         if df is None or len(df) < 3:
             return []
         
-        self.patterns_detected = []
-        
-        # Patterns 1 bougie
-        self._check_hammer(df)
-        self._check_inverted_hammer(df)
-        self._check_shooting_star(df)
-        self._check_hanging_man(df)
-        self._check_doji(df)
-        self._check_dragonfly_doji(df)
-        self._check_gravestone_doji(df)
-        self._check_spinning_top(df)
+        # 3 bougies suffisent pour évaluer la dernière
+        mask = self.scan_history(df.tail(3))[-1]
         
-        # Patterns 2 bougies
-        if len(df) >= 2:
-            self._check_engulfing(df)
-            self._check_piercing_line(df)
-            self._check_dark_cloud_cover(df)
-            self._check_harami(df)
-        
-        # Patterns 3 bougies
-        if len(df) >= 3:
-            self._check_morning_star(df)
-            self._check_evening_star(df)
-            self._check_three_soldiers(df)
-            self._check_three_crows(df)
+        self.patterns_detected = [
+            {
+                'name': name,
+                'type': self.pattern_catalog[name]['type'],
+                'reliability': self.pattern_catalog[name]['reliability'],
+                'description': self.pattern_catalog[name]['description'],
+                'candle_index': len(df) - 1
+            }
+            for name in self.decode_mask(mask)
+        ]
         
         return self.patterns_detected
     
-    # ═══════════════════════════════════════════════════════════
-    # PATTERNS 1 BOUGIE
-    # ═══════════════════════════════════════════════════════════
-    
-    def _check_hammer(self, df):
-        """Marteau - Pattern haussier"""
-        candle = df.iloc[-1]
+    def scan_history(self, df):
+        """
+        Scanne tous les patterns sur TOUTES les bougies en une passe vectorisée
         
-        body = abs(candle['close'] - candle['open'])
-        lower_shadow = min(candle['open'], candle['close']) - candle['low']
-        upper_shadow = candle['high'] - max(candle['open'], candle['close'])
-        total_range = candle['high'] - candle['low']
+        Returns:
+            ndarray: Masque de bits par bougie (bit i = PATTERN_NAMES[i])
+        """
+        flags = self.pattern_flags(df)
         
-        if total_range == 0:
-            return
+        mask = np.zeros(len(df), dtype=np.uint32)
+        for name, detected in flags.items():
+            mask[detected] |= np.uint32(PATTERN_BITS[name])
         
-        # Marteau : longue ombre basse (2x le corps), petit corps, petite ombre haute
-        if (lower_shadow > body * 2 and 
-            upper_shadow < body * 0.3 and
-            body / total_range < 0.3 and
-            candle['close'] > candle['open']):  # Bougie verte
-            
-            self.patterns_detected.append({
-                'name': 'hammer',
-                'type': 'bullish',
-                'reliability': 80,
-                'description': '🔨 Marteau - Fort signal haussier',
-                'candle_index': len(df) - 1
-            })
+        return mask
     
-    def _check_inverted_hammer(self, df):
-        """Marteau inversé - Pattern haussier"""
-        candle = df.iloc[-1]
-        
-        body = abs(candle['close'] - candle['open'])
-        lower_shadow = min(candle['open'], candle['close']) - candle['low']
-        upper_shadow = candle['high'] - max(candle['open'], candle['close'])
-        total_range = candle['high'] - candle['low']
-        
-        if total_range == 0:
-            return
-        
-        # Marteau inversé : longue ombre haute, petit corps, petite ombre basse
-        if (upper_shadow > body * 2 and 
-            lower_shadow < body * 0.3 and
-            body / total_range < 0.3):
-            
-            self.patterns_detected.append({
-                'name': 'inverted_hammer',
-                'type': 'bullish',
-                'reliability': 75,
-                'description': '🔨 Marteau inversé - Signal haussier',
-                'candle_index': len(df) - 1
-            })
+    @staticmethod
+    def decode_mask(mask):
+        """Liste des patterns présents dans un masque (ordre de détection)"""
+        mask = int(mask)
+        return [name for name in PATTERN_NAMES if mask & PATTERN_BITS[name]]
     
-    def _check_shooting_star(self, df):
-        """Étoile filante - Pattern baissier"""
-        candle = df.iloc[-1]
-        
-        body = abs(candle['close'] - candle['open'])
-        lower_shadow = min(candle['open'], candle['close']) - candle['low']
-        upper_shadow = candle['high'] - max(candle['open'], candle['close'])
-        total_range = candle['high'] - candle['low']
-        
-        if total_range == 0:
-            return
+    @staticmethod
+    def pattern_flags(df):
+        """
+        Colonnes booléennes de chaque pattern pour toutes les bougies
+        (corps, mèches et range calculés sur ndarrays, décalés de 1 et 2 bougies)
         
-        # Étoile filante : longue ombre haute, petit corps, petite ombre basse, bougie rouge
-        if (upper_shadow > body * 2 and 
-            lower_shadow < body * 0.3 and
-            body / total_range < 0.3 and
-            candle['close'] < candle['open']):  # Bougie rouge
+        Returns:
+            dict: {pattern: ndarray bool}
+        """
+        o = np.asarray(df['open'], dtype=float)
+        h = np.asarray(df['high'], dtype=float)
+        l = np.asarray(df['low'], dtype=float)
+        c = np.asarray(df['close'], dtype=float)
+        
+        def shift(values, periods):
+            shifted = np.full(len(values), np.nan)
+            if len(values) > periods:
+                shifted[periods:] = values[:-periods]
+            return shifted
+        
+        flags = {}
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # ═══════════════════════════════════════════════════════════
+            # PATTERNS 1 BOUGIE
+            # ═══════════════════════════════════════════════════════════
+            body = np.abs(c - o)
+            lower_shadow = np.minimum(o, c) - l
+            upper_shadow = h - np.maximum(o, c)
+            total_range = h - l
             
-            self.patterns_detected.append({
-                'name': 'shooting_star',
-                'type': 'bearish',
-                'reliability': 80,
-                'description': '⭐ Étoile filante - Fort signal baissier',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_hanging_man(self, df):
-        """Pendu - Pattern baissier"""
-        candle = df.iloc[-1]
-        prev_candle = df.iloc[-2] if len(df) >= 2 else None
-        
-        body = abs(candle['close'] - candle['open'])
-        lower_shadow = min(candle['open'], candle['close']) - candle['low']
-        upper_shadow = candle['high'] - max(candle['open'], candle['close'])
-        total_range = candle['high'] - candle['low']
-        
-        if total_range == 0:
-            return
-        
-        # Pendu : ressemble au marteau mais apparaît après une hausse
-        if (lower_shadow > body * 2 and 
-            upper_shadow < body * 0.3 and
-            body / total_range < 0.3 and
-            prev_candle is not None and
-            candle['close'] > prev_candle['close']):  # Après une hausse
+            has_range = total_range != 0
+            body_ratio = body / total_range
             
-            self.patterns_detected.append({
-                'name': 'hanging_man',
-                'type': 'bearish',
-                'reliability': 75,
-                'description': '🧑‍🦯 Pendu - Signal baissier',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_doji(self, df):
-        """Doji - Pattern d'indécision"""
-        candle = df.iloc[-1]
-        
-        body = abs(candle['close'] - candle['open'])
-        total_range = candle['high'] - candle['low']
-        
-        if total_range == 0:
-            return
-        
-        # Doji : corps très petit (< 10% du range total)
-        if body / total_range < 0.1:
-            self.patterns_detected.append({
-                'name': 'doji',
-                'type': 'neutral',
-                'reliability': 60,
-                'description': '🎯 Doji - Indécision, possible retournement',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_dragonfly_doji(self, df):
-        """Doji libellule - Pattern haussier"""
-        candle = df.iloc[-1]
-        
-        body = abs(candle['close'] - candle['open'])
-        lower_shadow = min(candle['open'], candle['close']) - candle['low']
-        upper_shadow = candle['high'] - max(candle['open'], candle['close'])
-        total_range = candle['high'] - candle['low']
-        
-        if total_range == 0:
-            return
-        
-        # Doji libellule : petit corps, longue ombre basse, pas d'ombre haute
-        if (body / total_range < 0.1 and
-            lower_shadow > total_range * 0.6 and
-            upper_shadow < total_range * 0.1):
+            # Marteau : longue ombre basse (2x le corps), petit corps, petite ombre haute, bougie verte
+            hammer_shape = (has_range &
+                            (lower_shadow > body * 2) &
+                            (upper_shadow < body * 0.3) &
+                            (body_ratio < 0.3))
+            flags['hammer'] = hammer_shape & (c > o)
             
-            self.patterns_detected.append({
-                'name': 'dragonfly_doji',
-                'type': 'bullish',
-                'reliability': 65,
-                'description': '🦗 Doji libellule - Signal haussier',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_gravestone_doji(self, df):
-        """Doji pierre tombale - Pattern baissier"""
-        candle = df.iloc[-1]
-        
-        body = abs(candle['close'] - candle['open'])
-        lower_shadow = min(candle['open'], candle['close']) - candle['low']
-        upper_shadow = candle['high'] - max(candle['open'], candle['close'])
-        total_range = candle['high'] - candle['low']
-        
-        if total_range == 0:
-            return
-        
-        # Doji pierre tombale : petit corps, longue ombre haute, pas d'ombre basse
-        if (body / total_range < 0.1 and
-            upper_shadow > total_range * 0.6 and
-            lower_shadow < total_range * 0.1):
+            # Marteau inversé : longue ombre haute, petit corps, petite ombre basse
+            inverted_shape = (has_range &
+                              (upper_shadow > body * 2) &
+                              (lower_shadow < body * 0.3) &
+                              (body_ratio < 0.3))
+            flags['inverted_hammer'] = inverted_shape
             
-            self.patterns_detected.append({
-                'name': 'gravestone_doji',
-                'type': 'bearish',
-                'reliability': 65,
-                'description': '🪦 Doji pierre tombale - Signal baissier',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_spinning_top(self, df):
-        """Toupie - Pattern d'indécision"""
-        candle = df.iloc[-1]
-        
-        body = abs(candle['close'] - candle['open'])
-        lower_shadow = min(candle['open'], candle['close']) - candle['low']
-        upper_shadow = candle['high'] - max(candle['open'], candle['close'])
-        total_range = candle['high'] - candle['low']
-        
-        if total_range == 0:
-            return
-        
-        # Toupie : petit corps, ombres similaires des deux côtés
-        if (body / total_range < 0.3 and
-            0.3 < lower_shadow / total_range < 0.5 and
-            0.3 < upper_shadow / total_range < 0.5):
+            # Étoile filante : marteau inversé rouge
+            flags['shooting_star'] = inverted_shape & (c < o)
             
-            self.patterns_detected.append({
-                'name': 'spinning_top',
-                'type': 'neutral',
-                'reliability': 50,
-                'description': '🌪️ Toupie - Indécision forte',
-                'candle_index': len(df) - 1
-            })
-    
-    # ═══════════════════════════════════════════════════════════
-    # PATTERNS 2 BOUGIES
-    # ═══════════════════════════════════════════════════════════
-    
-    def _check_engulfing(self, df):
-        """Engloutissant haussier/baissier"""
-        if len(df) < 2:
-            return
-        
-        prev = df.iloc[-2]
-        curr = df.iloc[-1]
-        
-        prev_body = prev['close'] - prev['open']
-        curr_body = curr['close'] - curr['open']
-        
-        # Engloutissant haussier
-        if (prev_body < 0 and curr_body > 0 and  # prev rouge, curr verte
-            curr['close'] > prev['open'] and
-            curr['open'] < prev['close'] and
-            abs(curr_body) > abs(prev_body) * 1.2):  # Corps actuel > 120% du précédent
+            # Pendu : forme de marteau après une hausse
+            flags['hanging_man'] = hammer_shape & (c > shift(c, 1))
             
-            self.patterns_detected.append({
-                'name': 'bullish_engulfing',
-                'type': 'bullish',
-                'reliability': 85,
-                'description': '📊 Engloutissant haussier - Fort signal achat',
-                'candle_index': len(df) - 1
-            })
-        
-        # Engloutissant baissier
-        elif (prev_body > 0 and curr_body < 0 and  # prev verte, curr rouge
-              curr['close'] < prev['open'] and
-              curr['open'] > prev['close'] and
-              abs(curr_body) > abs(prev_body) * 1.2):
+            # Doji : corps très petit (< 10% du range total)
+            doji = has_range & (body_ratio < 0.1)
+            flags['doji'] = doji
             
-            self.patterns_detected.append({
-                'name': 'bearish_engulfing',
-                'type': 'bearish',
-                'reliability': 85,
-                'description': '📉 Engloutissant baissier - Fort signal vente',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_piercing_line(self, df):
-        """Ligne perçante - Pattern haussier"""
-        if len(df) < 2:
-            return
-        
-        prev = df.iloc[-2]
-        curr = df.iloc[-1]
-        
-        prev_body = prev['close'] - prev['open']
-        curr_body = curr['close'] - curr['open']
-        
-        # Ligne perçante : prev rouge, curr verte qui clôture > 50% du corps précédent
-        if (prev_body < 0 and curr_body > 0 and
-            curr['open'] < prev['close'] and
-            curr['close'] > prev['open'] + abs(prev_body) * 0.5):
+            # Doji libellule : longue ombre basse, pas d'ombre haute
+            flags['dragonfly_doji'] = (doji &
+                                       (lower_shadow > total_range * 0.6) &
+                                       (upper_shadow < total_range * 0.1))
             
-            self.patterns_detected.append({
-                'name': 'piercing_line',
-                'type': 'bullish',
-                'reliability': 75,
-                'description': '🗡️ Ligne perçante - Signal haussier',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_dark_cloud_cover(self, df):
-        """Couverture nuage noir - Pattern baissier"""
-        if len(df) < 2:
-            return
-        
-        prev = df.iloc[-2]
-        curr = df.iloc[-1]
-        
-        prev_body = prev['close'] - prev['open']
-        curr_body = curr['close'] - curr['open']
-        
-        # Couverture nuage : prev verte, curr rouge qui clôture < 50% du corps précédent
-        if (prev_body > 0 and curr_body < 0 and
-            curr['open'] > prev['close'] and
-            curr['close'] < prev['open'] + prev_body * 0.5):
+            # Doji pierre tombale : longue ombre haute, pas d'ombre basse
+            flags['gravestone_doji'] = (doji &
+                                        (upper_shadow > total_range * 0.6) &
+                                        (lower_shadow < total_range * 0.1))
             
-            self.patterns_detected.append({
-                'name': 'dark_cloud_cover',
-                'type': 'bearish',
-                'reliability': 75,
-                'description': '☁️ Couverture nuage noir - Signal baissier',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_harami(self, df):
-        """Harami haussier/baissier"""
-        if len(df) < 2:
-            return
-        
-        prev = df.iloc[-2]
-        curr = df.iloc[-1]
-        
-        prev_body = abs(prev['close'] - prev['open'])
-        curr_body = abs(curr['close'] - curr['open'])
-        
-        # Harami : petite bougie contenue dans le corps de la précédente
-        if curr_body < prev_body * 0.5:
-            # Harami haussier : prev rouge, curr petite verte
-            if prev['close'] < prev['open'] and curr['close'] > curr['open']:
-                self.patterns_detected.append({
-                    'name': 'bullish_harami',
-                    'type': 'bullish',
-                    'reliability': 70,
-                    'description': '🤰 Harami haussier - Signal achat',
-                    'candle_index': len(df) - 1
-                })
+            # Toupie : petit corps, ombres similaires des deux côtés
+            lower_ratio = lower_shadow / total_range
+            upper_ratio = upper_shadow / total_range
+            flags['spinning_top'] = (has_range &
+                                     (body_ratio < 0.3) &
+                                     (0.3 < lower_ratio) & (lower_ratio < 0.5) &
+                                     (0.3 < upper_ratio) & (upper_ratio < 0.5))
             
-            # Harami baissier : prev verte, curr petite rouge
-            elif prev['close'] > prev['open'] and curr['close'] < curr['open']:
-                self.patterns_detected.append({
-                    'name': 'bearish_harami',
-                    'type': 'bearish',
-                    'reliability': 70,
-                    'description': '🤰 Harami baissier - Signal vente',
-                    'candle_index': len(df) - 1
-                })
-    
-    # ═══════════════════════════════════════════════════════════
-    # PATTERNS 3 BOUGIES
-    # ═══════════════════════════════════════════════════════════
-    
-    def _check_morning_star(self, df):
-        """Étoile du matin - Fort pattern haussier"""
-        if len(df) < 3:
-            return
-        
-        first = df.iloc[-3]
-        second = df.iloc[-2]
-        third = df.iloc[-1]
-        
-        first_body = first['close'] - first['open']
-        second_body = abs(second['close'] - second['open'])
-        third_body = third['close'] - third['open']
-        
-        # Étoile du matin : rouge, petit corps, verte
-        if (first_body < 0 and  # 1ère rouge
-            second_body < abs(first_body) * 0.3 and  # 2ème petit corps
-            third_body > 0 and  # 3ème verte
-            third['close'] > first['open'] + abs(first_body) * 0.5):  # Clôture > 50% de la 1ère
+            # ═══════════════════════════════════════════════════════════
+            # PATTERNS 2 BOUGIES
+            # ═══════════════════════════════════════════════════════════
+            prev_open = shift(o, 1)
+            prev_close = shift(c, 1)
+            prev_body = prev_close - prev_open
+            curr_body = c - o
             
-            self.patterns_detected.append({
-                'name': 'morning_star',
-                'type': 'bullish',
-                'reliability': 90,
-                'description': '⭐🌅 Étoile du matin - Très fort signal haussier',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_evening_star(self, df):
-        """Étoile du soir - Fort pattern baissier"""
-        if len(df) < 3:
-            return
-        
-        first = df.iloc[-3]
-        second = df.iloc[-2]
-        third = df.iloc[-1]
-        
-        first_body = first['close'] - first['open']
-        second_body = abs(second['close'] - second['open'])
-        third_body = third['close'] - third['open']
-        
-        # Étoile du soir : verte, petit corps, rouge
-        if (first_body > 0 and  # 1ère verte
-            second_body < first_body * 0.3 and  # 2ème petit corps
-            third_body < 0 and  # 3ème rouge
-            third['close'] < first['open'] + first_body * 0.5):  # Clôture < 50% de la 1ère
+            # Engloutissant : corps actuel > 120% du précédent, de couleur opposée
+            engulfs = np.abs(curr_body) > np.abs(prev_body) * 1.2
+            flags['bullish_engulfing'] = ((prev_body < 0) & (curr_body > 0) &
+                                          (c > prev_open) & (o < prev_close) & engulfs)
+            flags['bearish_engulfing'] = ((prev_body > 0) & (curr_body < 0) &
+                                          (c < prev_open) & (o > prev_close) & engulfs)
             
-            self.patterns_detected.append({
-                'name': 'evening_star',
-                'type': 'bearish',
-                'reliability': 90,
-                'description': '⭐🌆 Étoile du soir - Très fort signal baissier',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_three_soldiers(self, df):
-        """Trois soldats blancs - Fort pattern haussier"""
-        if len(df) < 3:
-            return
-        
-        last_3 = df.tail(3)
-        
-        # Vérifie que toutes sont vertes et en progression
-        all_green = all(candle['close'] > candle['open'] for _, candle in last_3.iterrows())
-        ascending = (last_3.iloc[0]['close'] < last_3.iloc[1]['close'] < last_3.iloc[2]['close'])
-        
-        if all_green and ascending:
-            self.patterns_detected.append({
-                'name': 'three_white_soldiers',
-                'type': 'bullish',
-                'reliability': 85,
-                'description': '🪖🪖🪖 Trois soldats blancs - Fort signal haussier',
-                'candle_index': len(df) - 1
-            })
-    
-    def _check_three_crows(self, df):
-        """Trois corbeaux noirs - Fort pattern baissier"""
-        if len(df) < 3:
-            return
-        
-        last_3 = df.tail(3)
-        
-        # Vérifie que toutes sont rouges et en descente
-        all_red = all(candle['close'] < candle['open'] for _, candle in last_3.iterrows())
-        descending = (last_3.iloc[0]['close'] > last_3.iloc[1]['close'] > last_3.iloc[2]['close'])
+            # Ligne perçante : prev rouge, curr verte qui clôture > 50% du corps précédent
+            flags['piercing_line'] = ((prev_body < 0) & (curr_body > 0) &
+                                      (o < prev_close) &
+                                      (c > prev_open + np.abs(prev_body) * 0.5))
+            
+            # Couverture nuage : prev verte, curr rouge qui clôture < 50% du corps précédent
+            flags['dark_cloud_cover'] = ((prev_body > 0) & (curr_body < 0) &
+                                         (o > prev_close) &
+                                         (c < prev_open + prev_body * 0.5))
+            
+            # Harami : petite bougie contenue dans le corps de la précédente
+            harami = np.abs(curr_body) < np.abs(prev_body) * 0.5
+            flags['bullish_harami'] = harami & (prev_close < prev_open) & (c > o)
+            flags['bearish_harami'] = harami & (prev_close > prev_open) & (c < o)
+            
+            # ═══════════════════════════════════════════════════════════
+            # PATTERNS 3 BOUGIES
+            # ═══════════════════════════════════════════════════════════
+            first_open = shift(o, 2)
+            first_close = shift(c, 2)
+            first_body = first_close - first_open
+            second_body = np.abs(prev_body)
+            third_body = curr_body
+            
+            # Étoile du matin : rouge, petit corps, verte qui clôture > 50% de la 1ère
+            flags['morning_star'] = ((first_body < 0) &
+                                     (second_body < np.abs(first_body) * 0.3) &
+                                     (third_body > 0) &
+                                     (c > first_open + np.abs(first_body) * 0.5))
+            
+            # Étoile du soir : verte, petit corps, rouge qui clôture < 50% de la 1ère
+            flags['evening_star'] = ((first_body > 0) &
+                                     (second_body < first_body * 0.3) &
+                                     (third_body < 0) &
+                                     (c < first_open + first_body * 0.5))
+            
+            # Trois soldats blancs : 3 vertes en progression
+            flags['three_white_soldiers'] = ((first_close > first_open) &
+                                             (prev_close > prev_open) &
+                                             (c > o) &
+                                             (first_close < prev_close) & (prev_close < c))
+            
+            # Trois corbeaux noirs : 3 rouges en descente
+            flags['three_black_crows'] = ((first_close < first_open) &
+                                          (prev_close < prev_open) &
+                                          (c < o) &
+                                          (first_close > prev_close) & (prev_close > c))
         
-        if all_red and descending:
-            self.patterns_detected.append({
-                'name': 'three_black_crows',
-                'type': 'bearish',
-                'reliability': 85,
-                'description': '🦅🦅🦅 Trois corbeaux noirs - Fort signal baissier',
-                'candle_index': len(df) - 1
-            })
+        return flags
     
     def get_combined_score(self):
         """
@@ -553,3 +366,4 @@ if __name__ == "__main__":
     print(f"\n✅ Pattern Scanner opérationnel")
     print(f"📊 {len(scanner.pattern_catalog)} patterns disponibles")
     print("🔍 Patterns haussiers, baissiers et neutres")
+    print("⚡ Scan vectorisé de tout l'historique (masque de bits par bougie)")
@@ -0,0 +1,269 @@
+# position_guardian.py - Gardien des positions : stop / targets / trailing à chaque trade (APEX)
+
+import threading
+import time
+import config_apex as config
+from logger_apex import get_logger
+
+
+class PositionGuardian:
+    """
+    Surveille les positions ouvertes tick par tick, hors du cycle d'analyse
+
+    - consomme chaque trade du flux WebSocket (listener), ou à défaut le
+      prix du ticker toutes les GUARDIAN_POLL_INTERVAL secondes
+    - vérifie stop-loss, take-profit, les 3 targets et le trailing stop :
+      quelques comparaisons (µs) sous le verrou de la position
+    - thread dédié : l'analyse (indicateurs + IA) ne le retarde jamais ; la
+      boucle principale passe par le même contrôle (check) et le même verrou,
+      la première sortie exécutée l'emporte
+    - entre deux contrôles, le plus bas / plus haut des trades reçus est
+      gardé : un stop touché puis repassé n'est pas manqué
+    - ordres de protection sur l'exchange (protective_orders.py) : le gardien
+      synchronise leur état, remonte le stop (trailing) par cancel/replace et
+      ne reprend la main localement que si aucun stop n'est posé
+    """
+
+    def __init__(self, traders, collector=None, settings=None):
+        """
+        Args:
+            traders: TraderApex ou dict {paire: TraderApex}
+            collector: DataCollectorApex (flux WebSocket / ticker)
+            settings: Paramètres (défaut: module config, ou ConfigOverlay)
+        """
+        self.logger = get_logger()
+        self.settings = settings if settings is not None else config
+        if not isinstance(traders, dict):
+            traders = {traders.settings.SYMBOL: traders}
+        self.traders = traders
+        self.collector = collector
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = {}  # paire → [dernier prix, plus bas, plus haut] depuis le dernier contrôle
+        self._thread = None
+        self.running = False
+
+        self.stats = {
+            'trades': 0,
+            'checks': 0,
+            'exits': 0,
+            'check_time': 0.0,
+            'max_check_us': 0.0
+        }
+
+    # ═══════════════════════════════════════════════════════════
+    # 🔌 DÉMARRAGE
+    # ═══════════════════════════════════════════════════════════
+
+    def start(self):
+        """Lance le thread du gardien et s'abonne aux trades du flux"""
+        if self.running:
+            return
+
+        stream = self.collector.stream if self.collector is not None else None
+        if stream is not None:
+            stream.add_trade_listener(self.on_trade)
+
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="apex-guardian", daemon=True)
+        self._thread.start()
+
+        source = "trades WebSocket" if stream is not None else f"ticker / {self.settings.GUARDIAN_POLL_INTERVAL}s"
+        print(f"🛡️  Gardien de position actif ({source})")
+        self.logger.info(f"Gardien de position démarré ({source})")
+
+    def stop(self):
+        """Arrête le thread du gardien"""
+        self.running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    # ═══════════════════════════════════════════════════════════
+    # 📨 PRIX
+    # ═══════════════════════════════════════════════════════════
+
+    def on_trade(self, symbol, trade):
+        """Listener du flux (thread du flux) : note le prix et réveille le gardien"""
+        trader = self.traders.get(symbol)
+        if trader is None or trader.position is None:
+            return
+
+        price = trade['price']
+        with self._lock:
+            self.stats['trades'] += 1
+            pending = self._pending.get(symbol)
+            if pending is None:
+                self._pending[symbol] = [price, price, price]
+            else:
+                pending[0] = price
+                if price < pending[1]:
+                    pending[1] = price
+                if price > pending[2]:
+                    pending[2] = price
+
+        self._wakeup.set()
+
+    def _poll_prices(self):
+        """Prix du ticker des paires en position (aucun trade reçu)"""
+        prices = {}
+        if self.collector is None:
+            return prices
+
+        for symbol, trader in self.traders.items():
+            if trader.position is None:
+                continue
+            price = self.collector.get_current_price(symbol)
+            if price is not None:
+                prices[symbol] = (price, price, price)
+
+        return prices
+
+    def _run(self):
+        """Boucle du thread : contrôle à chaque trade, polling sinon"""
+        while self.running:
+            self._wakeup.wait(self.settings.GUARDIAN_POLL_INTERVAL)
+            self._wakeup.clear()
+            if not self.running:
+                break
+
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                pending = self._poll_prices()
+
+            for symbol, (price, low, high) in pending.items():
+                try:
+                    self.check(symbol, price, low, high)
+                except Exception as e:
+                    print(f"❌ Erreur gardien {symbol}: {e}")
+                    self.logger.error(f"Erreur gardien {symbol}: {e}")
+
+    # ═══════════════════════════════════════════════════════════
+    # 🛡️ CONTRÔLE
+    # ═══════════════════════════════════════════════════════════
+
+    def check(self, symbol, price, low=None, high=None, timestamp=None):
+        """
+        Contrôle stop / trailing / targets / take-profit d'une position
+
+        Args:
+            symbol: Paire
+            price: Dernier prix (prix d'exécution des sorties)
+            low: Plus bas depuis le dernier contrôle (défaut: price)
+            high: Plus haut depuis le dernier contrôle (défaut: price)
+            timestamp: Heure des ordres (défaut: maintenant)
+
+        Returns:
+            str: Sortie exécutée ('stop_loss', 'take_profit', 'target1'...) ou None
+        """
+        trader = self.traders.get(symbol)
+        if trader is None or trader.position is None:
+            return None
+
+        low = price if low is None else low
+        high = price if high is None else high
+
+        start = time.perf_counter()
+        with trader.lock:
+            event = self._check_position(trader, price, low, high, timestamp)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+
+        self.stats['checks'] += 1
+        if event is None:
+            self.stats['check_time'] += elapsed_us
+            self.stats['max_check_us'] = max(self.stats['max_check_us'], elapsed_us)
+        else:
+            self.stats['exits'] += 1
+            self.logger.info(f"Gardien {symbol}: {event} à {price:.2f}")
+
+        return event
+
+    def _check_position(self, trader, price, low, high, timestamp):
+        """Contrôle sous le verrou de la position (même ordre que le backtest)"""
+        position = trader.position
+        if position is None:
+            return None
+
+        # Ordres de protection sur l'exchange : exécutions constatées par polling
+        protection = trader.protection
+        protected = protection.enabled
+        event = None
+        if protected:
+            event = protection.sync()
+            if trader.position is None:
+                return event
+
+        # Stop-loss : prioritaire, le plus bas reçu contre le stop d'avant ces trades
+        # (le trailing remonté par leur plus haut ne vaut qu'à partir du contrôle
+        # suivant : l'ordre des trades entre plus bas et plus haut est inconnu).
+        # Un stop posé sur l'exchange s'en charge tant qu'il n'est pas déclenché ;
+        # déclenché sans exécution constatée (gap sous sa limite), le bot vend au marché
+        native_stop = protected and protection.active
+        stop_hit = protection.stop_triggered(low) if native_stop else low <= position['stop_loss']
+
+        if stop_hit:
+            print(f"\n🛑 STOP-LOSS ATTEINT! (${position['stop_loss']:.2f})")
+            trader.sell(price, "Stop-loss", timestamp=timestamp)
+            return 'stop_loss'
+
+        trader.update_trailing_stop(high)
+        if protected:
+            # Stop remonté : cancel/replace des ordres (qui ont pu s'exécuter entre-temps)
+            protection.reconcile()
+            position = trader.position
+            if position is None:
+                return event
+
+            if protection.active and protection.mode == 'oco':
+                # Targets et take-profit exécutés par l'exchange
+                return event
+
+        target = trader.take_target_profits(price, timestamp=timestamp)
+
+        if price >= position['take_profit']:
+            print(f"\n🎯 TAKE-PROFIT ATTEINT!")
+            trader.sell(price, "Take-profit", timestamp=timestamp)
+            return 'take_profit'
+
+        return target or event
+
+    def get_summary(self):
+        """Contrôles effectués et durée moyenne d'un contrôle sans sortie (µs)"""
+        checks = self.stats['checks'] - self.stats['exits']
+        return {
+            'trades': self.stats['trades'],
+            'checks': self.stats['checks'],
+            'exits': self.stats['exits'],
+            'avg_check_us': self.stats['check_time'] / checks if checks else 0.0,
+            'max_check_us': self.stats['max_check_us']
+        }
+
+
+# Test du module
+if __name__ == "__main__":
+    import io
+    import contextlib
+    from config_apex import ConfigOverlay
+    from trader_apex import TraderApex
+
+    print("🚀 Test du Position Guardian APEX")
+
+    settings = ConfigOverlay(config, DRY_RUN=True, TRAILING_STOP_ENABLED=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        trader = TraderApex(settings=settings)
+        trader.buy(100.0, 1.0, stop_loss=99.2, take_profit=102.5)
+    guardian = PositionGuardian(trader, settings=settings)
+
+    for i in range(10000):
+        guardian.check(settings.SYMBOL, 100.0 + (i % 100) * 0.001)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        target = guardian.check(settings.SYMBOL, 101.6)
+        exit_event = guardian.check(settings.SYMBOL, 101.5, low=100.9)
+
+    summary = guardian.get_summary()
+    print(f"\n✅ {summary['checks']} contrôles, {summary['avg_check_us']:.1f} µs en moyenne")
+    print(f"🎯 Target: {target} - sortie: {exit_event} - position: {trader.position}")
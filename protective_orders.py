@@ -0,0 +1,550 @@
+# protective_orders.py - Ordres de protection côté exchange : OCO / stop-limit (APEX)
+
+import time
+import ccxt
+from logger_apex import get_logger
+
+# Statuts locaux d'un ordre et transitions autorisées
+ORDER_TRANSITIONS = {
+    'pending': {'open', 'partially_filled', 'filled', 'canceled', 'expired', 'rejected'},
+    'open': {'partially_filled', 'filled', 'canceled', 'expired'},
+    'partially_filled': {'partially_filled', 'filled', 'canceled', 'expired'},
+    'filled': set(),
+    'canceled': set(),
+    'expired': set(),
+    'rejected': set()
+}
+TERMINAL_STATUSES = {'filled', 'canceled', 'expired', 'rejected'}
+
+# Statuts Binance bruts (réponses orderList, executionReport du flux utilisateur)
+BINANCE_STATUSES = {
+    'NEW': 'open',
+    'PENDING_NEW': 'pending',
+    'PARTIALLY_FILLED': 'partially_filled',
+    'FILLED': 'filled',
+    'PENDING_CANCEL': 'open',
+    'CANCELED': 'canceled',
+    'REJECTED': 'rejected',
+    'EXPIRED': 'expired',
+    'EXPIRED_IN_MATCH': 'expired'
+}
+
+# Targets avec leur propre tranche : (nom, paramètre du prix, part de la quantité restante)
+# Mêmes parts que TraderApex.check_multi_target_exit (50%, puis 60% du reste)
+TARGET_TRANCHES = [
+    ('target1', 'FIRST_TARGET_PERCENT', 0.5),
+    ('target2', 'SECOND_TARGET_PERCENT', 0.6)
+]
+
+
+class ProtectiveOrderManager:
+    """
+    Stop et targets posés sur l'exchange pour la position d'un TraderApex
+
+    - mode 'oco' : une liste OCO par tranche (LIMIT_MAKER au target +
+      STOP_LOSS_LIMIT au stop), une tranche par target restant sous le
+      take-profit, la dernière au take-profit
+    - mode 'stop_limit' : un seul STOP_LOSS_LIMIT pour toute la position,
+      targets et take-profit restent gérés par le bot
+    - machine à états locale par ordre (pending → open → partially_filled →
+      filled / canceled / expired / rejected), synchronisée par polling
+      (sync) ou par les executionReport du flux utilisateur
+    - stop modifié (breakeven, trailing) : cancel/replace des tranches
+    - exécutions de l'exchange comptabilisées via sell / sell_partial
+      (execute=False : l'ordre est déjà passé)
+
+    Le stop reste en place même si le bot est arrêté ou bloqué : la
+    sortie ne dépend plus de la boucle Python.
+    """
+
+    def __init__(self, trader, settings=None):
+        """
+        Args:
+            trader: TraderApex propriétaire de la position
+            settings: Paramètres (défaut: ceux du trader)
+        """
+        self.trader = trader
+        self.settings = settings if settings is not None else trader.settings
+        self.logger = get_logger()
+
+        self.orders = {}       # id → ordre local (machine à états)
+        self.tranches = []     # tranches posées pour la position en cours
+        self.placed_stop = None
+        self.last_sync = 0.0
+
+        self.stats = {
+            'placed': 0,
+            'amended': 0,
+            'canceled': 0,
+            'fills': 0,
+            'rejected': 0,
+            'syncs': 0,
+            'invalid_transitions': 0
+        }
+
+    # ═══════════════════════════════════════════════════════════
+    # 📋 ÉTAT
+    # ═══════════════════════════════════════════════════════════
+
+    @property
+    def exchange(self):
+        return self.trader.exchange
+
+    @property
+    def symbol(self):
+        return self.trader.settings.SYMBOL
+
+    @property
+    def mode(self):
+        return self.settings.PROTECTIVE_ORDERS
+
+    @property
+    def enabled(self):
+        """Ordres natifs utilisés (mode réel avec exchange)"""
+        return bool(self.mode) and not self.settings.DRY_RUN and self.exchange is not None
+
+    @property
+    def active(self):
+        """Au moins une tranche protégée par un stop ouvert sur l'exchange"""
+        return any(self._tranche_live(tranche) for tranche in self.tranches)
+
+    def stop_triggered(self, low):
+        """
+        Stop posé sur l'exchange déclenché (prix passé à son niveau) sans
+        exécution constatée : un gap sous la limite du stop-limit le laisse
+        ouvert sans vendre, l'exchange ne protège plus la position
+
+        Args:
+            low: Plus bas reçu depuis le dernier contrôle
+        """
+        for tranche in self.tranches:
+            if self._tranche_live(tranche) and low <= self.orders[tranche['stop_id']]['stop_price']:
+                return True
+        return False
+
+    def _tranche_live(self, tranche):
+        record = self.orders.get(tranche['stop_id']) if tranche['stop_id'] else None
+        return record is not None and record['status'] not in TERMINAL_STATUSES
+
+    def _track(self, order_id, kind, amount, price, stop_price=None, status='pending'):
+        """Enregistre un ordre dans la machine à états"""
+        record = {
+            'id': str(order_id),
+            'kind': kind,
+            'amount': amount,
+            'price': price,
+            'stop_price': stop_price,
+            'status': status,
+            'filled': 0.0,
+            'average': None
+        }
+        self.orders[record['id']] = record
+        return record
+
+    def _transition(self, record, status, filled=None, average=None):
+        """
+        Applique un nouveau statut à un ordre
+
+        Returns:
+            bool: False si la transition est interdite (ignorée)
+        """
+        current = record['status']
+        if status != current and status not in ORDER_TRANSITIONS[current]:
+            self.stats['invalid_transitions'] += 1
+            self.logger.warning(f"Ordre {record['id']}: transition {current} → {status} ignorée")
+            return False
+
+        record['status'] = status
+        if filled is not None:
+            record['filled'] = filled
+        if average:
+            record['average'] = average
+        return True
+
+    def apply_order_update(self, order):
+        """
+        Met à jour un ordre depuis sa version ccxt (fetch_order, cancel_order...)
+
+        Returns:
+            dict: Ordre local (None si inconnu)
+        """
+        record = self.orders.get(str(order['id']))
+        if record is None:
+            return None
+
+        filled = order.get('filled') or 0.0
+        status = order.get('status')
+        if status == 'open':
+            status = 'partially_filled' if filled > 0 else 'open'
+        elif status == 'closed':
+            status = 'filled'
+
+        self._transition(record, status, filled, order.get('average') or order.get('price'))
+        return record
+
+    def apply_execution_report(self, event):
+        """
+        Met à jour un ordre depuis un executionReport du flux utilisateur Binance
+
+        Returns:
+            str: Sortie constatée ('target1', 'take_profit', 'stop_loss') ou None
+        """
+        record = self.orders.get(str(event['i']))
+        if record is None:
+            return None
+
+        filled = float(event['z'])
+        quote = float(event['Z'])
+        self._transition(record, BINANCE_STATUSES.get(event['X'], record['status']),
+                         filled, quote / filled if filled else None)
+        return self._settle()
+
+    # ═══════════════════════════════════════════════════════════
+    # 📝 POSE / ANNULATION
+    # ═══════════════════════════════════════════════════════════
+
+    def _build_tranches(self, position):
+        """
+        Découpe la position en tranches (target restant, take-profit)
+
+        Les tranches des targets sont arrondies à la précision de l'exchange,
+        la dernière reçoit le reste exact : leur somme vaut la position. Un
+        target trop petit pour un ordre (LOT_SIZE / NOTIONAL) reste dans la
+        dernière tranche.
+        """
+        quantity = position['quantity']
+        if self.mode != 'oco':
+            return [{'target': None, 'quantity': quantity, 'take_profit': None}]
+
+        # Prix comparés à la précision de l'exchange (un target au prix du take-profit est inutile)
+        exchange = self.exchange
+        entry_price = position['entry_price']
+        take_profit = float(exchange.price_to_precision(self.symbol, position['take_profit']))
+        tranches = []
+        remaining = quantity
+
+        for name, setting, share in TARGET_TRANCHES:
+            price = entry_price * (1 + getattr(self.settings, setting))
+            if (name in position['targets_hit']
+                    or float(exchange.price_to_precision(self.symbol, price)) >= take_profit):
+                continue
+            part = float(exchange.amount_to_precision(self.symbol, remaining * share))
+            if self._below_minimum(part, position['stop_loss']):
+                continue
+            tranches.append({'target': name, 'quantity': part, 'take_profit': price})
+            remaining = quantity - sum(tranche['quantity'] for tranche in tranches)
+
+        tranches.append({'target': 'take_profit', 'quantity': remaining, 'take_profit': position['take_profit']})
+        return tranches
+
+    def _below_minimum(self, quantity, price):
+        """Quantité trop faible pour un ordre : sous la précision, LOT_SIZE ou NOTIONAL du marché"""
+        exchange = self.exchange
+        try:
+            if float(exchange.amount_to_precision(self.symbol, quantity)) <= 0:
+                return True
+        except ccxt.BaseError:
+            return True
+
+        limits = exchange.markets.get(self.symbol, {}).get('limits', {}) if exchange.markets else {}
+        min_amount = limits.get('amount', {}).get('min') or 0
+        min_cost = limits.get('cost', {}).get('min') or 0
+        return quantity < min_amount or quantity * price < min_cost
+
+    def place(self, position=None):
+        """
+        Pose les ordres de protection de la position
+
+        Returns:
+            bool: True si au moins une tranche est protégée par l'exchange
+        """
+        position = position or self.trader.position
+        if not self.enabled or position is None:
+            return False
+
+        # Les ordres terminés des positions précédentes ne servent plus
+        self.orders = {order_id: record for order_id, record in self.orders.items()
+                       if record['status'] not in TERMINAL_STATUSES}
+        self.tranches = []
+
+        for tranche in self._build_tranches(position):
+            self._place_tranche(tranche, position['stop_loss'])
+
+        self.placed_stop = position['stop_loss']
+        self.last_sync = time.monotonic()
+
+        if self.active:
+            print(f"   🛡️  Protection exchange ({self.mode}): {len(self.tranches)} tranche(s), "
+                  f"stop ${self.placed_stop:.2f}")
+        return self.active
+
+    def _place_tranche(self, tranche, stop_price):
+        """Pose une tranche (liste OCO ou stop-limit seul)"""
+        exchange = self.exchange
+        symbol = self.symbol
+
+        amount = float(exchange.amount_to_precision(symbol, tranche['quantity']))
+        stop = float(exchange.price_to_precision(symbol, stop_price))
+        limit = float(exchange.price_to_precision(
+            symbol, stop_price * (1 - self.settings.PROTECTIVE_STOP_LIMIT_OFFSET)))
+
+        tranche.update({'quantity': amount, 'stop_price': stop, 'list_id': None,
+                        'stop_id': None, 'limit_id': None, 'booked': False})
+        self.tranches.append(tranche)
+
+        try:
+            if tranche['take_profit'] is None:
+                order = exchange.create_order(symbol, 'STOP_LOSS_LIMIT', 'sell', amount, limit,
+                                              {'triggerPrice': stop})
+                record = self._track(order['id'], 'stop_loss', amount, limit, stop)
+                self.apply_order_update(order)
+                tranche['stop_id'] = record['id']
+            else:
+                take_profit = exchange.price_to_precision(symbol, tranche['take_profit'])
+                response = exchange.private_post_orderlist_oco({
+                    'symbol': exchange.market_id(symbol),
+                    'side': 'SELL',
+                    'quantity': exchange.amount_to_precision(symbol, amount),
+                    'aboveType': 'LIMIT_MAKER',
+                    'abovePrice': take_profit,
+                    'belowType': 'STOP_LOSS_LIMIT',
+                    'belowStopPrice': exchange.price_to_precision(symbol, stop),
+                    'belowPrice': exchange.price_to_precision(symbol, limit),
+                    'belowTimeInForce': 'GTC'
+                })
+                tranche['list_id'] = response['orderListId']
+
+                for report in response['orderReports']:
+                    kind = 'stop_loss' if report['type'] == 'STOP_LOSS_LIMIT' else 'take_profit'
+                    record = self._track(report['orderId'], kind, amount, float(report['price']),
+                                         stop if kind == 'stop_loss' else None,
+                                         BINANCE_STATUSES.get(report['status'], 'open'))
+                    tranche['stop_id' if kind == 'stop_loss' else 'limit_id'] = record['id']
+
+            self.stats['placed'] += 1
+
+        except ccxt.BaseError as e:
+            # Tranche non protégée : le PositionGuardian garde le contrôle local
+            self.stats['rejected'] += 1
+            print(f"❌ Ordre de protection refusé: {e}")
+            self.logger.error(f"Ordre de protection refusé ({symbol}, stop {stop}): {e}")
+
+    def cancel_all(self):
+        """Annule les tranches encore ouvertes"""
+        exchange = self.exchange
+        symbol = self.symbol
+
+        for tranche in self.tranches:
+            if not self._tranche_live(tranche):
+                continue
+
+            try:
+                if tranche['list_id'] is not None:
+                    response = exchange.private_delete_orderlist({
+                        'symbol': exchange.market_id(symbol),
+                        'orderListId': tranche['list_id']
+                    })
+                    for report in response.get('orderReports', []):
+                        record = self.orders.get(str(report['orderId']))
+                        if record is not None:
+                            self._transition(record, BINANCE_STATUSES.get(report['status'], 'canceled'),
+                                             float(report.get('executedQty', 0)))
+                else:
+                    self.apply_order_update(exchange.cancel_order(tranche['stop_id'], symbol))
+
+                self.stats['canceled'] += 1
+
+            except ccxt.OrderNotFound:
+                # Déjà exécutée ou expirée : le polling qui suit le constate
+                pass
+            except ccxt.BaseError as e:
+                self.logger.error(f"Annulation protection {symbol}: {e}")
+
+    def release(self):
+        """
+        Libère la quantité bloquée avant une vente décidée par le bot
+
+        Annule les tranches puis comptabilise celles exécutées entre-temps.
+
+        Returns:
+            str: Sortie constatée pendant l'annulation ou None
+        """
+        if not self.tranches:
+            return None
+        self.cancel_all()
+        return self._poll()
+
+    # ═══════════════════════════════════════════════════════════
+    # 🔄 SYNCHRONISATION
+    # ═══════════════════════════════════════════════════════════
+
+    def sync(self, force=False):
+        """
+        Synchronise la machine à états avec l'exchange (polling), puis
+        remonte le stop des tranches si celui de la position a monté
+
+        Args:
+            force: Ignore PROTECTIVE_SYNC_INTERVAL
+
+        Returns:
+            str: Sortie constatée ('target1', 'take_profit', 'stop_loss') ou None
+        """
+        if not self.tranches:
+            return None
+
+        now = time.monotonic()
+        if not force and now - self.last_sync < self.settings.PROTECTIVE_SYNC_INTERVAL:
+            return None
+        self.last_sync = now
+
+        event = self._poll()
+        self.reconcile()
+        return event
+
+    def _poll(self):
+        """Statut des ordres non terminés : ordres ouverts, puis fetch_order des disparus"""
+        self.stats['syncs'] += 1
+        pending = [record for record in self.orders.values() if record['status'] not in TERMINAL_STATUSES]
+
+        if pending:
+            exchange = self.exchange
+            try:
+                open_orders = {str(order['id']): order for order in exchange.fetch_open_orders(self.symbol)}
+                for record in pending:
+                    order = open_orders.get(record['id'])
+                    if order is None:
+                        order = exchange.fetch_order(record['id'], self.symbol)
+                    self.apply_order_update(order)
+            except ccxt.BaseError as e:
+                self.logger.warning(f"Synchronisation des ordres de protection: {e}")
+
+        return self._settle()
+
+    def _settle(self):
+        """
+        Comptabilise les tranches exécutées et oublie les tranches terminées
+
+        Les stops de plusieurs tranches exécutés ensemble (stop-out) sont
+        comptabilisés en une seule sortie, au prix moyen.
+        """
+        targets = []
+        stops = []
+
+        for tranche in self.tranches:
+            if tranche['booked']:
+                continue
+            for order_id in (tranche['limit_id'], tranche['stop_id']):
+                record = self.orders.get(order_id) if order_id else None
+                if record is not None and record['status'] in TERMINAL_STATUSES and record['filled'] > 0:
+                    tranche['booked'] = True
+                    (stops if record['kind'] == 'stop_loss' else targets).append((tranche, record))
+                    break
+
+        self.tranches = [tranche for tranche in self.tranches
+                         if not tranche['booked'] and self._tranche_live(tranche)]
+
+        if stops:
+            filled = sum(record['filled'] for _, record in stops)
+            average = sum(record['filled'] * (record['average'] or record['price']) for _, record in stops) / filled
+            targets.append((None, {'kind': 'stop_loss', 'filled': filled, 'average': average, 'price': average}))
+
+        event = None
+        for tranche, record in targets:
+            event = self._book(tranche, record) or event
+        return event
+
+    def _book(self, tranche, record):
+        """Enregistre dans le trader une sortie exécutée par l'exchange"""
+        trader = self.trader
+        position = trader.position
+        if position is None:
+            return None
+
+        self.stats['fills'] += 1
+        price = record['average'] or record['price']
+        quantity = record['filled']
+
+        if record['kind'] == 'take_profit':
+            target = tranche['target']
+            reason = "Take-profit" if target == 'take_profit' else f"Target {target}"
+        else:
+            target = 'stop_loss'
+            reason = "Stop-loss"
+        reason += " (exchange)"
+
+        print(f"\n⚡ {reason}: {quantity:.6f} à ${price:.2f}")
+
+        # Toute la position vendue, ou un reste invendable (LOT_SIZE / NOTIONAL) :
+        # une seule sortie complète plutôt qu'une dernière vente partielle
+        if self._below_minimum(position['quantity'] - quantity, price):
+            trader.sell(price, reason, execute=False)
+            return target
+
+        trader.sell_partial(price, quantity / position['quantity'], reason, execute=False)
+
+        # Mêmes ajustements du stop que check_multi_target_exit
+        if target == 'target1':
+            position['targets_hit'].append(target)
+            position['stop_loss'] = max(position['stop_loss'], position['entry_price'])
+        elif target == 'target2':
+            position['targets_hit'].append(target)
+            position['stop_loss'] = max(position['stop_loss'],
+                                        price * (1 - self.settings.TRAILING_STOP_DISTANCE))
+
+        return target
+
+    def reconcile(self):
+        """
+        Cancel/replace des tranches si le stop de la position a monté
+        d'au moins PROTECTIVE_AMEND_MIN_STEP (breakeven, trailing)
+
+        Returns:
+            bool: True si les ordres ont été remplacés
+        """
+        position = self.trader.position
+        if position is None or self.placed_stop is None or not self.active:
+            return False
+        if position['stop_loss'] < self.placed_stop * (1 + self.settings.PROTECTIVE_AMEND_MIN_STEP):
+            return False
+
+        self.release()
+        if self.trader.position is None:
+            return False
+
+        self.stats['amended'] += 1
+        self.logger.info(f"Protection {self.symbol}: stop {self.placed_stop:.2f} → {position['stop_loss']:.2f}")
+        return self.place(self.trader.position)
+
+
+# Test du module
+if __name__ == "__main__":
+    import io
+    import contextlib
+    import config_apex as config
+    from config_apex import ConfigOverlay
+    from fake_exchange import FakeExchange
+    from trader_apex import TraderApex
+
+    print("🚀 Test des Ordres de Protection APEX")
+
+    exchange = FakeExchange(symbols=['ETH/USDT'])
+    exchange.set_price('ETH/USDT', 100.0)
+    settings = ConfigOverlay(config, DRY_RUN=False, SYMBOL='ETH/USDT', PROTECTIVE_ORDERS='oco',
+                             PROTECTIVE_SYNC_INTERVAL=0)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        trader = TraderApex(settings=settings, exchange=exchange)
+        trader.buy(100.0, 1.0, stop_loss=99.2, take_profit=102.5)
+
+    protection = trader.protection
+    print(f"\n✅ {len(protection.tranches)} tranches posées, {len(exchange.fetch_open_orders('ETH/USDT'))} ordres ouverts")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        exchange.set_price('ETH/USDT', 101.6)
+        target = protection.sync()
+        exchange.set_price('ETH/USDT', 99.9)
+        exit_event = protection.sync()
+
+    print(f"🎯 Target exécuté par l'exchange: {target} (stop remonté à ${protection.placed_stop:.2f})")
+    print(f"🛑 Sortie: {exit_event} - position: {trader.position} - P&L: ${trader.total_profit:+.2f}")
+    print(f"📊 Stats: {protection.stats}")
@@ -0,0 +1,109 @@
+# rate_limiter.py - Budget de poids API partagé entre threads (APEX)
+
+import threading
+import time
+from collections import deque
+
+# Poids des endpoints REST Binance utilisés par le bot
+BINANCE_WEIGHTS = {
+    'fetch_ohlcv': 2,
+    'fetch_ticker': 2,
+    'fetch_tickers': 80,
+    'fetch_trades': 25,
+    'load_markets': 20
+}
+
+
+def order_book_weight(limit):
+    """Poids Binance d'un snapshot du carnet selon sa profondeur"""
+    if limit is None or limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+class WeightRateLimiter:
+    """
+    Limiteur à fenêtre glissante sur le poids des requêtes
+
+    Partagé par tous les threads qui appellent l'API : une requête attend
+    tant que le poids consommé sur la dernière période dépasserait le budget.
+    """
+
+    def __init__(self, max_weight=None, period=60.0):
+        """
+        Args:
+            max_weight: Poids autorisé par période
+            period: Durée de la fenêtre (secondes)
+        """
+        self.max_weight = max_weight
+        self.period = period
+
+        self._lock = threading.Lock()
+        self._history = deque()  # (instant, poids)
+        self._used = 0
+
+        self.stats = {
+            'requests': 0,
+            'weight': 0,
+            'waits': 0,
+            'wait_time': 0.0
+        }
+
+    def _expire(self, now):
+        """Oublie les requêtes sorties de la fenêtre"""
+        while self._history and now - self._history[0][0] >= self.period:
+            self._used -= self._history.popleft()[1]
+
+    def acquire(self, weight=1):
+        """
+        Réserve un poids (bloque jusqu'à ce que le budget le permette)
+
+        Returns:
+            float: Temps d'attente (secondes)
+        """
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+
+                if self.max_weight is None or self._used + weight <= self.max_weight or not self._history:
+                    self._history.append((now, weight))
+                    self._used += weight
+                    self.stats['requests'] += 1
+                    self.stats['weight'] += weight
+                    if waited:
+                        self.stats['waits'] += 1
+                        self.stats['wait_time'] += waited
+                    return waited
+
+                delay = self._history[0][0] + self.period - now
+
+            time.sleep(delay)
+            waited += delay
+
+    @property
+    def used_weight(self):
+        """Poids consommé sur la fenêtre en cours"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._used
+
+
+# Test du module
+if __name__ == "__main__":
+    print("🚀 Test du Rate Limiter APEX")
+
+    limiter = WeightRateLimiter(max_weight=10, period=0.5)
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.acquire(5)
+    elapsed = time.monotonic() - start
+
+    print(f"\n✅ 4 requêtes de poids 5 (budget 10/0.5s) en {elapsed:.2f}s")
+    print(f"📊 Stats: {limiter.stats}")
@@ -0,0 +1,255 @@
+# runtime_apex.py - Boucle principale asyncio (APEX)
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import config_apex as config
+from logger_apex import get_logger
+
+
+class AsyncRuntimeApex:
+    """
+    Runtime asyncio du bot : tâches indépendantes reliées par des queues
+
+    candle_events ──▶ fetch ──▶ analysis_queue ──▶ analysis ──▶ order_queue ──▶ orders
+                     order_flow (polling périodique, dernier résultat conservé)
+
+    - Les événements bougie viennent du flux WebSocket (listener) ou, sans
+      flux, d'un polling REST à cadence fixe qui ne déclenche l'analyse que
+      si la bougie a changé
+    - Les appels bloquants (REST, calcul des indicateurs/IA, ordres) tournent
+      dans des executors : la boucle asyncio reste réactive
+    - Queues de taille 1 : seule la donnée la plus récente est traitée, un
+      retard ne s'accumule jamais (latence bougie → ordre bornée)
+    - L'analyse N+1 ne démarre qu'une fois la décision N prise : l'état par
+      tick de l'IA reste celui de l'analyse que la gestion de position reçoit
+    """
+
+    def __init__(self, bot):
+        """
+        Args:
+            bot: ApexPredatorBot (fetch_candles / analyze / handle_analysis)
+        """
+        self.bot = bot
+        self.logger = get_logger()
+
+        # Un thread par étage : chaque étage reste séquentiel
+        self.fetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="apex-fetch")
+        self.analysis_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="apex-analysis")
+        self.order_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="apex-orders")
+        self.order_flow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="apex-orderflow")
+
+        # L'IA est utilisée par l'analyse et par la gestion de position
+        self.ai_lock = threading.Lock()
+
+        self.loop = None
+        self.candle_events = None
+        self.analysis_queue = None
+        self.order_queue = None
+        self.order_done = None
+
+        self.last_candle_key = None
+        self.order_flow = None
+
+        self.stats = {
+            'candle_events': 0,
+            'analyses': 0,
+            'skipped': 0,
+            'decisions': 0,
+            'max_latency_ms': 0.0,
+            # Fenêtre glissante : médiane / p95 sur les dernières décisions
+            'latencies_ms': deque(maxlen=config.LATENCY_SAMPLES)
+        }
+
+    async def run(self):
+        """Lance toutes les tâches jusqu'à l'arrêt du bot"""
+        self.loop = asyncio.get_running_loop()
+        self.candle_events = asyncio.Queue(maxsize=1)
+        self.analysis_queue = asyncio.Queue(maxsize=1)
+        self.order_queue = asyncio.Queue(maxsize=1)
+        self.order_done = asyncio.Event()
+        self.order_done.set()
+
+        stream = self.bot.collector.stream
+        if stream is not None:
+            stream.add_candle_listener(self._on_stream_candle)
+
+        tasks = [
+            asyncio.create_task(self._poll_task(), name="poll"),
+            asyncio.create_task(self._fetch_task(), name="fetch"),
+            asyncio.create_task(self._analysis_task(), name="analysis"),
+            asyncio.create_task(self._order_task(), name="orders")
+        ]
+        if config.SHOW_ORDER_FLOW:
+            tasks.append(asyncio.create_task(self._order_flow_task(), name="order_flow"))
+
+        try:
+            # S'arrête dès qu'une tâche se termine (bot.running passé à False)
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            for executor in (self.fetch_executor, self.analysis_executor,
+                             self.order_executor, self.order_flow_executor):
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    # ═══════════════════════════════════════════════════════════
+    # 📨 ÉVÉNEMENTS BOUGIE
+    # ═══════════════════════════════════════════════════════════
+
+    def _put_latest(self, queue, item):
+        """Dépose un élément en remplaçant celui en attente (queue de taille 1)"""
+        if queue.full():
+            queue.get_nowait()
+            self.stats['skipped'] += 1
+        queue.put_nowait(item)
+
+    def _emit_candle_event(self, source):
+        """Signale une mise à jour de bougie (appelé dans la boucle asyncio)"""
+        self.stats['candle_events'] += 1
+        self._put_latest(self.candle_events, (source, time.perf_counter()))
+
+    def _on_stream_candle(self, symbol, timeframe, closed):
+        """Listener du flux WebSocket (appelé depuis le thread du flux)"""
+        if symbol != config.SYMBOL or timeframe != config.TIMEFRAME:
+            return
+        self.loop.call_soon_threadsafe(self._emit_candle_event, 'stream')
+
+    async def _poll_task(self):
+        """
+        Cadence de secours sans flux : tick toutes les ANALYSIS_INTERVAL secondes
+        sur une grille fixe (pas de dérive due à la durée des traitements)
+        """
+        next_tick = self.loop.time()
+
+        while self.bot.running:
+            stream = self.bot.collector.stream
+            if stream is None or not stream.has_candles():
+                self._emit_candle_event('poll')
+
+            next_tick += config.ANALYSIS_INTERVAL
+            now = self.loop.time()
+            if next_tick < now:
+                # Retard : on saute les ticks manqués plutôt que de rattraper
+                next_tick = now + config.ANALYSIS_INTERVAL
+            await asyncio.sleep(next_tick - now)
+
+    # ═══════════════════════════════════════════════════════════
+    # ⚙️ ÉTAGES
+    # ═══════════════════════════════════════════════════════════
+
+    async def _fetch_task(self):
+        """Récupère les bougies à chaque événement ; ne transmet que les changements"""
+        while self.bot.running:
+            source, event_time = await self.candle_events.get()
+
+            try:
+                df = await self.loop.run_in_executor(self.fetch_executor, self.bot.fetch_candles)
+            except Exception as e:
+                print(f"❌ Erreur récupération des données: {e}")
+                self.logger.error(f"Erreur récupération des données: {e}")
+                continue
+
+            if df is None:
+                continue
+
+            candle_key = (df.last('timestamp'), df.last('close'), df.last('volume'))
+            if source == 'poll' and candle_key == self.last_candle_key:
+                continue
+            self.last_candle_key = candle_key
+
+            self._put_latest(self.analysis_queue, (df, event_time))
+
+    def _analyze(self, df):
+        """Analyse dans l'executor (verrou IA)"""
+        with self.ai_lock:
+            return self.bot.analyze(df)
+
+    async def _analysis_task(self):
+        """Indicateurs + IA hors de la boucle asyncio"""
+        while self.bot.running:
+            # Attend la fin de la décision précédente, puis prend la bougie la plus récente
+            await self.order_done.wait()
+            df, event_time = await self.analysis_queue.get()
+
+            self.bot.iteration += 1
+            self.bot.stats['analyses'] += 1
+            self.stats['analyses'] += 1
+
+            print("\n" + "="*70)
+            print(f"🔄 ANALYSE #{self.bot.iteration} - {datetime.now().strftime('%H:%M:%S')}".center(70))
+            print("="*70)
+
+            try:
+                df, analysis = await self.loop.run_in_executor(self.analysis_executor, self._analyze, df)
+            except Exception as e:
+                print(f"\n❌ Erreur dans l'analyse: {e}")
+                self.logger.error(f"Erreur dans l'analyse: {e}")
+                continue
+
+            self.order_done.clear()
+            self._put_latest(self.order_queue, (df, analysis, event_time))
+
+    def _handle(self, df, analysis):
+        """Gestion position / entrée dans l'executor des ordres (verrou IA)"""
+        with self.ai_lock:
+            return self.bot.handle_analysis(df, analysis)
+
+    async def _order_task(self):
+        """Décisions et ordres, dans l'ordre des analyses"""
+        while self.bot.running:
+            df, analysis, event_time = await self.order_queue.get()
+
+            if config.SHOW_ORDER_FLOW and self.order_flow is not None:
+                self.bot.show_order_flow(self.order_flow)
+
+            try:
+                await self.loop.run_in_executor(self.order_executor, self._handle, df, analysis)
+            except Exception as e:
+                print(f"\n❌ Erreur gestion des ordres: {e}")
+                self.logger.error(f"Erreur gestion des ordres: {e}")
+                continue
+            finally:
+                self.order_done.set()
+
+            latency_ms = (time.perf_counter() - event_time) * 1000
+            self.stats['latencies_ms'].append(latency_ms)
+            self.stats['decisions'] += 1
+            self.stats['max_latency_ms'] = max(self.stats['max_latency_ms'], latency_ms)
+            if config.VERBOSE:
+                print(f"⏱️  Latence bougie → décision: {latency_ms:.0f} ms")
+
+    async def _order_flow_task(self):
+        """Polling de la profondeur de marché, indépendant de l'analyse"""
+        while self.bot.running:
+            try:
+                self.order_flow = await self.loop.run_in_executor(
+                    self.order_flow_executor, self.bot.collector.get_market_depth_analysis
+                )
+            except Exception as e:
+                self.logger.warning(f"Erreur order flow: {e}")
+
+            await asyncio.sleep(config.ORDER_FLOW_INTERVAL)
+
+    def get_latency_summary(self):
+        """
+        Latence bougie → décision (ms)
+
+        Médiane et p95 sur les LATENCY_SAMPLES dernières décisions,
+        nombre et maximum sur toute la session.
+        """
+        latencies = sorted(self.stats['latencies_ms'])
+        if not latencies:
+            return None
+
+        return {
+            'count': self.stats['decisions'],
+            'median_ms': latencies[len(latencies) // 2],
+            'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            'max_ms': self.stats['max_latency_ms']
+        }
@@ -0,0 +1,852 @@
+# stream_collector_apex.py - Ingestion WebSocket temps réel (APEX)
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+import ccxt
+import pandas as pd
+import config_apex as config
+from logger_apex import get_logger
+from candle_store import CandleStore
+
+# aiohttp (dépendance de ccxt) : client WebSocket + serveur de replay
+try:
+    import aiohttp
+    from aiohttp import web
+except ImportError:
+    aiohttp = None
+    web = None
+
+
+def stream_name(symbol):
+    """ETH/USDT → ethusdt (nom de flux Binance)"""
+    return symbol.replace('/', '').lower()
+
+
+class LocalOrderBook:
+    """
+    Carnet d'ordres local maintenu par les diffs WebSocket (depthUpdate)
+
+    Règles de synchronisation Binance :
+    - snapshot REST avec lastUpdateId
+    - diffs avec u <= lastUpdateId ignorés
+    - 1er diff appliqué : U <= lastUpdateId + 1 <= u
+    - diffs suivants : U == u précédent + 1, sinon trou → resynchronisation
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Vide le carnet (en attente d'un snapshot)"""
+        self.bids = {}
+        self.asks = {}
+        self.last_update_id = None
+        self.timestamp = None
+        self.synced = False
+
+    def apply_snapshot(self, snapshot):
+        """
+        Charge un snapshot REST (format ccxt, 'nonce' = lastUpdateId)
+        """
+        self.bids = {float(price): float(amount) for price, amount in snapshot['bids']}
+        self.asks = {float(price): float(amount) for price, amount in snapshot['asks']}
+        self.last_update_id = int(snapshot['nonce'])
+        self.timestamp = snapshot.get('timestamp')
+        self.synced = False
+
+    def apply_diff(self, event):
+        """
+        Applique un depthUpdate
+
+        Returns:
+            bool: False si un trou de séquence est détecté (resync nécessaire)
+        """
+        if self.last_update_id is None:
+            return False
+
+        first_id = event['U']
+        final_id = event['u']
+
+        # Déjà inclus dans le snapshot
+        if final_id <= self.last_update_id:
+            return True
+
+        if not self.synced:
+            if not first_id <= self.last_update_id + 1 <= final_id:
+                return False
+            self.synced = True
+        elif first_id != self.last_update_id + 1:
+            self.synced = False
+            return False
+
+        for side, levels in ((self.bids, event['b']), (self.asks, event['a'])):
+            for price, amount in levels:
+                price = float(price)
+                amount = float(amount)
+                if amount == 0:
+                    side.pop(price, None)
+                else:
+                    side[price] = amount
+
+        self.last_update_id = final_id
+        self.timestamp = event.get('E')
+
+        return True
+
+    def top(self, limit=20):
+        """
+        Meilleurs niveaux (même format que DataCollectorApex.get_order_book)
+        """
+        return {
+            'bids': [[price, self.bids[price]] for price in sorted(self.bids, reverse=True)[:limit]],
+            'asks': [[price, self.asks[price]] for price in sorted(self.asks)[:limit]],
+            'timestamp': self.timestamp
+        }
+
+
+class _SymbolStream:
+    """État streaming d'une paire : bougies, carnet, trades récents"""
+
+    def __init__(self, symbol, limit, trades_maxlen):
+        self.symbol = symbol
+        self.store = CandleStore(maxlen=limit)
+        self.book = LocalOrderBook()
+        self.trades = deque(maxlen=trades_maxlen)
+
+        self.last_agg_id = None
+        self.last_price = None
+
+        # Diffs reçus pendant la resynchronisation du carnet
+        self.depth_buffer = []
+        self.book_resyncing = False
+
+        # Klines reçues pendant un backfill REST des bougies
+        self.kline_buffer = []
+        self.backfilling = False
+        self.trades_backfilling = False
+
+
+class StreamCollectorApex:
+    """
+    Collecteur temps réel par WebSocket (flux combinés Binance)
+
+    - kline : bougies dans un CandleStore (bougie en cours écrasée)
+    - aggTrade : Time & Sales + dernier prix (contrôle des ids consécutifs)
+    - depth : carnet local par diffs (contrôle U/u + snapshot REST)
+
+    Reconnexion automatique avec backoff exponentiel. À chaque connexion
+    et à chaque trou détecté, les données manquantes sont récupérées en
+    REST (bougies depuis le dernier timestamp, trades depuis le dernier
+    id, snapshot du carnet).
+    """
+
+    def __init__(self, exchange, symbols=None, timeframe=None, limit=None, url=None):
+        """
+        Args:
+            exchange: Client REST ccxt (backfill et snapshots)
+            symbols: Paires suivies (défaut: [config.SYMBOL])
+            timeframe: Timeframe des klines (défaut: config)
+            limit: Bougies gardées en mémoire (défaut: DATA_FETCH_LIMIT)
+            url: URL des flux combinés (défaut: config.STREAM_URL)
+        """
+        self.logger = get_logger()
+        self.exchange = exchange
+        self.symbols = list(symbols) if symbols else [config.SYMBOL]
+        self.timeframe = timeframe or config.TIMEFRAME
+        self.limit = limit or config.DATA_FETCH_LIMIT
+        self.url = url or config.STREAM_URL
+
+        self.timeframe_ms = ccxt.Exchange.parse_timeframe(self.timeframe) * 1000
+
+        self.streams = {
+            symbol: _SymbolStream(symbol, self.limit, config.STREAM_TRADES_MAXLEN)
+            for symbol in self.symbols
+        }
+        self._by_stream_name = {stream_name(symbol): symbol for symbol in self.symbols}
+
+        # Accès concurrent (thread du flux / thread du bot)
+        self.lock = threading.Lock()
+
+        # Callbacks appelés à chaque mise à jour de bougie : f(symbol, timeframe, closed)
+        self.candle_listeners = []
+        # Callbacks appelés à chaque trade reçu en direct : f(symbol, trade)
+        self.trade_listeners = []
+
+        self.running = False
+        self.connected = False
+        self._loop = None
+        self._thread = None
+        self._tasks = set()
+
+        self.stats = {
+            'messages': 0,
+            'reconnects': 0,
+            'candle_gaps': 0,
+            'trade_gaps': 0,
+            'book_resyncs': 0,
+            'last_latency_ms': None
+        }
+
+    def build_url(self):
+        """URL des flux combinés pour toutes les paires suivies"""
+        streams = []
+        for symbol in self.symbols:
+            name = stream_name(symbol)
+            streams.append(f"{name}@kline_{self.timeframe}")
+            streams.append(f"{name}@aggTrade")
+            streams.append(f"{name}@depth@{config.STREAM_DEPTH_SPEED}")
+
+        separator = '&' if '?' in self.url else '?'
+        return f"{self.url}{separator}streams={'/'.join(streams)}"
+
+    # ═══════════════════════════════════════════════════════════
+    # 🔌 CONNEXION
+    # ═══════════════════════════════════════════════════════════
+
+    async def run(self):
+        """Boucle de connexion avec reconnexion et backoff exponentiel"""
+        if aiohttp is None:
+            print("❌ aiohttp non installé (pip install aiohttp) - streaming indisponible")
+            return
+
+        self.running = True
+        delay = 1
+
+        while self.running:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(self.build_url(), heartbeat=30) as ws:
+                        self.connected = True
+                        delay = 1
+                        print(f"✅ Flux WebSocket connecté ({len(self.symbols)} paire(s))")
+                        self.logger.info(f"Flux WebSocket connecté: {self.url}")
+
+                        self._on_connect()
+
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self.handle_message(json.loads(msg.data))
+                            elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                                break
+
+                            if not self.running:
+                                break
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                print(f"⚠️  Flux WebSocket interrompu: {e}")
+                self.logger.warning(f"Flux WebSocket interrompu: {e}")
+
+            self.connected = False
+
+            if self.running:
+                self.stats['reconnects'] += 1
+                print(f"🔄 Reconnexion dans {delay}s...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, config.STREAM_RECONNECT_MAX_DELAY)
+
+    def _on_connect(self):
+        """À (re)connexion : backfill des bougies/trades et resync des carnets"""
+        for state in self.streams.values():
+            self._start_candle_backfill(state)
+            self._start_trades_backfill(state)
+            self._start_book_resync(state)
+
+    def start_in_thread(self):
+        """Lance le flux dans un thread dédié (pour le bot synchrone)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def target():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.run())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=target, name="stream-apex", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le flux (la connexion se ferme au prochain message)"""
+        self.running = False
+
+    def _spawn(self, coro):
+        """Lance une tâche de fond (backfill / resync) sans bloquer la réception"""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _rest(self, func, *args, **kwargs):
+        """Appel REST ccxt (bloquant) exécuté hors de la boucle asyncio"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+
+    # ═══════════════════════════════════════════════════════════
+    # 📨 MESSAGES
+    # ═══════════════════════════════════════════════════════════
+
+    def handle_message(self, message):
+        """Traite un message des flux combinés {'stream': ..., 'data': ...}"""
+        data = message.get('data', message)
+        event_type = data.get('e')
+
+        symbol = self._by_stream_name.get(str(data.get('s', '')).lower())
+        if symbol is None:
+            return
+
+        self.stats['messages'] += 1
+        if 'E' in data:
+            self.stats['last_latency_ms'] = time.time() * 1000 - data['E']
+
+        state = self.streams[symbol]
+        if event_type == 'kline':
+            self._handle_kline(state, data['k'])
+        elif event_type == 'aggTrade':
+            self._handle_agg_trade(state, data)
+        elif event_type == 'depthUpdate':
+            self._handle_depth(state, data)
+
+    def _handle_kline(self, state, kline):
+        """Bougie en cours ou clôturée ; détecte les bougies manquantes"""
+        candle = [
+            int(kline['t']),
+            float(kline['o']),
+            float(kline['h']),
+            float(kline['l']),
+            float(kline['c']),
+            float(kline['v'])
+        ]
+
+        if state.backfilling:
+            state.kline_buffer.append(candle)
+            return
+
+        last_timestamp = state.store.last_timestamp
+        if last_timestamp is not None and candle[0] > last_timestamp + self.timeframe_ms:
+            # Trou : on récupère les bougies manquantes avant d'ajouter celle-ci
+            self.stats['candle_gaps'] += 1
+            state.kline_buffer.append(candle)
+            self._start_candle_backfill(state)
+            return
+
+        with self.lock:
+            state.store.merge([candle])
+
+        self._notify_candle(state.symbol, bool(kline.get('x')))
+
+    def _handle_agg_trade(self, state, data):
+        """Trade agrégé ; les ids doivent se suivre"""
+        agg_id = int(data['a'])
+
+        if state.last_agg_id is not None:
+            if agg_id <= state.last_agg_id:
+                return
+            if agg_id != state.last_agg_id + 1 and not state.trades_backfilling:
+                self.stats['trade_gaps'] += 1
+                self._start_trades_backfill(state)
+
+        trade = {
+            'id': agg_id,
+            'timestamp': int(data['T']),
+            'price': float(data['p']),
+            'amount': float(data['q']),
+            'side': 'sell' if data['m'] else 'buy'
+        }
+        self._add_trade(state, trade)
+        self._notify_trade(state.symbol, trade)
+
+    def _add_trade(self, state, trade):
+        """Ajoute un trade (ordre des ids conservé)"""
+        with self.lock:
+            if state.last_agg_id is None or trade['id'] > state.last_agg_id:
+                state.trades.append(trade)
+                state.last_agg_id = trade['id']
+                state.last_price = trade['price']
+
+    def _handle_depth(self, state, event):
+        """Diff du carnet ; resynchronisation sur trou de séquence"""
+        if state.book_resyncing:
+            state.depth_buffer.append(event)
+            return
+
+        with self.lock:
+            applied = state.book.apply_diff(event)
+
+        if not applied:
+            state.depth_buffer.append(event)
+            self._start_book_resync(state)
+
+    def _notify_candle(self, symbol, closed):
+        """Prévient les abonnés d'une mise à jour de bougie"""
+        for callback in self.candle_listeners:
+            try:
+                callback(symbol, self.timeframe, closed)
+            except Exception as e:
+                self.logger.error(f"Erreur callback bougie: {e}")
+
+    def add_candle_listener(self, callback):
+        """Abonne f(symbol, timeframe, closed) aux mises à jour de bougies"""
+        self.candle_listeners.append(callback)
+
+    def _notify_trade(self, symbol, trade):
+        """Prévient les abonnés d'un trade reçu (pas ceux du backfill)"""
+        for callback in self.trade_listeners:
+            try:
+                callback(symbol, trade)
+            except Exception as e:
+                self.logger.error(f"Erreur callback trade: {e}")
+
+    def add_trade_listener(self, callback):
+        """Abonne f(symbol, trade) aux trades reçus en direct"""
+        self.trade_listeners.append(callback)
+
+    # ═══════════════════════════════════════════════════════════
+    # 🔁 BACKFILL REST / RESYNC
+    # ═══════════════════════════════════════════════════════════
+
+    def _start_candle_backfill(self, state):
+        if not state.backfilling:
+            state.backfilling = True
+            self._spawn(self._backfill_candles(state))
+
+    def _start_trades_backfill(self, state):
+        if not state.trades_backfilling:
+            # Premier id manquant noté maintenant : le trade qui révèle le trou
+            # avance last_agg_id avant que le backfill ne s'exécute
+            from_id = state.last_agg_id + 1 if state.last_agg_id is not None else None
+            state.trades_backfilling = True
+            self._spawn(self._backfill_trades(state, from_id))
+
+    def _start_book_resync(self, state):
+        if not state.book_resyncing:
+            state.book_resyncing = True
+            self.stats['book_resyncs'] += 1
+            self._spawn(self._resync_book(state))
+
+    async def _backfill_candles(self, state):
+        """
+        Récupère en REST les bougies manquantes puis rejoue les klines reçues
+        entre-temps (les bougies REST plus récentes que le flux sont ignorées)
+        """
+        try:
+            last_timestamp = state.store.last_timestamp
+            if last_timestamp is None:
+                ohlcv = await self._rest(self.exchange.fetch_ohlcv, state.symbol, self.timeframe,
+                                         limit=self.limit)
+            else:
+                ohlcv = await self._rest(self.exchange.fetch_ohlcv, state.symbol, self.timeframe,
+                                         since=last_timestamp)
+
+            buffered = state.kline_buffer
+            if buffered:
+                first_streamed = buffered[0][0]
+                ohlcv = [candle for candle in ohlcv if candle[0] < first_streamed]
+
+            with self.lock:
+                state.store.merge(ohlcv)
+                state.store.merge(buffered)
+
+            if config.VERBOSE:
+                print(f"✅ Backfill {state.symbol}: {len(ohlcv)} bougie(s) REST + {len(buffered)} du flux")
+
+        except Exception as e:
+            print(f"❌ Erreur backfill bougies {state.symbol}: {e}")
+            self.logger.error(f"Erreur backfill bougies {state.symbol}: {e}")
+
+        finally:
+            state.kline_buffer = []
+            state.backfilling = False
+
+        self._notify_candle(state.symbol, False)
+
+    async def _backfill_trades(self, state, from_id=None):
+        """
+        Récupère en REST les trades manqués
+
+        Args:
+            from_id: Premier id manquant (None = derniers trades, aucun reçu)
+        """
+        try:
+            if from_id is None:
+                trades = await self._rest(self.exchange.fetch_trades, state.symbol,
+                                          limit=config.STREAM_TRADES_MAXLEN)
+            else:
+                trades = await self._rest(self.exchange.fetch_trades, state.symbol,
+                                          params={'fromId': from_id})
+
+            missed = sorted(
+                (
+                    {
+                        'id': int(trade['id']),
+                        'timestamp': int(trade['timestamp']),
+                        'price': float(trade['price']),
+                        'amount': float(trade['amount']),
+                        'side': trade['side']
+                    }
+                    for trade in trades
+                ),
+                key=lambda trade: trade['id']
+            )
+
+            # Insère les trades manqués à leur place (ordre des ids)
+            with self.lock:
+                known = {trade['id'] for trade in state.trades}
+                merged = sorted(list(state.trades) + [t for t in missed if t['id'] not in known],
+                                key=lambda trade: trade['id'])
+                state.trades.clear()
+                state.trades.extend(merged)
+                if merged:
+                    state.last_agg_id = merged[-1]['id']
+                    state.last_price = merged[-1]['price']
+
+        except Exception as e:
+            print(f"❌ Erreur backfill trades {state.symbol}: {e}")
+            self.logger.error(f"Erreur backfill trades {state.symbol}: {e}")
+
+        finally:
+            state.trades_backfilling = False
+
+    async def _resync_book(self, state):
+        """Snapshot REST du carnet puis rejoue les diffs en attente"""
+        try:
+            snapshot = await self._rest(self.exchange.fetch_order_book, state.symbol,
+                                        limit=config.STREAM_BOOK_DEPTH)
+
+            with self.lock:
+                state.book.apply_snapshot(snapshot)
+                pending = state.depth_buffer
+                state.depth_buffer = []
+
+                for event in pending:
+                    if not state.book.apply_diff(event):
+                        # Snapshot trop ancien par rapport aux diffs : on recommence
+                        if event['U'] > state.book.last_update_id + 1:
+                            state.depth_buffer = [e for e in pending if e['u'] >= event['U']]
+                            break
+
+            resync_again = bool(state.depth_buffer)
+
+        except Exception as e:
+            print(f"❌ Erreur snapshot carnet {state.symbol}: {e}")
+            self.logger.error(f"Erreur snapshot carnet {state.symbol}: {e}")
+            resync_again = False
+            await asyncio.sleep(1)
+            state.book.reset()
+
+        # Snapshot chargé : synced passe à True au premier diff qui le prolonge,
+        # nouveau snapshot seulement s'il est déjà dépassé ou en cas d'échec
+        state.book_resyncing = False
+        if resync_again or state.book.last_update_id is None:
+            if self.running and self.connected:
+                self._start_book_resync(state)
+
+    # ═══════════════════════════════════════════════════════════
+    # 📊 ACCÈS AUX DONNÉES
+    # ═══════════════════════════════════════════════════════════
+
+    def has_candles(self, symbol=None, timeframe=None):
+        """Vrai si le flux fournit des bougies pour cette paire/timeframe"""
+        symbol = symbol or config.SYMBOL
+        timeframe = timeframe or config.TIMEFRAME
+        state = self.streams.get(symbol)
+        return (self.connected and timeframe == self.timeframe and state is not None
+                and not state.backfilling and len(state.store) > 0)
+
+    def get_candles(self, symbol=None, as_frame=False):
+        """DataFrame OHLCV (même format que get_historical_data), ou CandleFrame"""
+        state = self.streams[symbol or config.SYMBOL]
+        with self.lock:
+            if as_frame:
+                return state.store.to_frame()
+            return state.store.to_dataframe()
+
+    def get_order_book(self, symbol=None, limit=20):
+        """Carnet local synchronisé (None si pas encore synchronisé)"""
+        state = self.streams.get(symbol or config.SYMBOL)
+        if state is None or not self.connected or not state.book.synced or state.book_resyncing:
+            return None
+        with self.lock:
+            return state.book.top(limit)
+
+    def get_recent_trades(self, symbol=None, limit=100):
+        """DataFrame des derniers trades (même format que get_recent_trades)"""
+        state = self.streams.get(symbol or config.SYMBOL)
+        if state is None or not self.connected or not state.trades:
+            return None
+        with self.lock:
+            trades = list(state.trades)[-limit:]
+
+        df = pd.DataFrame(trades)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def get_last_price(self, symbol=None):
+        """Prix du dernier trade reçu"""
+        state = self.streams.get(symbol or config.SYMBOL)
+        if state is None or not self.connected:
+            return None
+        return state.last_price
+
+
+# ═══════════════════════════════════════════════════════════
+# 🎬 REPLAY LOCAL (tests)
+# ═══════════════════════════════════════════════════════════
+
+class ReplayServer:
+    """
+    Serveur WebSocket local qui rejoue des messages enregistrés
+    (fichier JSONL produit par record_stream) à chaque connexion
+
+    Exemple:
+        server = ReplayServer.from_file('data/stream_eth.jsonl')
+        await server.start()
+        collector = StreamCollectorApex(exchange, url=server.url)
+    """
+
+    def __init__(self, messages, host='127.0.0.1', port=8765, interval=0.0):
+        """
+        Args:
+            messages: Liste de messages (dicts au format des flux combinés)
+            interval: Pause entre deux messages (secondes)
+        """
+        self.messages = messages
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.sessions = None
+        self.connections = 0
+        self._runner = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Charge les messages d'un fichier JSONL"""
+        with open(path, 'r', encoding='utf-8') as f:
+            messages = [json.loads(line) for line in f if line.strip()]
+        return cls(messages, **kwargs)
+
+    @classmethod
+    def from_sessions(cls, sessions, **kwargs):
+        """
+        Messages différents à chaque connexion (tests de reconnexion) :
+        la connexion N rejoue sessions[N] puis se ferme, les suivantes se
+        ferment aussitôt
+        """
+        server = cls([], **kwargs)
+        server.sessions = sessions
+        return server
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/stream"
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        messages = self.messages
+        if self.sessions is not None:
+            messages = self.sessions[self.connections] if self.connections < len(self.sessions) else []
+        self.connections += 1
+
+        for message in messages:
+            if ws.closed:
+                break
+            await ws.send_str(json.dumps(message))
+            if self.interval:
+                await asyncio.sleep(self.interval)
+
+        await ws.close()
+        return ws
+
+    async def start(self):
+        """Démarre le serveur"""
+        if web is None:
+            raise ImportError("aiohttp requis pour le serveur de replay")
+
+        app = web.Application()
+        app.router.add_get('/stream', self._handle)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+        count = sum(map(len, self.sessions)) if self.sessions is not None else len(self.messages)
+        print(f"🎬 Serveur de replay: {self.url} ({count} messages)")
+
+    async def stop(self):
+        """Arrête le serveur"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class ReplayRest:
+    """
+    Client REST de replay pour le backfill et les snapshots du carnet
+
+    Chaque méthode renvoie la réponse enregistrée suivante (la dernière est
+    répétée), filtrée comme l'API (since, fromId). Les appels sont notés
+    dans calls pour vérification.
+    """
+
+    def __init__(self, ohlcv=None, trades=None, order_books=None):
+        """
+        Args:
+            ohlcv: Réponses successives de fetch_ohlcv (listes de bougies)
+            trades: Réponses successives de fetch_trades (listes de trades ccxt)
+            order_books: Réponses successives de fetch_order_book (snapshots ccxt)
+        """
+        self.responses = {
+            'fetch_ohlcv': list(ohlcv or [[]]),
+            'fetch_trades': list(trades or [[]]),
+            'fetch_order_book': list(order_books or [{'bids': [], 'asks': [], 'nonce': 0}])
+        }
+        self.calls = []
+
+    def _next(self, method, args):
+        self.calls.append((method, args))
+        responses = self.responses[method]
+        return responses.pop(0) if len(responses) > 1 else responses[0]
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        ohlcv = self._next('fetch_ohlcv', {'since': since, 'limit': limit})
+        return [candle for candle in ohlcv if since is None or candle[0] >= since]
+
+    def fetch_trades(self, symbol, since=None, limit=None, params=None):
+        from_id = (params or {}).get('fromId')
+        trades = self._next('fetch_trades', {'fromId': from_id, 'limit': limit})
+        return [trade for trade in trades if from_id is None or int(trade['id']) >= from_id]
+
+    def fetch_order_book(self, symbol, limit=None, params=None):
+        return self._next('fetch_order_book', {'limit': limit})
+
+
+async def record_stream(url, path, duration=60):
+    """
+    Enregistre les messages d'un flux dans un fichier JSONL (pour le replay)
+
+    Args:
+        url: URL complète (ex: StreamCollectorApex(...).build_url())
+        path: Fichier de sortie
+        duration: Durée d'enregistrement (secondes)
+    """
+    if aiohttp is None:
+        raise ImportError("aiohttp requis pour enregistrer un flux")
+
+    count = 0
+    deadline = time.time() + duration
+
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(url) as ws:
+            with open(path, 'w', encoding='utf-8') as f:
+                while time.time() < deadline:
+                    try:
+                        msg = await ws.receive(timeout=max(deadline - time.time(), 0.1))
+                    except asyncio.TimeoutError:
+                        break
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    f.write(msg.data + '\n')
+                    count += 1
+
+    print(f"💾 {count} messages enregistrés dans {path}")
+    return count
+
+
+# Test du module
+if __name__ == "__main__":
+    import io
+    import contextlib
+
+    print("🚀 Test du Stream Collector APEX")
+
+    if aiohttp is None:
+        print("❌ aiohttp non installé (pip install aiohttp)")
+        raise SystemExit(1)
+
+    # Replay : reconnexion, trous de klines / aggTrades, trou de séquence du carnet
+    T0 = 1_700_000_040_000
+    MINUTE = 60000
+
+    def candle(minute, close=100.0):
+        return [T0 + minute * MINUTE, close, close + 1, close - 1, close, 10.0]
+
+    def kline(minute, closed):
+        o, h, l, c, v = candle(minute)[1:]
+        return {'stream': 'ethusdt@kline_1m', 'data': {
+            'e': 'kline', 's': 'ETHUSDT',
+            'k': {'t': T0 + minute * MINUTE, 'o': o, 'h': h, 'l': l, 'c': c, 'v': v, 'x': closed}}}
+
+    def trade(agg_id):
+        return {'id': str(agg_id), 'timestamp': T0 + agg_id, 'price': 100.0 + agg_id / 100,
+                'amount': 1.0, 'side': 'buy'}
+
+    def agg_trade(agg_id):
+        return {'stream': 'ethusdt@aggTrade', 'data': {
+            'e': 'aggTrade', 's': 'ETHUSDT', 'a': agg_id, 'p': str(100.0 + agg_id / 100),
+            'q': '1.0', 'T': T0 + agg_id, 'm': False}}
+
+    def depth(first_id, final_id, bid):
+        return {'stream': 'ethusdt@depth@100ms', 'data': {
+            'e': 'depthUpdate', 's': 'ETHUSDT', 'U': first_id, 'u': final_id,
+            'b': [[str(bid), '2.0']], 'a': []}}
+
+    def book(nonce):
+        return {'bids': [[99.0, 1.0]], 'asks': [[101.0, 1.0]], 'nonce': nonce, 'timestamp': T0}
+
+    rest = ReplayRest(
+        ohlcv=[[candle(m) for m in range(7)],             # connexion : historique
+               [candle(m) for m in range(7, 10)],         # trou de klines (minute 8)
+               [candle(m) for m in range(9, 11)]],        # reconnexion
+        trades=[[trade(i) for i in range(1, 11)],         # connexion : derniers trades
+                [trade(i) for i in range(10, 19)],        # trou d'aggTrades (14-16)
+                [trade(i) for i in range(15, 23)]],       # reconnexion
+        order_books=[book(100), book(105), book(120)]      # connexion, trou U/u, reconnexion
+    )
+    server = ReplayServer.from_sessions([
+        [kline(6, True), kline(7, False), agg_trade(11), depth(99, 101, 99.5),
+         agg_trade(12), depth(102, 103, 99.6), agg_trade(13), kline(7, True),
+         agg_trade(17), depth(106, 107, 99.7), kline(9, False), agg_trade(18), depth(108, 108, 99.8)],
+        [agg_trade(22), agg_trade(23), depth(121, 122, 99.9), kline(10, True), kline(11, False)]
+    ], interval=0.05)
+
+    async def replay():
+        await server.start()
+        collector = StreamCollectorApex(rest, symbols=['ETH/USDT'], timeframe='1m', url=server.url)
+        task = asyncio.get_running_loop().create_task(collector.run())
+
+        deadline = time.time() + 15
+        while collector.stats['reconnects'] < 2 and time.time() < deadline:
+            await asyncio.sleep(0.05)
+
+        collector.stop()
+        task.cancel()
+        await server.stop()
+        return collector
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        collector = asyncio.run(replay())
+
+    state = collector.streams['ETH/USDT']
+    ids = [t['id'] for t in state.trades]
+    timestamps = state.store.to_frame()['timestamp'].tolist()
+    from_ids = [args['fromId'] for method, args in rest.calls if method == 'fetch_trades']
+
+    checks = {
+        'reconnexion': collector.stats['reconnects'] >= 2 and server.connections >= 2,
+        'bougies continues après trou': timestamps == [T0 + m * MINUTE for m in range(12)],
+        'trades continus après trou': ids == list(range(1, 24)),
+        'backfill depuis le 1er id manquant': from_ids == [None, 14, 19],
+        'carnet resynchronisé': state.book.synced and state.book.last_update_id == 122
+                                and collector.stats['book_resyncs'] == 3,
+        'snapshot + diffs appliqués': state.book.bids == {99.0: 1.0, 99.9: 2.0}
+    }
+
+    for name, ok in checks.items():
+        print(f"{'✅' if ok else '❌'} {name}")
+    print(f"📊 Stats: {collector.stats}")
+
+    if not all(checks.values()):
+        raise SystemExit(1)
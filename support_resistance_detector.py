@@ -3,18 +3,21 @@
 import pandas as pd
 import numpy as np
 from collections import defaultdict
+import config_apex as config
 
 class SupportResistanceDetector:
     """Détecte les niveaux de support et résistance clés"""
     
-    def __init__(self):
+    def __init__(self, settings=None):
+        self.settings = settings if settings is not None else config
         self.support_levels = []
         self.resistance_levels = []
         self.key_levels = []  # Niveaux les plus importants
         
-        print("✅ Support/Resistance Detector initialisé")
+        if self.settings.VERBOSE:
+            print("✅ Support/Resistance Detector initialisé")
     
-    def detect_levels(self, df, lookback=100, num_levels=5):
+    def detect_levels(self, df, lookback=100, num_levels=5, pivot_window=5):
         """
         Détecte les niveaux de S/R par analyse des pivots
         
@@ -22,6 +25,7 @@ class SupportResistanceDetector:
             df: DataFrame avec OHLC
             lookback: Nombre de bougies à analyser
             num_levels: Nombre de niveaux à retenir
+            pivot_window: Nombre de bougies de chaque côté d'un pivot
             
         Returns:
             dict: Supports et résistances
@@ -32,8 +36,8 @@ class SupportResistanceDetector:
         recent_df = df.tail(lookback)
         
         # Trouve les pivots hauts et bas
-        pivot_highs = self._find_pivot_highs(recent_df)
-        pivot_lows = self._find_pivot_lows(recent_df)
+        pivot_highs = self._find_pivot_highs(recent_df, pivot_window)
+        pivot_lows = self._find_pivot_lows(recent_df, pivot_window)
         
         # Groupe les pivots proches (clustering)
         self.resistance_levels = self._cluster_levels(pivot_highs, num_levels)
@@ -50,41 +54,37 @@ class SupportResistanceDetector:
     
     def _find_pivot_highs(self, df, window=5):
         """Trouve les pivots hauts (sommets locaux)"""
-        pivots = []
+        highs = np.asarray(df['high'], dtype=float)
+        is_pivot = self._strict_extrema(highs, window)
         
-        for i in range(window, len(df) - window):
-            high = df.iloc[i]['high']
-            is_pivot = True
-            
-            # Vérifie si c'est un maximum local
-            for j in range(i - window, i + window + 1):
-                if j != i and df.iloc[j]['high'] >= high:
-                    is_pivot = False
-                    break
-            
-            if is_pivot:
-                pivots.append(high)
-        
-        return pivots
+        return highs[window:len(highs) - window][is_pivot].tolist()
     
     def _find_pivot_lows(self, df, window=5):
         """Trouve les pivots bas (creux locaux)"""
-        pivots = []
+        lows = np.asarray(df['low'], dtype=float)
         
-        for i in range(window, len(df) - window):
-            low = df.iloc[i]['low']
-            is_pivot = True
-            
-            # Vérifie si c'est un minimum local
-            for j in range(i - window, i + window + 1):
-                if j != i and df.iloc[j]['low'] <= low:
-                    is_pivot = False
-                    break
-            
-            if is_pivot:
-                pivots.append(low)
+        # Un minimum strict de x est un maximum strict de -x
+        is_pivot = self._strict_extrema(-lows, window)
         
-        return pivots
+        return lows[window:len(lows) - window][is_pivot].tolist()
+    
+    @staticmethod
+    def _strict_extrema(values, window):
+        """
+        Masque des maximums locaux stricts (valeur > toutes ses voisines à ±window)
+        pour les positions window .. len(values) - window - 1
+        """
+        if len(values) < 2 * window + 1:
+            return np.zeros(0, dtype=bool)
+        
+        windows = np.lib.stride_tricks.sliding_window_view(values, 2 * window + 1)
+        center = windows[:, window]
+        
+        # Maximum des voisines (sans le centre), NaN ignorés comme dans une comparaison
+        neighbors = np.concatenate((windows[:, :window], windows[:, window + 1:]), axis=1)
+        neighbors_max = np.fmax.reduce(neighbors, axis=1)
+        
+        return ~(neighbors_max >= center)
     
     def _cluster_levels(self, levels, num_clusters):
         """Groupe les niveaux proches ensemble"""
@@ -121,14 +121,11 @@ class SupportResistanceDetector:
         
         all_levels = self.support_levels + self.resistance_levels
         
-        for level in all_levels:
-            touches = 0
-            
-            # Compte combien de fois le niveau a été touché
-            for _, candle in df.iterrows():
-                # Touché si le niveau est entre low et high
-                if candle['low'] <= level <= candle['high']:
-                    touches += 1
+        # Compte combien de fois chaque niveau a été touché
+        touch_counts = self._count_touches(df, all_levels)
+        
+        for level, touches in zip(all_levels, touch_counts):
+            touches = int(touches)
             
             # Si touché assez de fois, c'est un niveau clé
             if touches >= min_touches:
@@ -143,6 +140,26 @@ class SupportResistanceDetector:
         
         return key_levels[:5]  # Top 5
     
+    @staticmethod
+    def _count_touches(df, levels):
+        """
+        Nombre de bougies avec low <= niveau <= high, pour chaque niveau
+        
+        touches = #(low <= niveau) - #(high < niveau), via searchsorted
+        sur les lows et highs triés : O((bougies + niveaux) log bougies)
+        """
+        lows = np.asarray(df['low'], dtype=float)
+        highs = np.asarray(df['high'], dtype=float)
+        
+        # Ignore les bougies invalides (NaN, low > high)
+        valid = lows <= highs
+        sorted_lows = np.sort(lows[valid])
+        sorted_highs = np.sort(highs[valid])
+        
+        levels = np.asarray(levels, dtype=float)
+        return (np.searchsorted(sorted_lows, levels, side='right') -
+                np.searchsorted(sorted_highs, levels, side='left'))
+    
     def get_nearest_support(self, current_price):
         """Trouve le support le plus proche sous le prix"""
         if not self.support_levels:
@@ -1,22 +1,51 @@
 # trader_apex.py - Exécution des ordres (APEX)
 
+import functools
+import threading
 import ccxt
 from datetime import datetime
 import config_apex as config
 from logger_apex import get_logger
+from protective_orders import ProtectiveOrderManager
+
+
+def _locked(method):
+    """Exécute la méthode sous le verrou de la position (partagé avec le gardien)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class TraderApex:
     """Exécuteur d'ordres ultra-rapide - APEX"""
     
-    def __init__(self):
-        """Initialise le trader"""
+    def __init__(self, settings=None, exchange=None):
+        """
+        Initialise le trader
+
+        Args:
+            settings: Paramètres (défaut: module config, ou ConfigOverlay)
+            exchange: Client ccxt partagé (mode multi-paires), créé sinon
+        """
         self.logger = get_logger()
+        self.settings = settings if settings is not None else config
+
+        # Verrou de la position : le PositionGuardian (thread dédié) et la
+        # boucle principale lisent / modifient self.position
+        self.lock = threading.RLock()
+
+        # Stop / targets posés sur l'exchange (mode réel, PROTECTIVE_ORDERS)
+        self.protection = ProtectiveOrderManager(self)
 
         try:
-            if not config.DRY_RUN:
+            if not self.settings.DRY_RUN and exchange is not None:
+                self.exchange = exchange
+            elif not self.settings.DRY_RUN:
                 self.exchange = ccxt.binance({
-                    'apiKey': config.BINANCE_API_KEY,
-                    'secret': config.BINANCE_SECRET_KEY,
+                    'apiKey': self.settings.BINANCE_API_KEY,
+                    'secret': self.settings.BINANCE_SECRET_KEY,
                     'enableRateLimit': True,
                     'options': {'defaultType': 'spot'}
                 })
@@ -31,8 +60,9 @@ class TraderApex:
             self.wins = 0
             self.losses = 0
 
-            mode = "SIMULATION" if config.DRY_RUN else "RÉEL"
-            print(f"✅ Trader APEX initialisé ({mode})")
+            mode = "SIMULATION" if self.settings.DRY_RUN else "RÉEL"
+            if self.settings.VERBOSE:
+                print(f"✅ Trader APEX initialisé ({mode})")
             self.logger.info(f"Trader APEX initialisé en mode {mode}")
 
         except Exception as e:
@@ -40,12 +70,76 @@ class TraderApex:
             self.logger.error(f"Erreur init trader: {e}")
             self.exchange = None
     
-    def buy(self, current_price, quantity, stop_loss, take_profit, apex_score=None):
+    def compute_entry_plan(self, current_price, atr, apex_score):
+        """
+        Calcule stop-loss, take-profit et taille de position d'une entrée
+
+        Args:
+            current_price: Prix d'entrée
+            atr: ATR actuel (stop adaptatif)
+            apex_score: Score APEX (sizing adaptatif)
+
+        Returns:
+            dict: Plan de trade (stop, target, R/R, capital, taille, quantité)
+        """
+        # Stop-loss adaptatif
+        stop_distance = max(
+            self.settings.STOP_LOSS_PERCENT,
+            (atr / current_price) * self.settings.ATR_MULTIPLIER
+        )
+        stop_loss = current_price * (1 - stop_distance)
+
+        # Take-profit adaptatif
+        take_profit = current_price * (1 + self.settings.TAKE_PROFIT_PERCENT)
+
+        # Risk/Reward
+        risk = current_price - stop_loss
+        reward = take_profit - current_price
+        rr_ratio = reward / risk if risk > 0 else 0
+
+        # Taille de position ADAPTATIVE (selon APEX Score)
+        capital = self.settings.INITIAL_CAPITAL + self.total_profit
+        base_position_size = capital * self.settings.DEFAULT_POSITION_SIZE
+
+        if self.settings.ADAPTIVE_POSITION_SIZING:
+            if apex_score >= self.settings.IDEAL_APEX_SCORE:
+                # Score excellent (88+) → Grande position (130%)
+                multiplier = self.settings.LARGE_POSITION_MULTIPLIER
+                size_label = "GRANDE"
+            elif apex_score >= self.settings.GOOD_APEX_SCORE:
+                # Bon score (80-88) → Position moyenne (100%)
+                multiplier = self.settings.MEDIUM_POSITION_MULTIPLIER
+                size_label = "MOYENNE"
+            else:
+                # Score acceptable (75-80) → Petite position (60%)
+                multiplier = self.settings.SMALL_POSITION_MULTIPLIER
+                size_label = "PETITE"
+        else:
+            multiplier = 1.0
+            size_label = "STANDARD"
+
+        position_size = base_position_size * multiplier
+
+        return {
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'stop_distance': stop_distance,
+            'rr_ratio': rr_ratio,
+            'capital': capital,
+            'position_size': position_size,
+            'quantity': position_size / current_price,
+            'multiplier': multiplier,
+            'size_label': size_label
+        }
+
+    @_locked
+    def buy(self, current_price, quantity, stop_loss, take_profit, apex_score=None, timestamp=None):
         """
         Exécute un ordre d'ACHAT
 
         Args:
             apex_score: Score APEX à l'entrée (pour sorties dynamiques)
+            timestamp: Heure de l'ordre (défaut: maintenant, backtest: heure de la bougie)
 
         Returns:
             dict: Détails de la position
@@ -53,25 +147,29 @@ class TraderApex:
         if self.position is not None:
             print("⚠️  Position déjà ouverte")
             return None
+
+        if timestamp is None:
+            timestamp = datetime.now()
         
         try:
             # Mode simulation
-            if config.DRY_RUN or self.exchange is None:
+            if self.settings.DRY_RUN or self.exchange is None:
                 self.position = {
                     'entry_price': current_price,
                     'quantity': quantity,
                     'stop_loss': stop_loss,
                     'take_profit': take_profit,
-                    'entry_time': datetime.now(),
+                    'entry_time': timestamp,
                     'entry_apex_score': apex_score,
                     'targets_hit': [],
+                    'highest_price': current_price,
                     'mode': 'simulation'
                 }
                 
                 cost = quantity * current_price
                 print(f"\n🟢 ACHAT SIMULÉ")
                 print(f"   Prix: ${current_price:.2f}")
-                print(f"   Quantité: {quantity:.6f} {config.SYMBOL.split('/')[0]}")
+                print(f"   Quantité: {quantity:.6f} {self.settings.SYMBOL.split('/')[0]}")
                 print(f"   Coût: ${cost:.2f}")
                 print(f"   Stop: ${stop_loss:.2f} ({((stop_loss-current_price)/current_price)*100:.2f}%)")
                 print(f"   Target: ${take_profit:.2f} ({((take_profit-current_price)/current_price)*100:+.2f}%)")
@@ -83,7 +181,7 @@ class TraderApex:
             # Mode réel
             else:
                 order = self.exchange.create_market_buy_order(
-                    config.SYMBOL,
+                    self.settings.SYMBOL,
                     quantity
                 )
                 
@@ -92,10 +190,11 @@ class TraderApex:
                     'quantity': order['amount'],
                     'stop_loss': stop_loss,
                     'take_profit': take_profit,
-                    'entry_time': datetime.now(),
+                    'entry_time': timestamp,
                     'entry_apex_score': apex_score,
                     'order_id': order['id'],
                     'targets_hit': [],
+                    'highest_price': order['price'],
                     'mode': 'real'
                 }
                 
@@ -103,6 +202,9 @@ class TraderApex:
                 print(f"   Order ID: {order['id']}")
                 print(f"   Prix: ${order['price']:.2f}")
                 print(f"   Quantité: {order['amount']:.6f}")
+
+                if self.protection.enabled:
+                    self.protection.place(self.position)
                 
                 return self.position
                 
@@ -110,9 +212,15 @@ class TraderApex:
             print(f"❌ Erreur achat: {e}")
             return None
     
-    def sell(self, current_price, reason=""):
+    @_locked
+    def sell(self, current_price, reason="", timestamp=None, execute=True):
         """
         Exécute un ordre de VENTE (fermeture position)
+
+        Args:
+            timestamp: Heure de l'ordre (défaut: maintenant, backtest: heure de la bougie)
+            execute: False = vente déjà exécutée par l'exchange (ordre de
+                     protection), seulement comptabilisée
         
         Returns:
             dict: Résultat du trade
@@ -120,6 +228,15 @@ class TraderApex:
         if self.position is None:
             print("⚠️  Aucune position à fermer")
             return None
+
+        if timestamp is None:
+            timestamp = datetime.now()
+
+        # Libère la quantité bloquée par les ordres de protection
+        if execute and self.protection.enabled:
+            self.protection.release()
+            if self.position is None:
+                return None
         
         try:
             entry_price = self.position['entry_price']
@@ -130,7 +247,7 @@ class TraderApex:
             profit_usdt = (current_price - entry_price) * quantity
             
             # Frais
-            fees = (entry_price * quantity + current_price * quantity) * config.BINANCE_FEE
+            fees = (entry_price * quantity + current_price * quantity) * self.settings.BINANCE_FEE
             net_profit = profit_usdt - fees
             
             trade_result = {
@@ -140,14 +257,14 @@ class TraderApex:
                 'profit_percent': profit_percent,
                 'profit_usdt': net_profit,
                 'entry_time': self.position['entry_time'],
-                'exit_time': datetime.now(),
-                'duration': datetime.now() - self.position['entry_time'],
+                'exit_time': timestamp,
+                'duration': timestamp - self.position['entry_time'],
                 'reason': reason,
                 'targets_hit': self.position['targets_hit']
             }
             
             # Mode simulation
-            if config.DRY_RUN or self.position.get('mode') == 'simulation':
+            if self.settings.DRY_RUN or self.position.get('mode') == 'simulation':
                 print(f"\n🔴 VENTE SIMULÉE")
                 print(f"   Prix: ${current_price:.2f}")
                 print(f"   Profit: ${net_profit:+.2f} ({profit_percent:+.2f}%)")
@@ -156,9 +273,9 @@ class TraderApex:
                 self.logger.trade("SELL", current_price, quantity, f"{reason} | P&L: ${net_profit:+.2f}")
             
             # Mode réel
-            else:
+            elif execute:
                 order = self.exchange.create_market_sell_order(
-                    config.SYMBOL,
+                    self.settings.SYMBOL,
                     quantity
                 )
                 
@@ -166,6 +283,15 @@ class TraderApex:
                 print(f"   Order ID: {order['id']}")
                 print(f"   Prix: ${order['price']:.2f}")
                 print(f"   Profit net: ${net_profit:+.2f}")
+
+            # Exécutée par l'exchange (ordre de protection)
+            else:
+                print(f"\n🔴 VENTE EXÉCUTÉE PAR L'EXCHANGE")
+                print(f"   Prix: ${current_price:.2f}")
+                print(f"   Profit net: ${net_profit:+.2f}")
+                print(f"   Raison: {reason}")
+
+                self.logger.trade("SELL", current_price, quantity, f"{reason} | P&L: ${net_profit:+.2f}")
             
             # Stats
             self.total_profit += net_profit
@@ -182,9 +308,13 @@ class TraderApex:
             
         except Exception as e:
             print(f"❌ Erreur vente: {e}")
+            # Vente échouée : la position garde sa protection
+            if execute and self.position is not None and self.protection.enabled:
+                self.protection.place(self.position)
             return None
 
-    def sell_partial(self, current_price, percent, reason=""):
+    @_locked
+    def sell_partial(self, current_price, percent, reason="", timestamp=None, execute=True):
         """
         Exécute une vente PARTIELLE (ferme X% de la position)
 
@@ -192,6 +322,8 @@ class TraderApex:
             current_price: Prix actuel
             percent: Pourcentage à fermer (0-1, ex: 0.3 = 30%)
             reason: Raison de la sortie partielle
+            timestamp: Heure de l'ordre (défaut: maintenant, backtest: heure de la bougie)
+            execute: False = vente déjà exécutée par l'exchange, seulement comptabilisée
 
         Returns:
             dict: Résultat du trade partiel
@@ -200,10 +332,19 @@ class TraderApex:
             print("⚠️  Aucune position à fermer")
             return None
 
+        if timestamp is None:
+            timestamp = datetime.now()
+
         if percent <= 0 or percent >= 1:
             print(f"⚠️  Pourcentage invalide: {percent*100:.0f}%")
             return None
 
+        # Libère la quantité bloquée par les ordres de protection
+        if execute and self.protection.enabled:
+            self.protection.release()
+            if self.position is None:
+                return None
+
         try:
             entry_price = self.position['entry_price']
             quantity_to_sell = self.position['quantity'] * percent
@@ -214,7 +355,7 @@ class TraderApex:
             profit_usdt = (current_price - entry_price) * quantity_to_sell
 
             # Frais
-            fees = (entry_price * quantity_to_sell + current_price * quantity_to_sell) * config.BINANCE_FEE
+            fees = (entry_price * quantity_to_sell + current_price * quantity_to_sell) * self.settings.BINANCE_FEE
             net_profit = profit_usdt - fees
 
             trade_result = {
@@ -224,27 +365,27 @@ class TraderApex:
                 'profit_percent': profit_percent,
                 'profit_usdt': net_profit,
                 'entry_time': self.position['entry_time'],
-                'exit_time': datetime.now(),
-                'duration': datetime.now() - self.position['entry_time'],
+                'exit_time': timestamp,
+                'duration': timestamp - self.position['entry_time'],
                 'reason': f"SORTIE PARTIELLE ({percent*100:.0f}%) - {reason}",
                 'partial': True
             }
 
             # Mode simulation
-            if config.DRY_RUN or self.position.get('mode') == 'simulation':
+            if self.settings.DRY_RUN or self.position.get('mode') == 'simulation':
                 print(f"\n🟡 VENTE PARTIELLE SIMULÉE ({percent*100:.0f}%)")
                 print(f"   Prix: ${current_price:.2f}")
-                print(f"   Quantité vendue: {quantity_to_sell:.6f} {config.SYMBOL.split('/')[0]}")
-                print(f"   Quantité restante: {remaining_quantity:.6f} {config.SYMBOL.split('/')[0]}")
+                print(f"   Quantité vendue: {quantity_to_sell:.6f} {self.settings.SYMBOL.split('/')[0]}")
+                print(f"   Quantité restante: {remaining_quantity:.6f} {self.settings.SYMBOL.split('/')[0]}")
                 print(f"   Profit sur partie vendue: ${net_profit:+.2f} ({profit_percent:+.2f}%)")
                 print(f"   Raison: {reason}")
 
                 self.logger.trade("SELL_PARTIAL", current_price, quantity_to_sell, f"{reason} | P&L: ${net_profit:+.2f}")
 
             # Mode réel
-            else:
+            elif execute:
                 order = self.exchange.create_market_sell_order(
-                    config.SYMBOL,
+                    self.settings.SYMBOL,
                     quantity_to_sell
                 )
 
@@ -253,11 +394,20 @@ class TraderApex:
                 print(f"   Prix: ${order['price']:.2f}")
                 print(f"   Profit net: ${net_profit:+.2f}")
 
+            # Exécutée par l'exchange (tranche d'un ordre de protection)
+            else:
+                print(f"\n🟡 VENTE PARTIELLE EXÉCUTÉE PAR L'EXCHANGE ({percent*100:.0f}%)")
+                print(f"   Prix: ${current_price:.2f}")
+                print(f"   Profit net: ${net_profit:+.2f}")
+                print(f"   Raison: {reason}")
+
+                self.logger.trade("SELL_PARTIAL", current_price, quantity_to_sell, f"{reason} | P&L: ${net_profit:+.2f}")
+
             # Met à jour la position avec la quantité restante
             self.position['quantity'] = remaining_quantity
 
             # Ajuste le stop si demandé (breakeven après sortie partielle)
-            if config.BREAKEVEN_AFTER_PARTIAL and net_profit > 0:
+            if self.settings.BREAKEVEN_AFTER_PARTIAL and net_profit > 0:
                 self.position['stop_loss'] = entry_price
                 print(f"   🛡️  Stop ajusté au breakeven: ${entry_price:.2f}")
 
@@ -271,12 +421,19 @@ class TraderApex:
             # Historique
             self.positions_history.append(trade_result)
 
+            # Protection reposée pour la quantité restante
+            if execute and self.protection.enabled:
+                self.protection.place(self.position)
+
             return trade_result
 
         except Exception as e:
             print(f"❌ Erreur vente partielle: {e}")
+            if execute and self.position is not None and self.protection.enabled:
+                self.protection.place(self.position)
             return None
 
+    @_locked
     def check_multi_target_exit(self, current_price):
         """
         Vérifie les sorties multi-targets
@@ -289,10 +446,10 @@ class TraderApex:
         profit_percent = ((current_price - entry_price) / entry_price) * 100
         
         # Target 1 : +1.5% (ferme 50%)
-        if (profit_percent >= config.FIRST_TARGET_PERCENT * 100 and 
+        if (profit_percent >= self.settings.FIRST_TARGET_PERCENT * 100 and 
             'target1' not in self.position['targets_hit']):
             
-            print(f"\n🎯 TARGET 1 ATTEINT (+{config.FIRST_TARGET_PERCENT*100:.1f}%)")
+            print(f"\n🎯 TARGET 1 ATTEINT (+{self.settings.FIRST_TARGET_PERCENT*100:.1f}%)")
             print(f"   Fermeture de 50% de la position")
             
             self.position['targets_hit'].append('target1')
@@ -305,41 +462,110 @@ class TraderApex:
             return True
         
         # Target 2 : +2.5% (ferme 60% du reste = 30% du total)
-        if (profit_percent >= config.SECOND_TARGET_PERCENT * 100 and 
+        if (profit_percent >= self.settings.SECOND_TARGET_PERCENT * 100 and 
             'target2' not in self.position['targets_hit'] and
             'target1' in self.position['targets_hit']):
             
-            print(f"\n🎯 TARGET 2 ATTEINT (+{config.SECOND_TARGET_PERCENT*100:.1f}%)")
+            print(f"\n🎯 TARGET 2 ATTEINT (+{self.settings.SECOND_TARGET_PERCENT*100:.1f}%)")
             print(f"   Fermeture de 30% supplémentaires")
             
             self.position['targets_hit'].append('target2')
             self.position['quantity'] *= 0.4  # Garde 20%
             
             # Trail le stop
-            new_stop = current_price * (1 - config.TRAILING_STOP_DISTANCE)
+            new_stop = current_price * (1 - self.settings.TRAILING_STOP_DISTANCE)
             self.position['stop_loss'] = max(self.position['stop_loss'], new_stop)
             print(f"   Stop trail à: ${self.position['stop_loss']:.2f}")
             
             return True
         
         # Target 3 : +4% (laisse runner les 20% restants)
-        if (profit_percent >= config.THIRD_TARGET_PERCENT * 100 and 
+        if (profit_percent >= self.settings.THIRD_TARGET_PERCENT * 100 and 
             'target3' not in self.position['targets_hit']):
             
-            print(f"\n🎯 TARGET 3 ATTEINT (+{config.THIRD_TARGET_PERCENT*100:.1f}%)")
+            print(f"\n🎯 TARGET 3 ATTEINT (+{self.settings.THIRD_TARGET_PERCENT*100:.1f}%)")
             print(f"   Position finale (20%) laissée runner")
             
             self.position['targets_hit'].append('target3')
             
             # Trail agressif
-            new_stop = current_price * (1 - config.TRAILING_STOP_DISTANCE * 0.7)
+            new_stop = current_price * (1 - self.settings.TRAILING_STOP_DISTANCE * 0.7)
             self.position['stop_loss'] = max(self.position['stop_loss'], new_stop)
             print(f"   Stop trail agressif à: ${self.position['stop_loss']:.2f}")
             
             return True
-        
+
         return False
-    
+
+    @_locked
+    def take_target_profits(self, current_price, timestamp=None):
+        """
+        Multi-targets avec vente réelle de la part atteinte
+
+        check_multi_target_exit réduit la quantité sans comptabiliser la
+        vente : on l'enregistre via sell_partial puis on remet le stop
+        décidé par la target (jamais sous un trailing stop déjà remonté).
+
+        Returns:
+            str: Target atteinte ('target1', 'target2', 'target3') ou None
+        """
+        position = self.position
+        if position is None:
+            return None
+
+        quantity = position['quantity']
+        stop_loss = position['stop_loss']
+
+        if not self.check_multi_target_exit(current_price):
+            return None
+
+        target_quantity = position['quantity']
+        target_stop = position['stop_loss']
+        position['quantity'] = quantity
+
+        percent = 1 - target_quantity / quantity
+        if percent > 0:
+            self.sell_partial(current_price, percent,
+                              f"Target {position['targets_hit'][-1]}", timestamp=timestamp)
+
+        position['stop_loss'] = max(target_stop, stop_loss)
+        position['quantity'] = target_quantity
+
+        return position['targets_hit'][-1]
+
+    @_locked
+    def update_trailing_stop(self, current_price):
+        """
+        Remonte le stop derrière le plus haut atteint
+
+        Actif si TRAILING_STOP_ENABLED, dès TRAILING_STOP_ACTIVATION de gain
+        (depuis l'entrée), à TRAILING_STOP_DISTANCE sous le plus haut. Le stop
+        ne redescend jamais.
+
+        Returns:
+            bool: True si le stop a été remonté
+        """
+        position = self.position
+        if position is None:
+            return False
+
+        entry_price = position['entry_price']
+        highest = max(position.get('highest_price', entry_price), current_price)
+        position['highest_price'] = highest
+
+        if not self.settings.TRAILING_STOP_ENABLED:
+            return False
+        if (highest - entry_price) / entry_price < self.settings.TRAILING_STOP_ACTIVATION:
+            return False
+
+        new_stop = highest * (1 - self.settings.TRAILING_STOP_DISTANCE)
+        if new_stop <= position['stop_loss']:
+            return False
+
+        position['stop_loss'] = new_stop
+        self.logger.info(f"Trailing stop remonté à {new_stop:.2f} (plus haut {highest:.2f})")
+        return True
+
     def has_position(self):
         """Vérifie si une position est ouverte"""
         return self.position is not None
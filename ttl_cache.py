@@ -0,0 +1,196 @@
+# ttl_cache.py - Cache TTL/LRU des lectures API partagé entre threads (APEX)
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class TTLCache:
+    """
+    Cache clé → valeur avec durée de vie, éviction LRU et
+    stale-while-revalidate
+
+    - valeur fraîche (âge < ttl) : renvoyée directement (hit)
+    - valeur périmée depuis moins de stale_ttl : renvoyée tout de suite,
+      un rafraîchissement est lancé en arrière-plan (stale)
+    - sinon : fetch() synchrone (miss) ; les appels simultanés sur la même
+      clé attendent le même fetch au lieu d'en lancer un chacun
+    - None n'est jamais mis en cache (erreur réseau = pas de valeur)
+
+    Les valeurs sont partagées entre appelants : ne pas les modifier.
+    """
+
+    def __init__(self, maxsize=256, ttl=30.0, stale_ttl=0.0, executor=None):
+        """
+        Args:
+            maxsize: Nombre max d'entrées (les moins récemment lues sont évincées)
+            ttl: Durée de vie par défaut (secondes, 0 = pas de cache)
+            stale_ttl: Durée pendant laquelle une valeur périmée reste servie
+                       le temps de la rafraîchir
+            executor: Exécuteur des rafraîchissements (défaut: thread dédié)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.executor = executor
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clé → (valeur, expiration, fin du stale)
+        self._pending = {}             # clé → Future du fetch en cours
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale_hits': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'evictions': 0
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, fetch, ttl=None, stale_ttl=None):
+        """
+        Valeur en cache, ou fetch() si absente / expirée
+
+        Args:
+            key: Clé hashable (ex: ('ticker', 'ETH/USDT'))
+            fetch: Fonction sans argument qui lit la valeur (None = échec)
+            ttl: Durée de vie de cette clé (défaut: self.ttl)
+            stale_ttl: Fenêtre stale-while-revalidate de cette clé (défaut: self.stale_ttl)
+
+        Returns:
+            Valeur (None si fetch a échoué)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+
+        if ttl <= 0:
+            with self._lock:
+                self.stats['misses'] += 1
+            return fetch()
+
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                value, expires, stale_until = entry
+                if now < expires:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value
+                if now < stale_until:
+                    self._entries.move_to_end(key)
+                    self.stats['stale_hits'] += 1
+                    if key not in self._pending:
+                        self._pending[key] = Future()
+                        self.stats['refreshes'] += 1
+                        self._submit(self._refresh, key, fetch, ttl, stale_ttl)
+                    return value
+
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not owner:
+            return future.result()
+
+        return self._load(key, fetch, ttl, stale_ttl)
+
+    def _load(self, key, fetch, ttl, stale_ttl):
+        """Exécute fetch() et publie le résultat aux appelants en attente"""
+        with self._lock:
+            future = self._pending[key]
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._pending.pop(key, None)
+            if value is not None:
+                self._store(key, value, ttl, stale_ttl)
+
+        future.set_result(value)
+        return value
+
+    def _refresh(self, key, fetch, ttl, stale_ttl):
+        """Rafraîchissement en arrière-plan (l'ancienne valeur reste servie en cas d'échec)"""
+        try:
+            self._load(key, fetch, ttl, stale_ttl)
+        except Exception:
+            pass
+
+    def _submit(self, fn, *args):
+        if self.executor is not None:
+            self.executor.submit(fn, *args)
+        else:
+            threading.Thread(target=fn, args=args, daemon=True).start()
+
+    def _store(self, key, value, ttl, stale_ttl):
+        """Enregistre une valeur (verrou tenu par l'appelant)"""
+        expires = time.monotonic() + ttl
+        self._entries[key] = (value, expires, expires + stale_ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def set(self, key, value, ttl=None, stale_ttl=None):
+        """Insère une valeur déjà connue (ex: reçue par un autre canal)"""
+        if value is None:
+            return
+        with self._lock:
+            self._store(key, value,
+                        self.ttl if ttl is None else ttl,
+                        self.stale_ttl if stale_ttl is None else stale_ttl)
+
+    def invalidate(self, key=None):
+        """Oublie une clé (ou tout le cache si key est None)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    @property
+    def hit_rate(self):
+        """Part des lectures servies sans appel API dédié (hits, stale, fetch partagé)"""
+        served = self.stats['hits'] + self.stats['stale_hits'] + self.stats['coalesced']
+        total = served + self.stats['misses']
+        return served / total if total else 0.0
+
+
+# Test du module
+if __name__ == "__main__":
+    print("🚀 Test du TTL Cache APEX")
+
+    calls = []
+
+    def fetch_price():
+        calls.append(time.monotonic())
+        time.sleep(0.05)
+        return 3000.0 + len(calls)
+
+    cache = TTLCache(maxsize=2, ttl=0.2, stale_ttl=0.5)
+    for _ in range(10):
+        cache.get(('ticker', 'ETH/USDT'), fetch_price)
+    time.sleep(0.25)
+    stale = cache.get(('ticker', 'ETH/USDT'), fetch_price)
+    time.sleep(0.1)
+
+    print(f"\n✅ 11 lectures, {len(calls)} appels API (valeur périmée servie: {stale})")
+    print(f"📊 Stats: {cache.stats} - taux de hit {cache.hit_rate:.0%}")
@@ -1,20 +1,228 @@
 # volume_profile_engine.py - Analyse Volume Profile + VWAP (PRO)
 
+import math
+from collections import deque
 import pandas as pd
 import numpy as np
 import config_apex as config
+from candle_frame import timestamps_ms
+
+
+class _RangeAddTree:
+    """
+    Arbre de segments à ajout par plage (lazy non propagé)
+
+    - add(l, r, value) : ajoute value à chaque niveau de [l, r]   O(log n)
+    - argmax()         : niveau avec le plus de volume           O(log n)
+    - search(target)   : 1er niveau où le cumul atteint target   O(log n)
+    """
+
+    def __init__(self, size):
+        self.size = 1
+        while self.size < size:
+            self.size *= 2
+        self._sum = [0.0] * (2 * self.size)
+        self._max = [0.0] * (2 * self.size)
+        self._lazy = [0.0] * (2 * self.size)
+
+    @property
+    def total(self):
+        return self._sum[1]
+
+    def add(self, left, right, value, node=1, node_left=0, node_right=None):
+        """Ajoute value à chaque niveau de [left, right]"""
+        if node_right is None:
+            node_right = self.size - 1
+
+        if right < node_left or node_right < left:
+            return
+
+        if left <= node_left and node_right <= right:
+            self._sum[node] += value * (node_right - node_left + 1)
+            self._max[node] += value
+            self._lazy[node] += value
+            return
+
+        middle = (node_left + node_right) // 2
+        self.add(left, right, value, 2 * node, node_left, middle)
+        self.add(left, right, value, 2 * node + 1, middle + 1, node_right)
+
+        length = node_right - node_left + 1
+        self._sum[node] = self._sum[2 * node] + self._sum[2 * node + 1] + self._lazy[node] * length
+        self._max[node] = max(self._max[2 * node], self._max[2 * node + 1]) + self._lazy[node]
+
+    def argmax(self):
+        """Niveau avec le volume maximum (le plus bas en cas d'égalité)"""
+        node = 1
+        while node < self.size:
+            left, right = 2 * node, 2 * node + 1
+            node = left if self._max[left] >= self._max[right] else right
+        return node - self.size
+
+    def search(self, target):
+        """Premier niveau où le volume cumulé (depuis le bas) atteint target"""
+        node = 1
+        inherited = 0.0  # Lazy des ancêtres, non inclus dans les sommes des enfants
+        length = self.size
+        while node < self.size:
+            inherited += self._lazy[node]
+            length //= 2
+            left = 2 * node
+            left_sum = self._sum[left] + inherited * length
+            if target <= left_sum:
+                node = left
+            else:
+                target -= left_sum
+                node = left + 1
+        return node - self.size
+
+
+class RollingVolumeProfile:
+    """
+    Volume Profile glissant et incrémental sur une grille de prix fixe (tick_size)
+
+    Chaque nouvelle bougie ajoute son volume (réparti uniformément entre low
+    et high) et la bougie qui sort de la fenêtre est soustraite. POC et Value
+    Area sont lus dans un arbre de segments en O(log n) : le coût par tick
+    reste constant, même sur des profils de session / multi-jours.
+
+    La Value Area est ici la zone centrale de 70% du volume (entre les
+    quantiles 15% et 85% de la distribution), calculable en O(log n).
+    """
+
+    def __init__(self, tick_size, window=1440, num_levels=4096, value_area_percent=0.70):
+        self.tick_size = tick_size
+        self.window = window
+        self.num_levels = num_levels
+        self.value_area_percent = value_area_percent
+
+        self.origin = None
+        self.tree = _RangeAddTree(num_levels)
+
+        # Bougies dans la fenêtre : (timestamp, high, low, volume, level_low, level_high, volume_par_niveau)
+        self.candles = deque()
+
+    def __len__(self):
+        return len(self.candles)
+
+    @property
+    def last_timestamp(self):
+        return self.candles[-1][0] if self.candles else None
+
+    def _level(self, price):
+        return int(math.floor((price - self.origin) / self.tick_size))
+
+    def price_of(self, level):
+        """Prix milieu d'un niveau de la grille"""
+        return self.origin + (level + 0.5) * self.tick_size
+
+    def update(self, timestamp, high, low, volume):
+        """
+        Intègre une bougie (nouvelle ou révision de la bougie en cours)
+        et retire celle qui sort de la fenêtre
+        """
+        if self.candles and timestamp < self.candles[-1][0]:
+            return
+
+        if self.candles and timestamp == self.candles[-1][0]:
+            self._remove(self.candles.pop())
+
+        if self.origin is None:
+            self._recenter(high, low)
+
+        if self._level(low) < 0 or self._level(high) >= self.num_levels:
+            self._rebuild(high, low)
+
+        self.candles.append(self._add(timestamp, high, low, volume))
+
+        while len(self.candles) > self.window:
+            self._remove(self.candles.popleft())
+
+    def _add(self, timestamp, high, low, volume):
+        level_low = self._level(low)
+        level_high = self._level(high)
+        volume_per_level = volume / (level_high - level_low + 1)
+        self.tree.add(level_low, level_high, volume_per_level)
+        return (timestamp, high, low, volume, level_low, level_high, volume_per_level)
+
+    def _remove(self, candle):
+        self.tree.add(candle[4], candle[5], -candle[6])
+
+    def _recenter(self, high, low):
+        """Centre la grille sur les prix de la fenêtre (+ la nouvelle bougie)"""
+        prices_high = max([c[1] for c in self.candles] + [high])
+        prices_low = min([c[2] for c in self.candles] + [low])
+
+        # Agrandit la grille si la fenêtre ne tient plus dedans
+        while (prices_high - prices_low) / self.tick_size + 1 > self.num_levels // 2:
+            self.num_levels *= 2
+
+        center = (prices_high + prices_low) / 2
+        self.origin = center - (self.num_levels // 2) * self.tick_size
+
+    def _rebuild(self, high, low):
+        """Recentre la grille et réinjecte toutes les bougies (rare)"""
+        self._recenter(high, low)
+        self.tree = _RangeAddTree(self.num_levels)
+        candles = self.candles
+        self.candles = deque(self._add(c[0], c[1], c[2], c[3]) for c in candles)
+
+    def update_from_dataframe(self, df):
+        """Intègre les bougies du DataFrame à partir de la dernière bougie connue"""
+        timestamps = timestamps_ms(df)
+        start = 0
+        if self.last_timestamp is not None:
+            start = int(np.searchsorted(timestamps, self.last_timestamp))
+
+        highs = np.asarray(df['high'], dtype=float)
+        lows = np.asarray(df['low'], dtype=float)
+        volumes = np.asarray(df['volume'], dtype=float)
+
+        for i in range(start, len(df)):
+            self.update(int(timestamps[i]), highs[i], lows[i], volumes[i])
+
+    @property
+    def total_volume(self):
+        return self.tree.total
+
+    def get_poc(self):
+        """Point of Control (prix du niveau le plus chargé)"""
+        if not self.candles or self.total_volume <= 0:
+            return None
+        return self.price_of(self.tree.argmax())
+
+    def get_value_area(self):
+        """
+        Value Area (zone centrale contenant 70% du volume)
+
+        Returns:
+            tuple: (value_area_low, value_area_high) ou (None, None)
+        """
+        total = self.total_volume
+        if not self.candles or total <= 0:
+            return None, None
+
+        tail = (1 - self.value_area_percent) / 2
+        level_low = self.tree.search(total * tail)
+        level_high = self.tree.search(total * (1 - tail))
+        return self.price_of(level_low), self.price_of(level_high)
+
 
 class VolumeProfileEngine:
     """Analyse du Volume Profile et VWAP comme les traders PRO"""
     
-    def __init__(self):
+    def __init__(self, settings=None):
+        self.settings = settings if settings is not None else config
         self.vwap = None
-        self.volume_profile = {}
+        self.price_levels = None      # Prix milieu de chaque bin
+        self.volume_at_price = None   # Volume par bin (ndarray)
         self.poc = None  # Point of Control (prix avec le plus de volume)
         self.value_area_high = None
         self.value_area_low = None
+        self.rolling_profile = None   # Profil incrémental (ROLLING_VOLUME_PROFILE)
         
-        print("✅ Volume Profile Engine initialisé")
+        if self.settings.VERBOSE:
+            print("✅ Volume Profile Engine initialisé")
     
     def calculate_vwap(self, df):
         """
@@ -29,16 +237,21 @@ class VolumeProfileEngine:
         
         # VWAP = Σ(Prix typique × Volume) / Σ(Volume)
         # Prix typique = (High + Low + Close) / 3
-        typical_price = (df['high'] + df['low'] + df['close']) / 3
+        high = np.asarray(df['high'], dtype=float)
+        low = np.asarray(df['low'], dtype=float)
+        close = np.asarray(df['close'], dtype=float)
+        volume = np.asarray(df['volume'], dtype=float)
+        typical_price = (high + low + close) / 3
         
         # Calcul cumulatif
-        cumulative_tp_volume = (typical_price * df['volume']).cumsum()
-        cumulative_volume = df['volume'].cumsum()
+        cumulative_tp_volume = np.cumsum(typical_price * volume)
+        cumulative_volume = np.cumsum(volume)
         
         # VWAP
-        vwap = cumulative_tp_volume / cumulative_volume
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = cumulative_tp_volume / cumulative_volume
         
-        self.vwap = vwap.iloc[-1]
+        self.vwap = vwap[-1].item()
         
         # Ajoute au DataFrame
         df['vwap'] = vwap
@@ -50,96 +263,106 @@ class VolumeProfileEngine:
         Calcule le Volume Profile
         Distribution du volume à différents niveaux de prix
         
+        Le volume de chaque bougie est réparti uniformément entre son low et
+        son high : matrice de chevauchement (bougies × bins) calculée en NumPy.
+        
         Args:
             df: DataFrame avec OHLCV
             price_bins: Nombre de niveaux de prix
             
         Returns:
-            dict: Volume profile data
+            dict: Volume profile data (prix et volumes en ndarrays)
         """
-        if df is None or len(df) < config.VOLUME_PROFILE_PERIODS:
+        if df is None or len(df) < self.settings.VOLUME_PROFILE_PERIODS:
             return None
         
         # Prend les dernières bougies
-        recent_df = df.tail(config.VOLUME_PROFILE_PERIODS)
+        recent_df = df.tail(self.settings.VOLUME_PROFILE_PERIODS)
+        
+        lows = np.asarray(recent_df['low'], dtype=float)
+        highs = np.asarray(recent_df['high'], dtype=float)
+        volumes = np.asarray(recent_df['volume'], dtype=float)
         
         # Définit les bins de prix
-        price_min = recent_df['low'].min()
-        price_max = recent_df['high'].max()
+        bins = np.linspace(lows.min(), highs.max(), price_bins)
+        bin_lows = bins[:-1]
+        bin_highs = bins[1:]
         
-        bins = np.linspace(price_min, price_max, price_bins)
+        # Chevauchement [low, high] de chaque bougie avec chaque bin
+        overlap = (np.minimum(highs[:, None], bin_highs[None, :]) -
+                   np.maximum(lows[:, None], bin_lows[None, :]))
+        np.clip(overlap, 0, None, out=overlap)
         
-        # Calcule le volume à chaque niveau de prix
-        volume_at_price = {}
+        # Volume par unité de prix (bougies sans range ignorées)
+        candle_ranges = highs - lows
+        has_range = candle_ranges > 0
+        volume_density = np.zeros_like(volumes)
+        volume_density[has_range] = volumes[has_range] / candle_ranges[has_range]
         
-        for _, candle in recent_df.iterrows():
-            # Pour chaque bougie, distribue le volume entre high et low
-            candle_range = candle['high'] - candle['low']
-            if candle_range == 0:
-                continue
+        volume_at_price = (overlap * volume_density[:, None]).sum(axis=0)
+        
+        self.price_levels = (bin_lows + bin_highs) / 2
+        self.volume_at_price = volume_at_price
+        
+        if volume_at_price.sum() > 0:
+            # Point of Control (POC) - prix avec le plus de volume
+            self.poc = self.price_levels[np.argmax(volume_at_price)]
             
-            # Trouve les bins concernés
-            for i in range(len(bins) - 1):
-                bin_low = bins[i]
-                bin_high = bins[i + 1]
-                bin_mid = (bin_low + bin_high) / 2
-                
-                # Si le bin intersecte la bougie
-                if bin_high >= candle['low'] and bin_low <= candle['high']:
-                    # Calcule la proportion du volume
-                    overlap_low = max(bin_low, candle['low'])
-                    overlap_high = min(bin_high, candle['high'])
-                    overlap_range = overlap_high - overlap_low
-                    
-                    volume_proportion = overlap_range / candle_range
-                    volume_in_bin = candle['volume'] * volume_proportion
-                    
-                    if bin_mid in volume_at_price:
-                        volume_at_price[bin_mid] += volume_in_bin
-                    else:
-                        volume_at_price[bin_mid] = volume_in_bin
-        
-        self.volume_profile = volume_at_price
-        
-        # Trouve le Point of Control (POC) - prix avec le plus de volume
-        if volume_at_price:
-            self.poc = max(volume_at_price, key=volume_at_price.get)
-        
-        # Calcule la Value Area (zone où 70% du volume s'est échangé)
-        self._calculate_value_area(volume_at_price)
+            # Value Area (zone où 70% du volume s'est échangé)
+            self._calculate_value_area(self.price_levels, volume_at_price)
         
         return {
-            'volume_profile': volume_at_price,
+            'price_levels': self.price_levels,
+            'volume_at_price': self.volume_at_price,
             'poc': self.poc,
             'value_area_high': self.value_area_high,
             'value_area_low': self.value_area_low
         }
     
-    def _calculate_value_area(self, volume_at_price):
-        """Calcule la Value Area (70% du volume)"""
-        if not volume_at_price:
-            return
+    def _calculate_value_area(self, price_levels, volume_at_price, value_area_percent=0.70):
+        """Calcule la Value Area (70% du volume) par somme cumulée des bins triés"""
+        # Trie les bins par volume décroissant
+        order = np.argsort(-volume_at_price, kind='stable')
+        cumulative_volume = np.cumsum(volume_at_price[order])
         
-        # Trie par volume décroissant
-        sorted_prices = sorted(volume_at_price.items(), key=lambda x: x[1], reverse=True)
+        target_volume = cumulative_volume[-1] * value_area_percent
         
-        total_volume = sum(volume_at_price.values())
-        target_volume = total_volume * 0.70
+        # Prend les bins jusqu'à 70% du volume
+        count = int(np.searchsorted(cumulative_volume, target_volume)) + 1
+        value_area_prices = price_levels[order[:count]]
         
-        # Prend les prix jusqu'à 70% du volume
-        cumulative_volume = 0
-        value_area_prices = []
+        self.value_area_high = value_area_prices.max()
+        self.value_area_low = value_area_prices.min()
+    
+    def update_rolling_profile(self, df):
+        """
+        Met à jour le Volume Profile glissant (ajout/retrait par bougie)
+        sur ROLLING_PROFILE_PERIODS bougies et une grille VOLUME_PROFILE_TICK_SIZE
         
-        for price, volume in sorted_prices:
-            cumulative_volume += volume
-            value_area_prices.append(price)
-            
-            if cumulative_volume >= target_volume:
-                break
+        Returns:
+            dict: POC et Value Area
+        """
+        if df is None or len(df) == 0:
+            return None
+        
+        if self.rolling_profile is None:
+            self.rolling_profile = RollingVolumeProfile(
+                self.settings.VOLUME_PROFILE_TICK_SIZE,
+                window=self.settings.ROLLING_PROFILE_PERIODS
+            )
         
-        if value_area_prices:
-            self.value_area_high = max(value_area_prices)
-            self.value_area_low = min(value_area_prices)
+        self.rolling_profile.update_from_dataframe(df)
+        
+        poc = self.rolling_profile.get_poc()
+        if poc is not None:
+            self.poc = poc
+            self.value_area_low, self.value_area_high = self.rolling_profile.get_value_area()
+        
+        return {
+            'poc': self.poc,
+            'value_area_high': self.value_area_high,
+            'value_area_low': self.value_area_low
+        }
     
     def is_price_in_value_area(self, price):
         """Vérifie si le prix est dans la Value Area"""
@@ -164,7 +387,7 @@ class VolumeProfileEngine:
     def is_near_vwap(self, current_price, threshold=None):
         """Vérifie si le prix est proche du VWAP"""
         if threshold is None:
-            threshold = config.VWAP_DEVIATION_THRESHOLD
+            threshold = self.settings.VWAP_DEVIATION_THRESHOLD
         
         deviation = abs(self.get_vwap_deviation(current_price))
         return deviation <= threshold
@@ -216,7 +439,7 @@ class VolumeProfileEngine:
         Returns:
             dict: Signal avec score
         """
-        if not self.volume_profile or self.poc is None:
+        if self.poc is None:
             return {'action': 'hold', 'score': 0, 'reason': 'Volume Profile non calculé'}
         
         signal = {
@@ -254,10 +477,25 @@ class VolumeProfileEngine:
         
         return signal
     
-    def analyze_complete(self, df, current_price, prev_price):
+    def update_profile(self, df):
+        """
+        Met à jour POC et Value Area (partie coûteuse de l'analyse)
+        
+        Returns:
+            dict: POC et Value Area (None si pas assez de bougies)
+        """
+        if self.settings.ROLLING_VOLUME_PROFILE:
+            return self.update_rolling_profile(df)
+        return self.calculate_volume_profile(df)
+    
+    def analyze_complete(self, df, current_price, prev_price, update_profile=True):
         """
         Analyse complète Volume Profile + VWAP
         
+        Args:
+            update_profile: Recalcule le Volume Profile ; False = garde POC et
+                            Value Area déjà calculés (ticks intrabar)
+        
         Returns:
             dict: Analyse combinée
         """
@@ -265,7 +503,8 @@ class VolumeProfileEngine:
         self.calculate_vwap(df)
         
         # Calcule Volume Profile
-        self.calculate_volume_profile(df)
+        if update_profile:
+            self.update_profile(df)
         
         # Signaux
         vwap_signal = self.get_vwap_signal(current_price, prev_price)
@@ -328,6 +567,7 @@ if __name__ == "__main__":
     print("📊 Capacités:")
     print("  - VWAP en temps réel")
     print("  - Volume Profile (distribution)")
+    print("  - Volume Profile glissant incrémental (O(log n) par tick)")
     print("  - POC (Point of Control)")
     print("  - Value Area (70% volume)")
     print("  - Signaux de trading")